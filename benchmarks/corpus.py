@@ -0,0 +1,119 @@
+"""
+Generates synthetic corpora of student submissions: one folder per student with a number of Python 2 files, of which
+a controlled fraction of the lines exceeds the line length limit.
+"""
+import json
+import os
+import random
+
+CORPUS_DESCRIPTION_FILE_NAME = "corpus.json"
+
+_words = ["the", "value", "student", "length", "width", "height", "result", "because", "we", "want", "to", "compute",
+          "number", "of", "items", "in", "list", "and", "print", "it", "for", "each", "argument", "given"]
+
+
+def generate_corpus(directory_path, file_count, long_line_density, seed=0, files_per_student=10, lines_per_file=80):
+    """
+    Generates the corpus, unless a corpus with the same description already exists in directory_path.
+
+    :type directory_path: str
+    :type file_count: int
+    :param long_line_density: Fraction of the lines that exceeds the line length limit
+    :type long_line_density: float
+    :type seed: int
+    :type files_per_student: int
+    :type lines_per_file: int
+    :return: Description of the corpus
+    :rtype: dict
+    """
+    description = {
+        "file_count": file_count,
+        "long_line_density": long_line_density,
+        "seed": seed,
+        "files_per_student": files_per_student,
+        "lines_per_file": lines_per_file,
+    }
+
+    description_path = os.path.join(directory_path, CORPUS_DESCRIPTION_FILE_NAME)
+    if os.path.exists(description_path):
+        with open(description_path) as description_file:
+            if json.load(description_file) == description:
+                return description
+
+    randomizer = random.Random(seed)
+
+    for file_number in xrange(file_count):
+        student_path = os.path.join(directory_path, "student_{:05d}".format(file_number // files_per_student))
+        if not os.path.isdir(student_path):
+            os.makedirs(student_path)
+
+        file_path = os.path.join(student_path, "assignment_{:02d}.py".format(file_number % files_per_student))
+        with open(file_path, 'w') as source_file:
+            source_file.write(generate_source(randomizer, lines_per_file, long_line_density))
+
+    with open(description_path, 'w') as description_file:
+        json.dump(description, description_file)
+
+    return description
+
+
+def generate_source(randomizer, line_count, long_line_density):
+    """
+    :type randomizer: random.Random
+    :type line_count: int
+    :type long_line_density: float
+    :rtype: str
+    """
+    lines = ["import sys", ""]
+    function_number = 0
+
+    while len(lines) < line_count:
+        function_number += 1
+        lines.append(_function_definition(randomizer, function_number, long_line_density))
+
+        for statement_number in xrange(randomizer.randint(3, 12)):
+            if randomizer.random() < long_line_density:
+                lines.append("    " + _long_statement(randomizer, statement_number))
+            else:
+                lines.append("    " + _short_statement(randomizer, statement_number))
+
+        lines.append("    return value_0")
+        lines.append("")
+
+    return "\n".join(lines) + "\n"
+
+
+def _function_definition(randomizer, function_number, long_line_density):
+    if randomizer.random() >= long_line_density:
+        return "def function_{}(value_0, argument):".format(function_number)
+
+    if randomizer.random() < 0.5:
+        return "def function_{}_{}(value_0, argument):".format(function_number, "_".join(randomizer.sample(_words, 12)))
+
+    arguments = ", ".join("argument_{}_{}".format(i, "_".join(randomizer.sample(_words, 3))) for i in xrange(6))
+    return "def function_{}(value_0, {}):".format(function_number, arguments)
+
+
+def _short_statement(randomizer, statement_number):
+    return randomizer.choice([
+        "value_0 = value_0 + {}".format(statement_number),
+        "argument = len(sys.argv) * {}".format(statement_number),
+        "print value_0, argument",
+        "# {}".format(_sentence(randomizer, 5)),
+        "if value_0 > {}:  # {}\n        value_0 -= 1".format(statement_number, _sentence(randomizer, 3)),
+    ])
+
+
+def _long_statement(randomizer, statement_number):
+    return randomizer.choice([
+        lambda: "# {}".format(_sentence(randomizer, 25)),
+        lambda: "value_0 = max(value_0, argument)  # {}".format(_sentence(randomizer, 18)),
+        lambda: ", ".join("item_{}".format(i) for i in xrange(8)) + " = " +
+                ", ".join(str(randomizer.randint(10 ** 6, 10 ** 9)) for _ in xrange(8)),
+        lambda: "value_0 = " + " + ".join("argument * {} - value_0 / {}".format(i, i + 1) for i in xrange(1, 7)),
+        lambda: 'print "{}", value_0, argument, "{}"'.format(_sentence(randomizer, 8), _sentence(randomizer, 8)),
+    ])()
+
+
+def _sentence(randomizer, word_count):
+    return " ".join(randomizer.choice(_words) for _ in xrange(word_count))
@@ -0,0 +1,106 @@
+"""
+Measures the memory used per feedback item, by creating a large number of feedback items the way the listeners do
+and comparing the RSS before and after. The items are also sent through pickle, which is how they travel between
+worker processes and into the result cache.
+
+    python benchmarks/feedback_memory_benchmark.py [--count 200000]
+"""
+import argparse
+import gc
+import os
+import resource
+import sys
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from contexts import FileContext
+from feedback import FeedbackFactory
+
+_LINES_PER_FILE = 40
+
+
+def _get_rss_in_kb():
+    """
+    :rtype: int
+    """
+    with open("/proc/self/statm") as statm_file:
+        resident_pages = int(statm_file.read().split()[1])
+
+    return resident_pages * resource.getpagesize() // 1024
+
+
+def create_feedback_items(count):
+    """
+    Creates feedback items for lengthy lines spread over files, with two feedback items per line.
+
+    :type count: int
+    :rtype: list[Feedback]
+    """
+    feedback_factory = FeedbackFactory()
+    feedback_items = []
+
+    for index in xrange(count // 2):
+        file_path = os.path.join(os.getcwd(), "input_files", "students", "student_%05d" % (index // _LINES_PER_FILE), "assignment.py")
+        line_content = "    result = compute_the_value(first_argument, second_argument) + compute_the_value(third_argument) %d\n" % index
+        file_context = FileContext(index % _LINES_PER_FILE + 1, line_content, file_path)
+
+        feedback_items.append(feedback_factory.extract_variable(file_context))
+        feedback_items.append(feedback_factory.fundef_many_arguments(file_context, 5))
+
+    return feedback_items
+
+
+def measure_created(count):
+    """
+    :type count: int
+    :rtype: float
+    """
+    gc.collect()
+    rss_before = _get_rss_in_kb()
+
+    feedback_items = create_feedback_items(count)
+
+    gc.collect()
+    return (_get_rss_in_kb() - rss_before) * 1024.0 / len(feedback_items)
+
+
+def measure_unpickled(count):
+    """
+    :type count: int
+    :rtype: (float, float)
+    """
+    pickled_feedback_items = pickle.dumps(create_feedback_items(count), pickle.HIGHEST_PROTOCOL)
+
+    gc.collect()
+    rss_before = _get_rss_in_kb()
+
+    feedback_items = pickle.loads(pickled_feedback_items)
+
+    gc.collect()
+    bytes_per_item = (_get_rss_in_kb() - rss_before) * 1024.0 / len(feedback_items)
+
+    return bytes_per_item, len(pickled_feedback_items) / float(len(feedback_items))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures the memory used per feedback item.")
+    parser.add_argument("--count", type=int, default=200000, help="The number of feedback items to create.")
+    args = parser.parse_args()
+
+    # Every measurement runs in a fresh process, so memory freed by an earlier one doesn't hide the growth
+    if os.fork() == 0:
+        print "created:   {:7.1f} bytes per feedback item".format(measure_created(args.count))
+        os._exit(0)
+    os.wait()
+
+    if os.fork() == 0:
+        unpickled_bytes_per_item, pickled_bytes_per_item = measure_unpickled(args.count)
+        print "unpickled: {:7.1f} bytes per feedback item".format(unpickled_bytes_per_item)
+        print "pickled:   {:7.1f} bytes per feedback item".format(pickled_bytes_per_item)
+        os._exit(0)
+    os.wait()
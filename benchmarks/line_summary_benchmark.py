@@ -0,0 +1,81 @@
+"""
+Compares the time it takes to summarize the lengthy lines of a file with the stdlib tokenizer and AST to the time it
+takes to parse the same file with RedBaron.
+
+    python benchmarks/line_summary_benchmark.py [path ...]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from redbaron import RedBaron
+
+from line_summary import LineSummaryIndex
+from main import SourceCodeFileFinder
+from parsing import ParsedSource
+from source_buffer import SourceBuffer
+
+
+def benchmark_file(file_path, repetitions):
+    """
+    :type file_path: str
+    :type repetitions: int
+    :return: Seconds per summary and seconds per parse, or None when the file has no lengthy lines
+    :rtype: (float, float) | None
+    """
+    source_buffer = SourceBuffer.from_file(file_path)
+    line_numbers = [line_number for line_number, line in source_buffer.iter_lines() if len(line) > 100]
+
+    if not line_numbers:
+        return None
+
+    # Every summary starts from a fresh parsed source, so tokenizing and parsing the AST are part of its time
+    summary_time = min(timeit.repeat(lambda: LineSummaryIndex(ParsedSource(file_path, source_buffer), line_numbers),
+                                     number=1, repeat=repetitions))
+    parse_time = min(timeit.repeat(lambda: RedBaron(source_buffer.get_text()), number=1, repeat=repetitions))
+
+    return summary_time, parse_time
+
+
+def set_up_command_line_arguments():
+    root_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('paths', nargs='*', default=[os.path.join(root_path, 'input_files'),
+                                                      os.path.join(root_path, 'examples', 'snippets')])
+    parser.add_argument('-r', dest='repetitions', type=int, default=5)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = set_up_command_line_arguments()
+    file_finder = SourceCodeFileFinder()
+
+    total_summary_time = 0.0
+    total_parse_time = 0.0
+    file_count = 0
+
+    for path in args.paths:
+        file_paths = [path] if os.path.isfile(path) else file_finder.find_python_files_in_directory(path)
+
+        for file_path in file_paths:
+            timings = benchmark_file(file_path, args.repetitions)
+            if timings is None:
+                continue
+
+            summary_time, parse_time = timings
+            total_summary_time += summary_time
+            total_parse_time += parse_time
+            file_count += 1
+
+            print "{:60s} summary {:8.2f} ms   RedBaron {:8.2f} ms".format(
+                os.path.relpath(file_path), summary_time * 1000, parse_time * 1000)
+
+    if file_count:
+        print "\nPer file: summary {:.2f} ms, RedBaron {:.2f} ms, saving {:.2f} ms ({:.1f}x)".format(
+            total_summary_time / file_count * 1000, total_parse_time / file_count * 1000,
+            (total_parse_time - total_summary_time) / file_count * 1000, total_parse_time / total_summary_time)
@@ -0,0 +1,224 @@
+"""
+Benchmarks the analysis pipeline over synthetic corpora of student submissions, using the standard set of listeners.
+Every corpus is analyzed in a fresh process so the peak RSS of the runs can be compared.
+
+The results are compared to a baseline saved earlier with --save-baseline. Timings depend on the machine, so no
+baseline is committed: record one on the machine before making a change, the comparison is skipped until then.
+
+    python benchmarks/pipeline_benchmark.py [--sizes 10,1000,10000] [--save-baseline]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import feedback
+import instrumentation
+from corpus import generate_corpus
+from listeners import LineLengthViolationCounter
+from main import CodeAnalyzer, create_line_length_analyzer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Metrics where a lower value is better, compared against the baseline
+_lower_is_better = ["seconds", "scan_seconds", "parse_seconds", "listener_seconds", "peak_rss_kb"]
+# Metrics that have to match the baseline exactly, a difference means the analysis itself changed
+_exact_metrics = ["violations", "feedback"]
+
+
+class _FeedbackCounter(feedback.FeedbackListener):
+    def __init__(self):
+        feedback.FeedbackListener.__init__(self)
+        self.count = 0
+
+    def on_feedback(self, feedback_item):
+        self.count += 1
+
+
+def run_benchmark(corpus_path):
+    """
+    Analyzes the corpus in the current process.
+
+    :type corpus_path: str
+    :rtype: dict
+    """
+    instrumentation.enable()
+
+    line_length_violation_counter = LineLengthViolationCounter()
+    code_analyzer = CodeAnalyzer()
+    code_analyzer.add_file_analyzer(create_line_length_analyzer(line_length_violation_counter))
+
+    feedback_counter = _FeedbackCounter()
+    feedback.listen(feedback_counter)
+
+    start = time.time()
+    code_analyzer.analyze_directory(corpus_path)
+    seconds = time.time() - start
+
+    analysis_stats = instrumentation.get_stats()
+    file_count = len(line_length_violation_counter.get_violation_count_per_file())
+    scan_seconds, _ = analysis_stats.get_total_stage_time("scan")
+    parse_seconds, _ = analysis_stats.get_total_stage_time(instrumentation.FRAME_PARSE)
+    listener_seconds, _ = analysis_stats.get_total_stage_time(instrumentation.FRAME_LISTENERS)
+
+    return {
+        "files_with_violations": file_count,
+        "seconds": seconds,
+        "scan_seconds": scan_seconds,
+        "scanned_bytes": _get_corpus_size_in_bytes(corpus_path),
+        # Parsing happens lazily while listeners are notified, so it is subtracted from the listener time
+        "parse_seconds": parse_seconds,
+        "listener_seconds": listener_seconds - parse_seconds,
+        "counters": analysis_stats.get_counters(),
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "violations": line_length_violation_counter.get_total_violation_count(),
+        "feedback": feedback_counter.count,
+    }
+
+
+def _get_corpus_size_in_bytes(corpus_path):
+    """
+    :type corpus_path: str
+    :rtype: int
+    """
+    return sum(os.path.getsize(os.path.join(directory_path, file_name))
+               for directory_path, _, file_names in os.walk(corpus_path)
+               for file_name in file_names if file_name.endswith(".py"))
+
+
+def run_benchmark_in_subprocess(corpus_path):
+    """
+    :type corpus_path: str
+    :rtype: dict
+    """
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--run", corpus_path])
+
+    return json.loads(output)
+
+
+def compare_to_baseline(size, result, baseline, tolerance):
+    """
+    :type size: str
+    :type result: dict
+    :type baseline: dict
+    :type tolerance: float
+    :return: Descriptions of all regressions
+    :rtype: list[str]
+    """
+    if size not in baseline:
+        return []
+
+    regressions = []
+    baseline_result = baseline[size]
+
+    for metric in _lower_is_better:
+        if baseline_result.get(metric) and result[metric] > baseline_result[metric] * (1 + tolerance):
+            regressions.append("{} files: {} went from {:.3f} to {:.3f}".format(
+                size, metric, baseline_result[metric], result[metric]))
+
+    if baseline_result.get("files_per_second") and \
+            result["files_per_second"] < baseline_result["files_per_second"] * (1 - tolerance):
+        regressions.append("{} files: files_per_second went from {:.1f} to {:.1f}".format(
+            size, baseline_result["files_per_second"], result["files_per_second"]))
+
+    for metric in _exact_metrics:
+        if metric in baseline_result and result[metric] != baseline_result[metric]:
+            regressions.append("{} files: {} changed from {} to {}".format(
+                size, metric, baseline_result[metric], result[metric]))
+
+    return regressions
+
+
+def print_result(size, result, baseline):
+    """
+    :type size: str
+    :type result: dict
+    :type baseline: dict
+    """
+    baseline_result = baseline.get(size, {})
+
+    def relative(metric):
+        if not baseline_result.get(metric):
+            return ""
+
+        return "({:+.1f}%)".format((result[metric] / baseline_result[metric] - 1) * 100)
+
+    print "{:>6s} files  {:9.1f} files/s {:9s}  scan {:7.1f} MB/s {:9s}  parse {:7.2f}s {:9s}  " \
+          "listeners {:7.2f}s {:9s}  peak RSS {:7.1f} MB {:9s}".format(
+            size, result["files_per_second"], relative("files_per_second"),
+            result["scan_megabytes_per_second"], relative("scan_megabytes_per_second"),
+            result["parse_seconds"], relative("parse_seconds"),
+            result["listener_seconds"], relative("listener_seconds"),
+            result["peak_rss_kb"] / 1024.0, relative("peak_rss_kb"))
+
+
+def set_up_command_line_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', dest='sizes', default="10,1000,10000")
+    parser.add_argument('--density', dest='long_line_density', type=float, default=0.05)
+    parser.add_argument('--corpus-dir', dest='corpus_dir',
+                        default=os.path.join(tempfile.gettempdir(), "code-quality-feedback-tool-corpora"))
+    parser.add_argument('--baseline', dest='baseline_path', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', dest='save_baseline', action='store_true')
+    parser.add_argument('--tolerance', dest='tolerance', type=float, default=0.1)
+    parser.add_argument('--run', dest='run_corpus_path', help=argparse.SUPPRESS)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = set_up_command_line_arguments()
+
+    if args.run_corpus_path:
+        print json.dumps(run_benchmark(args.run_corpus_path))
+        sys.exit(0)
+
+    baseline = {}
+    if os.path.exists(args.baseline_path):
+        with open(args.baseline_path) as baseline_file:
+            baseline = json.load(baseline_file)
+    else:
+        print "No baseline at {}, skipping the comparison. Run with --save-baseline to record one.\n".format(
+            args.baseline_path)
+
+    results = {}
+    regressions = []
+    sizes_without_baseline = []
+
+    for size in args.sizes.split(","):
+        corpus_path = os.path.join(args.corpus_dir, "{}-{}".format(size, args.long_line_density))
+        description = generate_corpus(corpus_path, int(size), args.long_line_density)
+
+        result = run_benchmark_in_subprocess(corpus_path)
+        result["files"] = description["file_count"]
+        result["files_per_second"] = result["files"] / result["seconds"]
+        result["scan_megabytes_per_second"] = result["scanned_bytes"] / (1024.0 * 1024.0) / result["scan_seconds"]
+        results[size] = result
+
+        print_result(size, result, baseline)
+        regressions += compare_to_baseline(size, result, baseline, args.tolerance)
+
+        if size not in baseline:
+            sizes_without_baseline.append(size)
+
+    if baseline and sizes_without_baseline:
+        print "\nNo baseline for {} files, skipped their comparison".format(", ".join(sizes_without_baseline))
+
+    if regressions:
+        print "\nRegressions compared to the baseline:"
+        for regression in regressions:
+            print " - {}".format(regression)
+
+    if args.save_baseline:
+        baseline.update(results)
+
+        with open(args.baseline_path, 'w') as baseline_file:
+            json.dump(baseline, baseline_file, indent=4, sort_keys=True, separators=(",", ": "))
+
+    sys.exit(1 if regressions else 0)
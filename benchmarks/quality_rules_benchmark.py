@@ -0,0 +1,106 @@
+"""
+Measures how the time to check the quality rules grows as rules are added, when all rules share a single walk over the
+AST of each file compared to walking the AST once per rule. The standard rules are repeated to get larger rule counts.
+The files are parsed before timing, so only the walks are measured.
+
+    python benchmarks/quality_rules_benchmark.py [--files 200] [--rule-counts 1,2,4,8,16]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from corpus import generate_corpus
+from main import SourceCodeFileFinder
+from parsing import ParsedSource
+from quality_rules import ArgumentCountRule, FunctionLengthRule, NamingRule, NestingDepthRule, QualityRuleEngine
+from source_buffer import SourceBuffer
+
+_rule_classes = [FunctionLengthRule, NestingDepthRule, ArgumentCountRule, NamingRule]
+
+
+def load_parsed_sources(corpus_path):
+    """
+    :type corpus_path: str
+    :return: The files of the corpus, with their AST already parsed
+    :rtype: list[ParsedSource]
+    """
+    parsed_sources = []
+
+    for file_path in SourceCodeFileFinder().find_python_files_in_directory(corpus_path):
+        parsed_source = ParsedSource(file_path, SourceBuffer.from_file(file_path))
+        parsed_source.get_ast()
+        parsed_sources.append(parsed_source)
+
+    return parsed_sources
+
+
+def create_engines(rule_count, single_walk):
+    """
+    :type rule_count: int
+    :param single_walk: Whether all rules are added to a single engine, or each to an engine of its own
+    :type single_walk: bool
+    :rtype: list[QualityRuleEngine]
+    """
+    rules = [_rule_classes[i % len(_rule_classes)]() for i in xrange(rule_count)]
+
+    if single_walk:
+        engine = QualityRuleEngine()
+        for rule in rules:
+            engine.add_rule(rule)
+
+        return [engine]
+
+    engines = []
+    for rule in rules:
+        engine = QualityRuleEngine()
+        engine.add_rule(rule)
+        engines.append(engine)
+
+    return engines
+
+
+def benchmark_engines(engines, parsed_sources, repetitions):
+    """
+    :type engines: list[QualityRuleEngine]
+    :type parsed_sources: list[ParsedSource]
+    :type repetitions: int
+    :return: Seconds per file
+    :rtype: float
+    """
+    def check_all_files():
+        for parsed_source in parsed_sources:
+            for engine in engines:
+                engine.check(parsed_source)
+
+    return min(timeit.repeat(check_all_files, number=1, repeat=repetitions)) / len(parsed_sources)
+
+
+def set_up_command_line_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--files', dest='file_count', type=int, default=200)
+    parser.add_argument('--rule-counts', dest='rule_counts', default="1,2,4,8,16")
+    parser.add_argument('--corpus-dir', dest='corpus_dir',
+                        default=os.path.join(tempfile.gettempdir(), "quality_rules_benchmark_corpus"))
+    parser.add_argument('-r', dest='repetitions', type=int, default=3)
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = set_up_command_line_arguments()
+
+    generate_corpus(args.corpus_dir, args.file_count, long_line_density=0.05)
+    parsed_sources = load_parsed_sources(args.corpus_dir)
+
+    print "{:>5s}  {:>18s}  {:>18s}".format("rules", "single walk", "walk per rule")
+
+    for rule_count in [int(rule_count) for rule_count in args.rule_counts.split(",")]:
+        single_walk_time = benchmark_engines(create_engines(rule_count, True), parsed_sources, args.repetitions)
+        walk_per_rule_time = benchmark_engines(create_engines(rule_count, False), parsed_sources, args.repetitions)
+
+        print "{:5d}  {:12.3f} ms/file  {:12.3f} ms/file".format(
+            rule_count, single_walk_time * 1000, walk_per_rule_time * 1000)
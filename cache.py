@@ -0,0 +1,146 @@
+import errno
+import logging
+import os
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from results import FileAnalysisResult
+
+CACHE_ENTRY_EXTENSION = ".pickle"
+
+
+class ResultCache:
+    """
+    Content addressed on-disk cache of FileAnalysisResults. Entries are evicted least recently used first as soon as
+    the total size of the cache exceeds max_size_in_bytes.
+    """
+
+    def __init__(self, directory_path, max_size_in_bytes):
+        """
+        :type directory_path: str
+        :type max_size_in_bytes: int
+        """
+        self._directory_path = directory_path
+        self._max_size_in_bytes = max_size_in_bytes
+
+        _make_directories(directory_path)
+        self._size_in_bytes = sum(size for _, _, size in self._list_entries())
+
+        if self._size_in_bytes > self._max_size_in_bytes:
+            self._evict()
+
+    def get(self, key):
+        """
+        :type key: str
+        :rtype: FileAnalysisResult | None
+        """
+        entry_path = self._get_entry_path(key)
+
+        try:
+            with open(entry_path, 'rb') as entry_file:
+                file_analysis_result = pickle.load(entry_file)
+        except (IOError, OSError):
+            return None
+        except Exception:
+            logging.warn('Discarding unreadable cache entry {}'.format(entry_path))
+            self._remove_entry(entry_path)
+            return None
+
+        # Touching the entry keeps it from being evicted while it is still being used
+        _touch(entry_path)
+
+        return file_analysis_result
+
+    def put(self, key, file_analysis_result):
+        """
+        :type key: str
+        :type file_analysis_result: FileAnalysisResult
+        """
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self._directory_path, suffix=".tmp")
+
+        with os.fdopen(file_descriptor, 'wb') as temporary_file:
+            pickle.dump(file_analysis_result, temporary_file, pickle.HIGHEST_PROTOCOL)
+
+        entry_path = self._get_entry_path(key)
+        # An entry that is written again replaces the one written before
+        replaced_size = _get_size(entry_path)
+
+        # Renaming is atomic, so other processes sharing the cache never read a half written entry
+        os.rename(temporary_path, entry_path)
+        self._size_in_bytes += os.path.getsize(entry_path) - replaced_size
+
+        if self._size_in_bytes > self._max_size_in_bytes:
+            self._evict()
+
+    def _evict(self):
+        entries = self._list_entries()
+        self._size_in_bytes = sum(size for _, _, size in entries)
+
+        for _, entry_path, size in sorted(entries):
+            if self._size_in_bytes <= self._max_size_in_bytes:
+                break
+
+            self._remove_entry(entry_path)
+            self._size_in_bytes -= size
+
+    def _list_entries(self):
+        """
+        :rtype: list[(float, str, int)]
+        """
+        entries = []
+
+        for file_name in os.listdir(self._directory_path):
+            if not file_name.endswith(CACHE_ENTRY_EXTENSION):
+                continue
+
+            entry_path = os.path.join(self._directory_path, file_name)
+            try:
+                entry_stat = os.stat(entry_path)
+            except OSError:
+                # Removed by another process sharing the cache
+                continue
+
+            entries.append((entry_stat.st_mtime, entry_path, entry_stat.st_size))
+
+        return entries
+
+    def _get_entry_path(self, key):
+        return os.path.join(self._directory_path, key + CACHE_ENTRY_EXTENSION)
+
+    @staticmethod
+    def _remove_entry(entry_path):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
+
+
+def _make_directories(directory_path):
+    try:
+        os.makedirs(directory_path)
+    except OSError as os_error:
+        if os_error.errno != errno.EEXIST:
+            raise
+
+
+def _get_size(path):
+    """
+    :type path: str
+    :return: The size of the file, 0 if there is none
+    :rtype: int
+    """
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def _touch(path):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
@@ -1,14 +1,20 @@
-from redbaron import RedBaron
+from line_summary import LineSummary
+from node_index import LineNodeIndex
 
 
-class FileContext:
+class FileContext(object):
+    __slots__ = ("line_number", "line_content", "source_file_name")
+
     def __init__(self, line_number, line_content, source_file_name):
         self.line_number = line_number  # type: int
         self.line_content = line_content  # type: str
         self.source_file_name = source_file_name  # type: str
 
 
-class LineLengthExceededContext:
-    def __init__(self, file_context, source_file_fst):
+class LineLengthExceededContext(object):
+    __slots__ = ("file_context", "line_node_index", "line_summary")
+
+    def __init__(self, file_context, line_node_index, line_summary):
         self.file_context = file_context  # type: FileContext
-        self.source_file_fst = source_file_fst  # type: RedBaron
+        self.line_node_index = line_node_index  # type: LineNodeIndex
+        self.line_summary = line_summary  # type: LineSummary | None
@@ -0,0 +1,249 @@
+"""
+Statistics over a whole corpus, gathered while the files stream by. The memory used doesn't grow with the number of
+files: distributions are kept as histograms of bounded size and only the worst files and students are remembered.
+Statistics gathered separately, like by worker processes or for parts of a corpus, can be merged.
+"""
+import heapq
+import os
+
+
+class IntegerHistogram:
+    """
+    Distribution of non-negative integers, counted per value. Values above max_value are counted at max_value, so
+    percentiles above it are capped, while the count, mean and maximum stay exact.
+    """
+
+    def __init__(self, max_value):
+        """
+        :type max_value: int
+        """
+        self._counts = [0] * (max_value + 1)
+        self.count = 0
+        self.total = 0
+        self.maximum = 0
+
+    def add(self, value, count=1):
+        """
+        :type value: int
+        :param count: Number of times the value occurred
+        :type count: int
+        """
+        self._counts[min(value, len(self._counts) - 1)] += count
+        self.count += count
+        self.total += value * count
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other):
+        """
+        :type other: IntegerHistogram
+        """
+        if len(other._counts) != len(self._counts):
+            raise ValueError("Only histograms with the same maximum value can be merged")
+
+        for value, count in enumerate(other._counts):
+            self._counts[value] += count
+
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def get_mean(self):
+        """
+        :rtype: float
+        """
+        if not self.count:
+            return 0.0
+
+        return self.total / float(self.count)
+
+    def get_percentile(self, percentile):
+        """
+        :param percentile: Between 0 and 100
+        :type percentile: float
+        :return: The smallest value that at least the given percentage of the values is less than or equal to
+        :rtype: int
+        """
+        if not self.count:
+            return 0
+
+        rank = max(1, int(round(self.count * percentile / 100.0)))
+        cumulative_count = 0
+
+        for value, count in enumerate(self._counts):
+            cumulative_count += count
+            if cumulative_count >= rank:
+                return min(value, self.maximum)
+
+        return self.maximum
+
+
+class TopList:
+    """
+    The names with the highest scores, of which at most size are kept. A name that is added again has its score
+    increased, as long as it hasn't dropped off the list in the meantime.
+    """
+
+    def __init__(self, size):
+        """
+        :type size: int
+        """
+        self._size = size
+        # Min-heap of [score, name] entries, so the lowest score is the first to drop off
+        self._heap = []  # type: list[list]
+        self._entry_per_name = {}  # type: dict[str, list]
+
+    def add(self, name, score):
+        """
+        :type name: str
+        :type score: int
+        """
+        entry = self._entry_per_name.get(name)
+
+        if entry is not None:
+            entry[0] += score
+            heapq.heapify(self._heap)
+        elif len(self._heap) < self._size:
+            entry = [score, name]
+            self._entry_per_name[name] = entry
+            heapq.heappush(self._heap, entry)
+        elif self._heap and score > self._heap[0][0]:
+            entry = [score, name]
+            self._entry_per_name[name] = entry
+            dropped_entry = heapq.heapreplace(self._heap, entry)
+            del self._entry_per_name[dropped_entry[1]]
+
+    def merge(self, other):
+        """
+        :type other: TopList
+        """
+        for score, name in other._heap:
+            self.add(name, score)
+
+    def get_top(self):
+        """
+        :return: Names and their scores, from the highest score to the lowest
+        :rtype: list[(str, int)]
+        """
+        return [(name, score) for score, name in sorted(self._heap, key=lambda entry: (-entry[0], entry[1]))]
+
+
+class CorpusStats:
+    """
+    Counts of the feedback per type, distributions over the files and the lengthy lines, and the files and students
+    with the most line length violations. Files are added one at a time once they have been analyzed, the files of a
+    student are expected to be added one after the other, like they are found in the student's directory.
+    """
+
+    def __init__(self, top_list_size=10, max_line_length=1000, max_count_per_file=1000):
+        """
+        :param top_list_size: Number of files and students with the most violations that are kept
+        :type top_list_size: int
+        :param max_line_length: Longest line length whose percentiles are exact
+        :type max_line_length: int
+        :param max_count_per_file: Largest number of violations or feedback per file whose percentiles are exact
+        :type max_count_per_file: int
+        """
+        self.file_count = 0
+        self.files_with_violations_count = 0
+        self.feedback_count_per_type = {}  # type: dict[str, int]
+        self.violations_per_file = IntegerHistogram(max_count_per_file)
+        self.feedback_per_file = IntegerHistogram(max_count_per_file)
+        self.lengthy_line_lengths = IntegerHistogram(max_line_length)
+        self.worst_files = TopList(top_list_size)
+        self.worst_students = TopList(top_list_size)
+        # The violations of the student whose files are being added, which are added to the top list once all of them
+        # have been added
+        self._current_student = None  # type: str | None
+        self._current_student_violation_count = 0
+
+    def add_file(self, file_path, student, lengthy_line_lengths, feedback_types):
+        """
+        :type file_path: str
+        :param student: The student the file belongs to
+        :type student: str
+        :param lengthy_line_lengths: Lengths of the lines of the file that violate the line length limit
+        :type lengthy_line_lengths: list[int]
+        :param feedback_types: Types of the feedback emitted for the file
+        :type feedback_types: list[str]
+        """
+        violation_count = len(lengthy_line_lengths)
+
+        self.file_count += 1
+        self.violations_per_file.add(violation_count)
+        self.feedback_per_file.add(len(feedback_types))
+
+        for line_length in lengthy_line_lengths:
+            self.lengthy_line_lengths.add(line_length)
+
+        for feedback_type in feedback_types:
+            self.feedback_count_per_type[feedback_type] = self.feedback_count_per_type.get(feedback_type, 0) + 1
+
+        if violation_count:
+            self.files_with_violations_count += 1
+            self.worst_files.add(file_path, violation_count)
+
+        if student != self._current_student:
+            self._end_current_student()
+            self._current_student = student
+
+        self._current_student_violation_count += violation_count
+
+    def merge(self, other):
+        """
+        Adds the statistics of other, which were gathered for other files.
+
+        :type other: CorpusStats
+        """
+        self._end_current_student()
+        other._end_current_student()
+
+        self.file_count += other.file_count
+        self.files_with_violations_count += other.files_with_violations_count
+
+        for feedback_type, count in other.feedback_count_per_type.iteritems():
+            self.feedback_count_per_type[feedback_type] = self.feedback_count_per_type.get(feedback_type, 0) + count
+
+        self.violations_per_file.merge(other.violations_per_file)
+        self.feedback_per_file.merge(other.feedback_per_file)
+        self.lengthy_line_lengths.merge(other.lengthy_line_lengths)
+        self.worst_files.merge(other.worst_files)
+        self.worst_students.merge(other.worst_students)
+
+    def get_violation_count(self):
+        """
+        :rtype: int
+        """
+        return self.violations_per_file.total
+
+    def get_worst_students(self):
+        """
+        :rtype: list[(str, int)]
+        """
+        self._end_current_student()
+
+        return self.worst_students.get_top()
+
+    def _end_current_student(self):
+        if self._current_student_violation_count:
+            self.worst_students.add(self._current_student, self._current_student_violation_count)
+
+        self._current_student = None
+        self._current_student_violation_count = 0
+
+
+def get_student(file_path, corpus_path):
+    """
+    Students hand in a directory of their own in the corpus, files directly in the corpus belong to the corpus itself.
+
+    :type file_path: str
+    :type corpus_path: str
+    :return: The directory of the student the file belongs to
+    :rtype: str
+    """
+    relative_file_path = os.path.relpath(file_path, corpus_path)
+    student_directory_name = relative_file_path.split(os.sep, 1)[0]
+
+    if student_directory_name == relative_file_path or student_directory_name == os.pardir:
+        return os.path.dirname(file_path)
+
+    return os.path.join(corpus_path, student_directory_name)
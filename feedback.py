@@ -1,4 +1,6 @@
 from abc import abstractmethod
+import json
+
 from contexts import FileContext
 
 
@@ -9,8 +11,17 @@ TYPE_MULTI_ASSIGNMENT = "multi_assignment"
 TYPE_FUNDEF_LONG_NAME = "fundef_long_name"
 TYPE_FUNDEF_LONG_ARGUMENTS = "fundef_long_arguments"
 TYPE_FUNDEF_MANY_ARGUMENTS = "fundef_many_arguments"
+TYPE_FUNCTION_TOO_LONG = "function_too_long"
+TYPE_FUNCTION_DEEP_NESTING = "function_deep_nesting"
+TYPE_FUNCTION_MANY_ARGUMENTS = "function_many_arguments"
+TYPE_NAMING_CONVENTION = "naming_convention"
+
+class Feedback(object):
+    # Analyzing a corpus creates a feedback item for almost every lengthy line, so the items are kept compact: no
+    # instance dictionary, and the type, text and file name are interned so items share a single copy of each. The code
+    # is the line as read from the source, which is shared with the other feedback on the same line.
+    __slots__ = ("_type", "_text", "_line_number", "_source_file_name", "_code")
 
-class Feedback:
     def __init__(self, feedback_type, text, line_number, source_file_name, code):
         """
         :type text: str 
@@ -18,12 +29,18 @@ class Feedback:
         :type source_file_name: str 
         :type code: str 
         """
-        self._type = feedback_type
-        self._text = text
+        self._type = _intern(feedback_type)
+        self._text = _intern(text)
         self._line_number = line_number
-        self._source_file_name = source_file_name
+        self._source_file_name = _intern(source_file_name)
         self._code = code
 
+    def __getstate__(self):
+        return self._type, self._text, self._line_number, self._source_file_name, self._code
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
     def get_type(self):
         return self._type
 
@@ -39,6 +56,28 @@ class Feedback:
     def get_code(self):
         return self._code
 
+    def for_source_file(self, source_file_name):
+        """
+        Returns the same feedback for a file with identical contents.
+
+        :type source_file_name: str
+        :rtype: Feedback
+        """
+        return Feedback(self._type, self._text, self._line_number, source_file_name, self._code)
+
+
+def _intern(value):
+    """
+    Interns byte strings, other values are returned unchanged.
+
+    :type value: str
+    :rtype: str
+    """
+    if type(value) is str:
+        return intern(value)
+
+    return value
+
 
 _feedback_texts = {
     TYPE_COMMENT: "Try splitting your comment into multiple lines so that it doesn't exceed the line length limit.",
@@ -51,6 +90,11 @@ _feedback_texts = {
     TYPE_FUNDEF_LONG_NAME: "This function has a very long name, which can probably be shortened without losing any expressiveness.",
     TYPE_FUNDEF_LONG_ARGUMENTS: "This function has {long_argument_count} arguments with a long name. These can probably be shortened without losing any expressiveness.",
     TYPE_FUNDEF_MANY_ARGUMENTS: "This function has {argument_count} arguments. Try splitting this function up into multiple functions with less arguments",
+
+    TYPE_FUNCTION_TOO_LONG: "This function is {line_count} lines long. Try splitting it up into smaller functions that each do one thing.",
+    TYPE_FUNCTION_DEEP_NESTING: "This code is nested {nesting_depth} levels deep. Try returning early or moving the inner blocks into a function of their own.",
+    TYPE_FUNCTION_MANY_ARGUMENTS: "This function has {argument_count} arguments. Try splitting this function up into multiple functions with less arguments",
+    TYPE_NAMING_CONVENTION: "The name {name} doesn't follow the naming convention, {convention}.",
 }
 
 
@@ -125,6 +169,40 @@ class FeedbackFactory:
         """
         return self._feedback_from_file_context(TYPE_FUNDEF_MANY_ARGUMENTS, file_context, argument_count=number_of_arguments)
 
+    def function_too_long(self, file_context, number_of_lines):
+        """
+        :type file_context: FileContext
+        :type number_of_lines: int
+        :rtype: Feedback
+        """
+        return self._feedback_from_file_context(TYPE_FUNCTION_TOO_LONG, file_context, line_count=number_of_lines)
+
+    def function_deep_nesting(self, file_context, nesting_depth):
+        """
+        :type file_context: FileContext
+        :type nesting_depth: int
+        :rtype: Feedback
+        """
+        return self._feedback_from_file_context(TYPE_FUNCTION_DEEP_NESTING, file_context, nesting_depth=nesting_depth)
+
+    def function_many_arguments(self, file_context, number_of_arguments):
+        """
+        :type file_context: FileContext
+        :type number_of_arguments: int
+        :rtype: Feedback
+        """
+        return self._feedback_from_file_context(TYPE_FUNCTION_MANY_ARGUMENTS, file_context, argument_count=number_of_arguments)
+
+    def naming_convention(self, file_context, name, convention):
+        """
+        :type file_context: FileContext
+        :type name: str
+        :param convention: Description of the convention the name should follow
+        :type convention: str
+        :rtype: Feedback
+        """
+        return self._feedback_from_file_context(TYPE_NAMING_CONVENTION, file_context, name=name, convention=convention)
+
 
 listeners = []  # type: list[FeedbackListener]
 
@@ -136,6 +214,13 @@ def listen(listener):
     listeners.append(listener)
 
 
+def unlisten(listener):
+    """
+    :type listener: FeedbackListener
+    """
+    listeners.remove(listener)
+
+
 def emit(feedback):
     """
     :type feedback: Feedback 
@@ -144,6 +229,16 @@ def emit(feedback):
         listener.on_feedback(feedback)
 
 
+def end_file(source_file_name):
+    """
+    Signals that all feedback for the file has been emitted.
+
+    :type source_file_name: str
+    """
+    for listener in listeners:
+        listener.on_file_end(source_file_name)
+
+
 class FeedbackListener:
     def __init__(self):
         pass
@@ -155,6 +250,37 @@ class FeedbackListener:
         """
         raise NotImplementedError('method on_feedback must be implemented by listener')
 
+    def on_file_end(self, source_file_name):
+        """
+        :type source_file_name: str
+        """
+        pass
+
+
+class FeedbackRecorder(FeedbackListener):
+    """
+    Records emitted feedback until it is popped, so the feedback of a single file can be handed over elsewhere.
+    """
+
+    def __init__(self):
+        FeedbackListener.__init__(self)
+        self._feedback = []  # type: list[Feedback]
+
+    def on_feedback(self, feedback):
+        """
+        :type feedback: Feedback
+        """
+        self._feedback.append(feedback)
+
+    def pop_feedback(self):
+        """
+        :rtype: list[Feedback]
+        """
+        recorded_feedback = self._feedback
+        self._feedback = []
+
+        return recorded_feedback
+
 
 class FeedbackCollector(FeedbackListener):
     def __init__(self):
@@ -173,12 +299,7 @@ class FeedbackCollector(FeedbackListener):
         """
         :type feedback: Feedback 
         """
-        file_name = feedback.get_source_file_name()
-        path_components = file_name.split('/')
-        last_three_path_components = path_components[-3:]
-
-        if len(last_three_path_components) < len(path_components):
-            file_name = ".../" + "/".join(last_three_path_components)
+        file_name = shorten_file_name(feedback.get_source_file_name())
 
         if file_name not in self._feedback_per_file:
             self._feedback_per_file[file_name] = [feedback]
@@ -206,3 +327,118 @@ class FeedbackCollector(FeedbackListener):
             return None
 
         return self._feedback_per_file[file_name]
+
+
+OUTPUT_FORMAT_TEXT = "text"
+OUTPUT_FORMAT_JSON_LINES = "jsonl"
+
+
+class StreamingFeedbackWriter(FeedbackListener):
+    """
+    Writes feedback as soon as the analysis of its file has finished, instead of collecting all feedback of a run.
+    At most max_buffered_feedback items are held in memory, the buffer is flushed whenever it is full and at the end
+    of every file.
+    """
+
+    def __init__(self, output_file, output_format=OUTPUT_FORMAT_TEXT, max_buffered_feedback=100):
+        """
+        :type output_file: file
+        :param output_format: OUTPUT_FORMAT_TEXT groups the feedback per file, OUTPUT_FORMAT_JSON_LINES writes one JSON
+                              object per feedback item
+        :type output_format: str
+        :type max_buffered_feedback: int
+        """
+        FeedbackListener.__init__(self)
+        self._output_file = output_file
+        self._output_format = output_format
+        self._max_buffered_feedback = max_buffered_feedback
+        self._buffered_feedback = []  # type: list[Feedback]
+        self._file_with_written_header = None  # type: str | None
+
+    def on_feedback(self, feedback):
+        """
+        :type feedback: Feedback
+        """
+        self._buffered_feedback.append(feedback)
+
+        if len(self._buffered_feedback) >= self._max_buffered_feedback:
+            self._write_buffered_feedback()
+
+    def on_file_end(self, source_file_name):
+        """
+        :type source_file_name: str
+        """
+        self._write_buffered_feedback()
+
+        if self._file_with_written_header is not None and self._output_format == OUTPUT_FORMAT_TEXT:
+            self._output_file.write("\n")
+
+        self._file_with_written_header = None
+        self._output_file.flush()
+
+    def _write_buffered_feedback(self):
+        for feedback in self._buffered_feedback:
+            if self._output_format == OUTPUT_FORMAT_JSON_LINES:
+                self._output_file.write(format_feedback_as_json(feedback) + "\n")
+            else:
+                self._write_feedback_as_text(feedback)
+
+        self._buffered_feedback = []
+
+    def _write_feedback_as_text(self, feedback):
+        """
+        :type feedback: Feedback
+        """
+        file_name = shorten_file_name(feedback.get_source_file_name())
+
+        if file_name != self._file_with_written_header:
+            self._output_file.write(file_name + "\n")
+            self._file_with_written_header = file_name
+
+        self._output_file.write(format_feedback_as_text(feedback))
+
+
+def format_feedback_as_text(feedback):
+    """
+    :type feedback: Feedback
+    :rtype: str
+    """
+    return " - [{:3d}] {}\n         {}\n".format(feedback.get_line_number(), feedback.get_text(), feedback.get_code())
+
+
+def format_feedback_as_json(feedback):
+    """
+    :type feedback: Feedback
+    :rtype: str
+    """
+    return json.dumps(feedback_to_dict(feedback), sort_keys=True)
+
+
+def feedback_to_dict(feedback):
+    """
+    :type feedback: Feedback
+    :rtype: dict
+    """
+    return {
+        "file": feedback.get_source_file_name(),
+        "line": feedback.get_line_number(),
+        "type": feedback.get_type(),
+        "text": feedback.get_text(),
+        "code": feedback.get_code().rstrip("\r\n"),
+    }
+
+
+def shorten_file_name(file_name):
+    """
+    Shortens the file name to its last three path components.
+
+    :type file_name: str
+    :rtype: str
+    """
+    path_components = file_name.split('/')
+    last_three_path_components = path_components[-3:]
+
+    if len(last_three_path_components) < len(path_components):
+        return ".../" + "/".join(last_three_path_components)
+
+    return file_name
@@ -0,0 +1,328 @@
+"""
+Opt-in instrumentation of the analysis pipeline. While disabled, timers and counters are no-ops so the hot paths don't
+pay for them.
+"""
+import json
+import threading
+import time
+
+try:
+    process_time = time.process_time
+except AttributeError:
+    process_time = time.clock
+
+COUNTER_FILES = "files"
+COUNTER_PARSES = "parses"
+COUNTER_PARSE_FAILURES = "parse_failures"
+COUNTER_AT_CALLS = "at_calls"
+COUNTER_BOUNDING_BOX_COMPUTATIONS = "bounding_box_computations"
+
+FRAME_ANALYZE_FILE = "analyze_file"
+FRAME_LISTENERS = "listeners"
+FRAME_PARSE = "parse"
+
+FOLDED_STACK_SEPARATOR = ";"
+
+
+class AnalysisStats:
+    """
+    Wall and CPU time per stage, per file and per listener, and counts of expensive operations.
+    """
+
+    def __init__(self):
+        self._counters = {}  # type: dict[str, int]
+        self._stage_times = {}  # type: dict[tuple, list]
+        self._file_times = {}  # type: dict[str, list]
+
+    def increment(self, counter_name, amount=1):
+        """
+        :type counter_name: str
+        :type amount: int
+        """
+        self._counters[counter_name] = self._counters.get(counter_name, 0) + amount
+
+    def add_stage_time(self, stack, wall_time, cpu_time):
+        """
+        :param stack: Names of the stage and all stages it is nested in, outermost first
+        :type stack: tuple[str]
+        :type wall_time: float
+        :type cpu_time: float
+        """
+        _add_time(self._stage_times, stack, wall_time, cpu_time)
+
+    def add_file_time(self, file_path, wall_time, cpu_time):
+        """
+        :type file_path: str
+        :type wall_time: float
+        :type cpu_time: float
+        """
+        _add_time(self._file_times, file_path, wall_time, cpu_time)
+
+    def get_counter(self, counter_name):
+        """
+        :type counter_name: str
+        :rtype: int
+        """
+        return self._counters.get(counter_name, 0)
+
+    def get_counters(self):
+        """
+        :rtype: dict[str, int]
+        """
+        return self._counters
+
+    def get_stage_times(self):
+        """
+        :return: Wall time, CPU time and number of calls per stack of stages
+        :rtype: dict[tuple, (float, float, int)]
+        """
+        return dict((stack, tuple(times)) for stack, times in self._stage_times.iteritems())
+
+    def get_file_times(self):
+        """
+        :return: Wall time, CPU time and number of analyses per file
+        :rtype: dict[str, (float, float, int)]
+        """
+        return dict((file_path, tuple(times)) for file_path, times in self._file_times.iteritems())
+
+    def get_listener_times(self):
+        """
+        :return: Wall time, CPU time and number of calls per listener, including the parsing a listener caused
+        :rtype: dict[str, (float, float, int)]
+        """
+        listener_times = {}
+
+        for stack, times in self._stage_times.iteritems():
+            if len(stack) > 1 and stack[-2] == FRAME_LISTENERS:
+                _merge_time(listener_times, stack[-1], times)
+
+        return dict((listener_name, tuple(times)) for listener_name, times in listener_times.iteritems())
+
+    def get_total_stage_time(self, stage_name):
+        """
+        :return: Wall time and CPU time spent in the stage, wherever it was nested
+        :rtype: (float, float)
+        """
+        wall_time = 0.0
+        cpu_time = 0.0
+
+        for stack, (stack_wall_time, stack_cpu_time, _) in self._stage_times.iteritems():
+            # Nested occurrences of the same stage are already part of the outer one
+            if stack[-1] == stage_name and stage_name not in stack[:-1]:
+                wall_time += stack_wall_time
+                cpu_time += stack_cpu_time
+
+        return wall_time, cpu_time
+
+    def merge(self, other):
+        """
+        :type other: AnalysisStats
+        """
+        for counter_name, count in other._counters.iteritems():
+            self.increment(counter_name, count)
+
+        for stack, times in other._stage_times.iteritems():
+            _merge_time(self._stage_times, stack, times)
+
+        for file_path, times in other._file_times.iteritems():
+            _merge_time(self._file_times, file_path, times)
+
+    def to_json(self):
+        """
+        :rtype: str
+        """
+        return json.dumps({
+            "counters": self._counters,
+            "stages": [
+                {"stack": list(stack), "wall_time": wall_time, "cpu_time": cpu_time, "calls": calls}
+                for stack, (wall_time, cpu_time, calls) in sorted(self._stage_times.iteritems())
+            ],
+            "listeners": dict(
+                (listener_name, {"wall_time": wall_time, "cpu_time": cpu_time, "calls": calls})
+                for listener_name, (wall_time, cpu_time, calls) in self.get_listener_times().iteritems()
+            ),
+            "files": dict(
+                (file_path, {"wall_time": wall_time, "cpu_time": cpu_time})
+                for file_path, (wall_time, cpu_time, _) in self._file_times.iteritems()
+            ),
+        }, indent=4, sort_keys=True, separators=(",", ": "))
+
+    def to_folded_stacks(self):
+        """
+        Self wall time in microseconds per stack, in the folded format flamegraph.pl and speedscope read.
+
+        :rtype: str
+        """
+        self_times = dict((stack, times[0]) for stack, times in self._stage_times.iteritems())
+
+        for stack, times in self._stage_times.iteritems():
+            if stack[:-1] in self_times:
+                self_times[stack[:-1]] -= times[0]
+
+        return "".join(
+            "{} {}\n".format(FOLDED_STACK_SEPARATOR.join(stack), int(round(max(self_time, 0.0) * 1000000)))
+            for stack, self_time in sorted(self_times.iteritems())
+        )
+
+
+def _add_time(times_per_key, key, wall_time, cpu_time):
+    _merge_time(times_per_key, key, (wall_time, cpu_time, 1))
+
+
+def _merge_time(times_per_key, key, times):
+    if key not in times_per_key:
+        times_per_key[key] = list(times)
+        return
+
+    key_times = times_per_key[key]
+    key_times[0] += times[0]
+    key_times[1] += times[1]
+    key_times[2] += times[2]
+
+
+class _Timer:
+    def __init__(self, stats, frame, file_path=None):
+        """
+        :type stats: AnalysisStats
+        :type frame: str
+        :type file_path: str | None
+        """
+        self._stats = stats
+        self._frame = frame
+        self._file_path = file_path
+        self._stack = None
+        self._wall_start = None
+        self._cpu_start = None
+
+    def __enter__(self):
+        self._stack = _get_stack()
+        self._stack.append(self._frame)
+        self._wall_start = time.time()
+        self._cpu_start = process_time()
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        wall_time = time.time() - self._wall_start
+        cpu_time = process_time() - self._cpu_start
+
+        with _stats_lock:
+            self._stats.add_stage_time(tuple(self._stack), wall_time, cpu_time)
+            if self._file_path is not None:
+                self._stats.add_file_time(self._file_path, wall_time, cpu_time)
+
+        self._stack.pop()
+
+
+class _DisabledTimer:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exception_type, exception_value, traceback):
+        pass
+
+
+_stats = None  # type: AnalysisStats
+_disabled_timer = _DisabledTimer()
+_thread_state = threading.local()
+# Stages of a pipelined analysis run in several threads that share the stats
+_stats_lock = threading.Lock()
+
+
+def enable():
+    global _stats
+
+    if _stats is None:
+        _stats = AnalysisStats()
+
+
+def is_enabled():
+    """
+    :rtype: bool
+    """
+    return _stats is not None
+
+
+def get_stats():
+    """
+    :rtype: AnalysisStats | None
+    """
+    return _stats
+
+
+def pop_stats():
+    """
+    Returns the stats gathered so far and starts over, used to hand the stats of a worker process to its parent.
+
+    :rtype: AnalysisStats | None
+    """
+    global _stats
+
+    stats = _stats
+    if stats is not None:
+        _stats = AnalysisStats()
+
+    return stats
+
+
+def timer(frame):
+    """
+    Times the with block as a stage nested in the stages that are currently being timed.
+
+    :type frame: str
+    """
+    if _stats is None:
+        return _disabled_timer
+
+    return _Timer(_stats, frame)
+
+
+def file_timer(file_path):
+    """
+    Times the analysis of a single file.
+
+    :type file_path: str
+    """
+    if _stats is None:
+        return _disabled_timer
+
+    return _Timer(_stats, FRAME_ANALYZE_FILE, file_path)
+
+
+def time_iteration(iterable, frame):
+    """
+    Yields the items of the iterable, timing only the time spent producing them. Lets a lazily produced sequence be
+    timed as a stage even though it is consumed while other stages run.
+
+    :type iterable: collections.Iterable
+    :type frame: str
+    :rtype: collections.Iterable
+    """
+    iterator = iter(iterable)
+
+    while True:
+        with timer(frame):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+
+        yield item
+
+
+def count(counter_name, amount=1):
+    """
+    :type counter_name: str
+    :type amount: int
+    """
+    if _stats is not None:
+        with _stats_lock:
+            _stats.increment(counter_name, amount)
+
+
+def _get_stack():
+    """
+    :rtype: list[str]
+    """
+    if not hasattr(_thread_state, "stack"):
+        _thread_state.stack = []
+
+    return _thread_state.stack
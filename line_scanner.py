@@ -0,0 +1,115 @@
+"""
+Finds the lines that are wider than the maximum line length. The width of a line is the number of columns it takes up:
+its line ending isn't counted, tabs advance to the next tab stop and every UTF-8 encoded character counts once.
+
+With NumPy the lengths of all lines of a file are computed in bulk, so a file without lengthy lines is rejected without
+looking at its lines one by one. Without NumPy the lines are scanned one by one.
+"""
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TAB_SIZE = 8
+
+# Smaller contents are scanned line by line, for which NumPy's overhead per call isn't worth it
+VECTORIZED_SCAN_THRESHOLD_IN_BYTES = 4096
+
+_NEWLINE = ord("\n")
+_TAB = ord("\t")
+
+
+def find_lengthy_lines(contents, max_line_length):
+    """
+    :param contents: Contents of a source file
+    :type contents: str | mmap.mmap
+    :type max_line_length: int
+    :return: The numbers, starting at 1, of the lines wider than max_line_length
+    :rtype: list[int]
+    """
+    if numpy is not None and len(contents) >= VECTORIZED_SCAN_THRESHOLD_IN_BYTES:
+        return _find_lengthy_lines_vectorized(contents, max_line_length)
+
+    return _find_lengthy_lines_line_by_line(contents, max_line_length)
+
+
+def get_line_width(line):
+    """
+    :param line: A single line, with or without its line ending
+    :type line: str
+    :rtype: int
+    """
+    line = line.rstrip("\r\n")
+
+    try:
+        # Most lines are plain ASCII, which takes up a column per byte
+        text = line.decode("ascii")
+    except UnicodeDecodeError:
+        text = line.decode("utf-8", "replace")
+
+    if "\t" in text:
+        text = text.expandtabs(TAB_SIZE)
+
+    return len(text)
+
+
+def _find_lengthy_lines_line_by_line(contents, max_line_length):
+    """
+    :type contents: str | mmap.mmap
+    :type max_line_length: int
+    :rtype: list[int]
+    """
+    lengthy_line_numbers = []
+    line_start = 0
+    line_number = 1
+    contents_length = len(contents)
+
+    while line_start < contents_length:
+        line_end = contents.find("\n", line_start)
+        if line_end == -1:
+            line_end = contents_length
+
+        # A line takes up at most a column per byte, unless it contains tabs
+        if line_end - line_start > max_line_length or contents.find("\t", line_start, line_end) != -1:
+            if get_line_width(contents[line_start:line_end]) > max_line_length:
+                lengthy_line_numbers.append(line_number)
+
+        line_start = line_end + 1
+        line_number += 1
+
+    return lengthy_line_numbers
+
+
+def _find_lengthy_lines_vectorized(contents, max_line_length):
+    """
+    :type contents: str | mmap.mmap
+    :type max_line_length: int
+    :rtype: list[int]
+    """
+    data = numpy.frombuffer(contents, dtype=numpy.uint8)
+
+    newline_offsets = numpy.flatnonzero(data == _NEWLINE)
+    line_starts = numpy.concatenate(([0], newline_offsets + 1))
+    line_ends = numpy.concatenate((newline_offsets, [len(data)]))
+
+    # The width of a line is at most its length in bytes, plus the columns its tabs may skip
+    maximum_line_widths = line_ends - line_starts
+
+    is_tab = data == _TAB
+    if is_tab.any():
+        tabs_before_offset = numpy.concatenate(([0], numpy.cumsum(is_tab)))
+        tab_counts = tabs_before_offset[line_ends] - tabs_before_offset[line_starts]
+        maximum_line_widths = maximum_line_widths + tab_counts * (TAB_SIZE - 1)
+
+    candidate_indices = numpy.flatnonzero(maximum_line_widths > max_line_length)
+    if not len(candidate_indices):
+        return []
+
+    lengthy_line_numbers = []
+    for line_index in candidate_indices.tolist():
+        line = contents[int(line_starts[line_index]):int(line_ends[line_index])]
+
+        if get_line_width(line) > max_line_length:
+            lengthy_line_numbers.append(line_index + 1)
+
+    return lengthy_line_numbers
@@ -0,0 +1,337 @@
+import ast
+import logging
+import token
+import tokenize
+
+from parsing import ParsedSource
+from source_buffer import SourceBuffer
+
+NODE_TYPE_COMMENT = 'comment'
+
+# Statement types as RedBaron names them, so summaries and FST nodes can be told apart by the same type
+_statement_types = {
+    ast.FunctionDef: 'def',
+    ast.ClassDef: 'class',
+    ast.Assign: 'assignment',
+    ast.AugAssign: 'assignment',
+}
+
+# Operators that can end up in a BinaryOperatorNode. Unary plus and minus are counted as well, which only makes the
+# count an upper bound of the number of binary operators on the line
+_binary_operators = frozenset(['+', '-', '*', '/', '%', '**', '//', '<<', '>>', '&', '|', '^'])
+
+_non_code_token_types = frozenset([tokenize.COMMENT, tokenize.NL, token.NEWLINE, token.INDENT, token.DEDENT,
+                                   token.ENDMARKER])
+
+
+class AssignmentSummary:
+    def __init__(self, target_count, value_count):
+        """
+        :param target_count: Number of targets when assigning to a tuple or list, 1 otherwise
+        :type target_count: int
+        :param value_count: Number of values when assigning a tuple or list, 1 otherwise
+        :type value_count: int
+        """
+        self.target_count = target_count
+        self.value_count = value_count
+
+
+class FunctionDefinitionSummary:
+    def __init__(self, name, argument_count, argument_names, arguments_width):
+        """
+        :type name: str
+        :type argument_count: int
+        :param argument_names: Names of all arguments that are not unpacked tuples
+        :type argument_names: list[str]
+        :param arguments_width: Width of the arguments between the parentheses, as RedBaron measures it
+        :type arguments_width: int
+        """
+        self.name = name
+        self.argument_count = argument_count
+        self.argument_names = argument_names
+        self.arguments_width = arguments_width
+
+
+class LineSummary:
+    """
+    What can be told about a single line from its tokens and the stdlib AST, without building a RedBaron FST.
+    """
+
+    def __init__(self, statement_type, has_comment, has_code, operator_count, assignment, function_definition):
+        """
+        :param statement_type: Type of the outermost statement starting on the line, if any
+        :type statement_type: str | None
+        :type has_comment: bool
+        :type has_code: bool
+        :param operator_count: Upper bound of the number of binary operators on the line
+        :type operator_count: int
+        :type assignment: AssignmentSummary | None
+        :type function_definition: FunctionDefinitionSummary | None
+        """
+        self.statement_type = statement_type
+        self.has_comment = has_comment
+        self.has_code = has_code
+        self.operator_count = operator_count
+        self.assignment = assignment
+        self.function_definition = function_definition
+
+    def is_comment_only(self):
+        """
+        :rtype: bool
+        """
+        return self.has_comment and not self.has_code
+
+    def has_trailing_comment(self):
+        """
+        :rtype: bool
+        """
+        return self.has_comment and self.has_code
+
+
+class LineSummaryIndex:
+    """
+    Summaries of the given lines, gathered from the stdlib tokens and AST of the file.
+    """
+
+    def __init__(self, parsed_source, line_numbers):
+        """
+        :type parsed_source: ParsedSource
+        :type line_numbers: list[int]
+        """
+        self._line_summaries = {}  # type: dict[int, LineSummary]
+
+        try:
+            self._summarize_lines(parsed_source, line_numbers)
+        except (tokenize.TokenError, SyntaxError, TypeError, ValueError) as error:
+            # The stdlib parser raises TypeError rather than SyntaxError on a NUL byte. Listeners fall back to the FST
+            # for lines without a summary
+            logging.debug('Failed to summarize lines of {}: {}'.format(parsed_source.source_name, error))
+            self._line_summaries = {}
+
+    def get_line_summary(self, line_number):
+        """
+        :type line_number: int
+        :rtype: LineSummary | None
+        """
+        return self._line_summaries.get(line_number)
+
+    def _summarize_lines(self, parsed_source, line_numbers):
+        """
+        :type parsed_source: ParsedSource
+        :type line_numbers: list[int]
+        """
+        source_buffer = parsed_source.source_buffer
+        tokens = parsed_source.get_tokens()
+        module = parsed_source.get_ast()
+        lines = frozenset(line_numbers)
+
+        lines_with_comment, lines_with_code, operator_count_per_line = _scan_tokens(tokens, lines)
+        statements = [node for node in ast.walk(module) if isinstance(node, ast.stmt)]
+        function_definitions = [node for node in statements if isinstance(node, ast.FunctionDef)]
+        def_line_per_function, argument_span_per_function = _match_def_tokens(function_definitions, tokens)
+        statement_type_per_line = {}
+        assignment_per_line = {}
+        # On Python 2 a decorated function starts at its first decorator, the summaries are keyed on the 'def' line
+        # instead and the lines of the decorators are left to the FST
+        decorator_lines = set()
+
+        for function_definition, def_line in def_line_per_function.iteritems():
+            decorator_lines.update(xrange(function_definition.lineno, def_line))
+
+        for node in statements:
+            line_number = def_line_per_function.get(node, node.lineno)
+
+            if line_number in lines and line_number not in statement_type_per_line:
+                statement_type_per_line[line_number] = _statement_types.get(type(node), type(node).__name__.lower())
+
+            if isinstance(node, ast.Assign) and line_number in lines and line_number not in assignment_per_line:
+                assignment_per_line[line_number] = _summarize_assignment(node)
+
+        function_definition_per_line = _summarize_function_definitions(def_line_per_function,
+                                                                       argument_span_per_function, source_buffer,
+                                                                       lines)
+
+        for line_number in lines.difference(decorator_lines):
+            statement_type = statement_type_per_line.get(line_number)
+            has_comment = line_number in lines_with_comment
+            has_code = line_number in lines_with_code
+
+            if statement_type is None and has_comment and not has_code:
+                statement_type = NODE_TYPE_COMMENT
+
+            self._line_summaries[line_number] = LineSummary(
+                statement_type=statement_type,
+                has_comment=has_comment,
+                has_code=has_code,
+                operator_count=operator_count_per_line.get(line_number, 0),
+                assignment=assignment_per_line.get(line_number),
+                function_definition=function_definition_per_line.get(line_number)
+            )
+
+
+def _scan_tokens(tokens, lines):
+    """
+    :type lines: frozenset[int]
+    :rtype: (set[int], set[int], dict[int, int])
+    """
+    lines_with_comment = set()
+    lines_with_code = set()
+    operator_count_per_line = {}
+
+    for token_type, token_string, (start_line, _), (end_line, _), _ in tokens:
+        if token_type == tokenize.COMMENT:
+            lines_with_comment.add(start_line)
+        elif token_type not in _non_code_token_types:
+            # Multi-line strings count as code on every line they span
+            lines_with_code.update(xrange(start_line, end_line + 1))
+
+            if token_type == token.OP and token_string in _binary_operators and start_line in lines:
+                operator_count_per_line[start_line] = operator_count_per_line.get(start_line, 0) + 1
+
+    return lines_with_comment, lines_with_code, operator_count_per_line
+
+
+def _summarize_assignment(assign_node):
+    """
+    :type assign_node: ast.Assign
+    :rtype: AssignmentSummary
+    """
+    if len(assign_node.targets) != 1:
+        return AssignmentSummary(len(assign_node.targets), 1)
+
+    return AssignmentSummary(_count_elements(assign_node.targets[0]), _count_elements(assign_node.value))
+
+
+def _count_elements(node):
+    if isinstance(node, (ast.Tuple, ast.List)):
+        return len(node.elts)
+
+    return 1
+
+
+def _match_def_tokens(function_definitions, tokens):
+    """
+    Every 'def' keyword belongs to exactly one FunctionDef, in source order, which is how the line of the keyword and
+    the positions of the arguments are matched with the AST nodes.
+
+    :type function_definitions: list[ast.FunctionDef]
+    :return: The line of the 'def' keyword and the span of the arguments per function definition
+    :rtype: (dict[ast.FunctionDef, int], dict[ast.FunctionDef, ((int, int), (int, int))])
+    """
+    function_definitions = sorted(function_definitions, key=lambda node: (node.lineno, node.col_offset))
+    def_line_per_function = {}
+    argument_span_per_function = {}
+
+    for function_definition, (def_line, argument_span) in zip(function_definitions, _find_argument_spans(tokens)):
+        def_line_per_function[function_definition] = def_line
+        argument_span_per_function[function_definition] = argument_span
+
+    return def_line_per_function, argument_span_per_function
+
+
+def get_definition_lines(module, tokens):
+    """
+    On Python 2 a decorated function or class starts at its first decorator. Like every 'def' keyword belongs to
+    exactly one FunctionDef, every 'class' keyword belongs to exactly one ClassDef, in source order.
+
+    :type module: ast.Module
+    :return: The line of the 'def' or 'class' keyword per function and class definition
+    :rtype: dict[ast.FunctionDef | ast.ClassDef, int]
+    """
+    function_definitions = []
+    class_definitions = []
+
+    for node in ast.walk(module):
+        if isinstance(node, ast.FunctionDef):
+            function_definitions.append(node)
+        elif isinstance(node, ast.ClassDef):
+            class_definitions.append(node)
+
+    definition_lines, _ = _match_def_tokens(function_definitions, tokens)
+    class_lines = [start_line for token_type, token_string, (start_line, _), _, _ in tokens
+                   if token_type == token.NAME and token_string == 'class']
+    class_definitions.sort(key=lambda node: (node.lineno, node.col_offset))
+    definition_lines.update(zip(class_definitions, class_lines))
+
+    return definition_lines
+
+
+def _summarize_function_definitions(def_line_per_function, argument_span_per_function, source_buffer, lines):
+    """
+    :type def_line_per_function: dict[ast.FunctionDef, int]
+    :type argument_span_per_function: dict[ast.FunctionDef, ((int, int), (int, int))]
+    :type source_buffer: SourceBuffer
+    :type lines: frozenset[int]
+    :return: Summaries keyed on the line of the 'def' keyword
+    :rtype: dict[int, FunctionDefinitionSummary]
+    """
+    function_definition_per_line = {}
+
+    for function_definition, def_line in def_line_per_function.iteritems():
+        if def_line not in lines:
+            continue
+
+        arguments = function_definition.args
+        argument_names = [argument.id for argument in arguments.args if isinstance(argument, ast.Name)]
+        argument_names += [name for name in (arguments.vararg, arguments.kwarg) if name]
+        argument_count = len(arguments.args) + (1 if arguments.vararg else 0) + (1 if arguments.kwarg else 0)
+
+        function_definition_per_line[def_line] = FunctionDefinitionSummary(
+            name=function_definition.name,
+            argument_count=argument_count,
+            argument_names=argument_names,
+            arguments_width=_get_arguments_width(source_buffer, argument_span_per_function[function_definition])
+        )
+
+    return function_definition_per_line
+
+
+def _find_argument_spans(tokens):
+    """
+    :return: Line of the 'def' keyword and start and end position of the text between the parentheses of every function
+        definition
+    :rtype: list[(int, ((int, int), (int, int)))]
+    """
+    argument_spans = []
+    token_iterator = iter(tokens)
+
+    for token_type, token_string, (def_line, _), _, _ in token_iterator:
+        if token_type != token.NAME or token_string != 'def':
+            continue
+
+        next(token_iterator)  # Name of the function
+        _, _, _, arguments_start, _ = next(token_iterator)  # Opening parenthesis
+        depth = 1
+
+        for token_type, token_string, token_start, _, _ in token_iterator:
+            if token_type != token.OP:
+                continue
+
+            if token_string in '([{':
+                depth += 1
+            elif token_string in ')]}':
+                depth -= 1
+
+            if depth == 0:
+                argument_spans.append((def_line, (arguments_start, token_start)))
+                break
+
+    return argument_spans
+
+
+def _get_arguments_width(source_buffer, argument_span):
+    """
+    RedBaron measures the width of the arguments from the first column of their bounding box to the last column of
+    the last line they are on, which includes the indentation when the arguments span multiple lines.
+
+    :type source_buffer: SourceBuffer
+    :rtype: int
+    """
+    (start_line, start_column), (end_line, end_column) = argument_span
+
+    if start_line == end_line:
+        arguments_text = source_buffer.get_line(start_line)[start_column:end_column].strip()
+    else:
+        arguments_text = source_buffer.get_line(end_line)[:end_column].rstrip()
+
+    return max(len(arguments_text) - 1, 0)
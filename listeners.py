@@ -1,16 +1,21 @@
+import os
 from abc import abstractmethod
 
-import logging
-
 import feedback
 from contexts import LineLengthExceededContext
+from corpus_stats import CorpusStats, get_student
 from feedback import FeedbackFactory
-from redbaron import Node
+from line_scanner import get_line_width
+from line_summary import LineSummary
+from node_index import FailedToResolveLineNumberException, LineNodeIndex, iter_rendered_parts
+from redbaron import Node, NodeList
+from rules import DEFAULT_RULE_SET, RuleSet
 
 NODE_TYPE_COMMENT = 'comment'
 NODE_TYPE_ASSIGNMENT = 'assignment'
 NODE_TYPE_TUPLE = 'tuple'
 NODE_TYPE_FUNCTION_DEFINITION = 'def'
+NODE_TYPE_BINARY_OPERATOR = 'binary_operator'
 
 
 class LineLengthExceededListener:
@@ -24,6 +29,38 @@ class LineLengthExceededListener:
         """
         raise NotImplementedError("Method on_line_length_exceeded must be implemented")
 
+    def get_handled_node_types(self):
+        """
+        Returns the types of the first node on a line this listener handles, the analyzer only notifies it of lengthy
+        lines starting with one of those. Listeners returning None are notified of every lengthy line.
+
+        :rtype: list[str] | None
+        """
+        return None
+
+    def get_configuration(self):
+        """
+        Describes everything that influences the feedback of this listener.
+
+        :rtype: str
+        """
+        return self.__class__.__name__
+
+    def export_file_state(self, file_name):
+        """
+        Returns the state this listener gathered for a single file, so it can be merged into a listener living in
+        another process. Listeners that only emit feedback have no state to export.
+
+        :type file_name: str
+        """
+        return None
+
+    def merge_file_state(self, file_name, state):
+        """
+        :type file_name: str
+        """
+        pass
+
 
 class LineLengthExceededListenerTemplate(LineLengthExceededListener):
     """
@@ -39,6 +76,9 @@ class LineLengthExceededListenerTemplate(LineLengthExceededListener):
         """
         :type context: LineLengthExceededContext 
         """
+        if context.line_summary is not None and self._gather_feedback_from_line_summary(context.line_summary, context):
+            return
+
         try:
             first_node_on_line = _get_first_node_on_line(context)
 
@@ -49,12 +89,25 @@ class LineLengthExceededListenerTemplate(LineLengthExceededListener):
         except FailedToResolveLineNumberException:
             return
 
+    def _gather_feedback_from_line_summary(self, line_summary, context):
+        """
+        Gathers feedback without parsing the file with RedBaron. Listeners that need FST-level detail for the line
+        return False, after which _gather_feedback is called with the first node on the line.
+
+        :type line_summary: LineSummary
+        :type context: LineLengthExceededContext
+        :rtype: bool
+        """
+        return False
+
     def _accepts_first_node_on_line(self, first_node_on_line):
         """
         :type first_node_on_line: Node 
         :rtype: bool
         """
-        return True
+        handled_node_types = self.get_handled_node_types()
+
+        return handled_node_types is None or first_node_on_line.type in handled_node_types
 
     @abstractmethod
     def _gather_feedback(self, first_node_on_line, context):
@@ -84,6 +137,24 @@ class LineLengthViolationCounter(LineLengthExceededListener):
         else:
             self._line_length_violations_per_file[source_file_name] += 1
 
+    def export_file_state(self, file_name):
+        """
+        :type file_name: str
+        :rtype: int
+        """
+        return self.get_violation_count_for_file(file_name)
+
+    def merge_file_state(self, file_name, state):
+        """
+        :type file_name: str
+        :type state: int
+        """
+        if not state:
+            return
+
+        self._line_length_violations += state
+        self._line_length_violations_per_file[file_name] = self.get_violation_count_for_file(file_name) + state
+
     def get_total_violation_count(self):
         """
         :rtype: int 
@@ -106,16 +177,140 @@ class LineLengthViolationCounter(LineLengthExceededListener):
         """
         return self._line_length_violations_per_file
 
+    def pop_violation_count_for_file(self, file_name):
+        """
+        Returns the count of the file and forgets about the file, so a long-running process doesn't keep the count of
+        every file it ever analyzed.
+
+        :type file_name: str
+        :rtype: int
+        """
+        return self._line_length_violations_per_file.pop(file_name, 0)
+
+
+class CorpusStatsCollector(LineLengthExceededListener, feedback.FeedbackListener):
+    """
+    Gathers CorpusStats over all analyzed files. Only the lengthy lines and feedback of the file that is being analyzed
+    are held, they are added to the statistics when the file has ended. It has to listen to the feedback as well as
+    to the lengthy lines.
+    """
+
+    def __init__(self, corpus_path, corpus_stats=None):
+        """
+        :param corpus_path: Directory with a directory per student
+        :type corpus_path: str
+        :type corpus_stats: CorpusStats | None
+        """
+        LineLengthExceededListener.__init__(self)
+        feedback.FeedbackListener.__init__(self)
+        self._corpus_path = os.path.abspath(corpus_path)
+        self._corpus_stats = corpus_stats or CorpusStats()
+        self._file_name = None  # type: str | None
+        self._lengthy_line_lengths = []  # type: list[int]
+        self._feedback_types = []  # type: list[str]
+
+    def on_line_length_exceeded(self, context):
+        """
+        :type context: LineLengthExceededContext
+        """
+        self._start_file(context.file_context.source_file_name)
+        # Measured like the line length check measures the line
+        self._lengthy_line_lengths.append(get_line_width(context.file_context.line_content))
+
+    def on_feedback(self, feedback_item):
+        """
+        :type feedback_item: feedback.Feedback
+        """
+        self._start_file(feedback_item.get_source_file_name())
+        self._feedback_types.append(feedback_item.get_type())
+
+    def on_file_end(self, source_file_name):
+        """
+        :type source_file_name: str
+        """
+        self._start_file(source_file_name)
+        self._corpus_stats.add_file(source_file_name, get_student(source_file_name, self._corpus_path),
+                                    self._lengthy_line_lengths, self._feedback_types)
+        self._file_name = None
+
+    def export_file_state(self, file_name):
+        """
+        :type file_name: str
+        :return: Lengths of the lengthy lines of the file
+        :rtype: list[int]
+        """
+        if file_name != self._file_name:
+            return []
+
+        return list(self._lengthy_line_lengths)
+
+    def merge_file_state(self, file_name, state):
+        """
+        :type file_name: str
+        :type state: list[int]
+        """
+        self._start_file(file_name)
+        self._lengthy_line_lengths.extend(state)
+
+    def get_corpus_stats(self):
+        """
+        :rtype: CorpusStats
+        """
+        return self._corpus_stats
+
+    def _start_file(self, file_name):
+        """
+        Forgets what was gathered for an earlier file, which may not have ended in this process.
+
+        :type file_name: str
+        """
+        if file_name != self._file_name:
+            self._file_name = file_name
+            self._lengthy_line_lengths = []
+            self._feedback_types = []
+
 
 class LineLengthViolationFunctionDefinitionListener(LineLengthExceededListenerTemplate):
-    def __init__(self):
+    def __init__(self, rule_set=DEFAULT_RULE_SET):
+        """
+        :type rule_set: RuleSet
+        """
         LineLengthExceededListenerTemplate.__init__(self)
+        self._rule_set = rule_set
 
-    def _accepts_first_node_on_line(self, first_node_on_line):
+    def get_configuration(self):
         """
-        :type first_node_on_line: Node 
+        :rtype: str
+        """
+        return "{}({!r})".format(self.__class__.__name__, self._rule_set)
+
+    def get_handled_node_types(self):
+        """
+        :rtype: list[str]
+        """
+        return [NODE_TYPE_FUNCTION_DEFINITION]
+
+    def _gather_feedback_from_line_summary(self, line_summary, context):
+        """
+        :type line_summary: LineSummary
+        :type context: LineLengthExceededContext
+        :rtype: bool
         """
-        return first_node_on_line.type == NODE_TYPE_FUNCTION_DEFINITION
+        function_definition = line_summary.function_definition
+
+        if function_definition is not None:
+            max_argument_name_length = self._rule_set.max_argument_name_length
+            long_argument_count = 0
+            for argument_name in function_definition.argument_names:
+                if len(argument_name) > max_argument_name_length:
+                    long_argument_count += 1
+
+            self._emit_function_definition_feedback(
+                context, len(function_definition.name), function_definition.arguments_width,
+                function_definition.argument_count, long_argument_count
+            )
+
+        return True
 
     def _gather_feedback(self, first_node_on_line, context):
         """
@@ -129,21 +324,53 @@ class LineLengthViolationFunctionDefinitionListener(LineLengthExceededListenerTe
         :type fundef_node: Node
         :type context: LineLengthExceededContext
         """
-        # TODO: Retrieve max line length from config or something
-        if len(fundef_node.name) > 100 / 2:
+        max_argument_name_length = self._rule_set.max_argument_name_length
+        long_argument_count = 0
+        for argument_name in self._get_argument_names(fundef_node):
+            if len(argument_name) > max_argument_name_length:
+                long_argument_count += 1
+
+        self._emit_function_definition_feedback(
+            context, len(fundef_node.name), context.line_node_index.get_node_width(fundef_node.arguments),
+            len(fundef_node.arguments), long_argument_count
+        )
+
+    @staticmethod
+    def _get_argument_names(fundef_node):
+        """
+        The same names as the line summary has, those of all arguments that are not unpacked tuples.
+
+        :type fundef_node: Node
+        :rtype: list[str]
+        """
+        argument_names = []
+        for argument_node in fundef_node.arguments:
+            # Regular arguments have a target, the name of *args and **kwargs is their value
+            name_node = argument_node.target if argument_node.type == 'def_argument' else argument_node.value
+            if name_node.type == 'name':
+                argument_names.append(name_node.value)
+
+        return argument_names
+
+    def _emit_function_definition_feedback(self, context, name_length, arguments_width, argument_count,
+                                           long_argument_count):
+        """
+        :type context: LineLengthExceededContext
+        :type name_length: int
+        :type arguments_width: int
+        :type argument_count: int
+        :type long_argument_count: int
+        """
+        rule_set = self._rule_set
+
+        if name_length > rule_set.max_function_name_length:
             feedback.emit(self._feedback_factory.fundef_long_name(context.file_context))
 
-        if _get_node_width(fundef_node.arguments) > 100 / 2:
-            argument_count = len(fundef_node.arguments)
-            if argument_count > 4:
+        if arguments_width > rule_set.max_arguments_width:
+            if argument_count > rule_set.max_argument_count:
                 feedback.emit(self._feedback_factory.fundef_many_arguments(context.file_context, argument_count))
 
-            long_argument_count = 0
-            for argument_node in fundef_node.arguments:
-                if len(argument_node.target.value) > 25:
-                    long_argument_count += 1
-
-            if long_argument_count > 1:
+            if long_argument_count > rule_set.max_long_argument_count:
                 feedback.emit(self._feedback_factory.fundef_long_arguments(context.file_context, long_argument_count))
 
 
@@ -151,59 +378,90 @@ class LineLengthViolationMultiAssignmentListener(LineLengthExceededListenerTempl
     def __init__(self):
         LineLengthExceededListenerTemplate.__init__(self)
 
-    def _accepts_first_node_on_line(self, first_node_on_line):
+    def get_handled_node_types(self):
         """
-        :type first_node_on_line: Node 
+        :rtype: list[str]
         """
-        return first_node_on_line.type == NODE_TYPE_ASSIGNMENT
+        return [NODE_TYPE_ASSIGNMENT]
+
+    def _gather_feedback_from_line_summary(self, line_summary, context):
+        """
+        :type line_summary: LineSummary
+        :type context: LineLengthExceededContext
+        :rtype: bool
+        """
+        assignment = line_summary.assignment
+
+        if assignment is not None:
+            self._inspect_assignment(assignment.target_count, assignment.value_count, context)
+
+        return True
 
     def _gather_feedback(self, first_node_on_line, context):
         """
         :type first_node_on_line: Node 
         :type context: LineLengthExceededContext
         """
-        number_of_targets = len(first_node_on_line.target.value)
-        number_of_values = len(first_node_on_line.value.value)
+        number_of_targets = self._count_elements(first_node_on_line.target)
+        number_of_values = self._count_elements(first_node_on_line.value)
+
+        self._inspect_assignment(number_of_targets, number_of_values, context)
+
+    @staticmethod
+    def _count_elements(node):
+        """
+        Counted like the line summary counts them, only the elements of a tuple or list are counted separately.
+
+        :type node: Node
+        :rtype: int
+        """
+        if node.type in ('tuple', 'list'):
+            return len(node.value)
 
+        return 1
+
+    def _inspect_assignment(self, number_of_targets, number_of_values, context):
+        """
+        :type number_of_targets: int
+        :type number_of_values: int
+        :type context: LineLengthExceededContext
+        """
         if number_of_targets > 1 and number_of_targets == number_of_values:
             assignment_feedback = self._feedback_factory.multi_assignment(context.file_context)
             feedback.emit(assignment_feedback)
 
 
 class LineLengthViolationExtractVariableListener(LineLengthExceededListener):
-    def __init__(self):
+    def __init__(self, rule_set=DEFAULT_RULE_SET):
+        """
+        :type rule_set: RuleSet
+        """
         LineLengthExceededListener.__init__(self)
         self._feedback_factory = FeedbackFactory()
+        self._max_binary_operators = rule_set.max_binary_operators
+
+    def get_configuration(self):
+        """
+        :rtype: str
+        """
+        return "{}(max_binary_operators={})".format(self.__class__.__name__, self._max_binary_operators)
 
     def on_line_length_exceeded(self, context):
         """
         :type context: LineLengthExceededContext 
         """
+        # Lines without enough operators can't contain enough binary operators, so they don't need to be parsed
+        if context.line_summary is not None and context.line_summary.operator_count <= self._max_binary_operators:
+            return
+
         try:
             first_node_on_line = _get_first_node_on_line(context)
         except FailedToResolveLineNumberException:
             return
 
-        if self._count_all_binops_on_same_line(first_node_on_line) > 4:
+        if _count_binops_on_first_line(first_node_on_line, self._max_binary_operators) > self._max_binary_operators:
             feedback.emit(self._feedback_factory.extract_variable(context.file_context))
 
-    def _count_all_binops_on_same_line(self, node):
-        return len(self._find_all_binops_on_same_line(node))
-
-    def _find_all_binops_on_same_line(self, node):
-        """
-        :type node: Node 
-        :rtype: list[Node] 
-        """
-        binop_nodes_on_same_line = []
-        binop_nodes = node.find_all('BinaryOperatorNode')
-
-        for binop_node in binop_nodes:
-            if _nodes_are_on_same_line(node, binop_node):
-                binop_nodes_on_same_line.append(binop_node)
-
-        return binop_nodes_on_same_line
-
 
 class LineLengthExceededListenerForComments(LineLengthExceededListener):
     def __init__(self):
@@ -214,20 +472,31 @@ class LineLengthExceededListenerForComments(LineLengthExceededListener):
         """
         :type context: LineLengthExceededContext 
         """
+        if context.line_summary is not None:
+            self._detect_comments_from_line_summary(context.line_summary, context)
+            return
+
         # TODO: Find a way to find comments after if statements (same line)
         try:
-            first_node_on_line = _get_first_node_on_line(context)
-
-            self._detect_comments(first_node_on_line, context)
+            self._detect_comments(context)
         except FailedToResolveLineNumberException:
             pass
 
-    def _detect_comments(self, node, context):
+    def _detect_comments_from_line_summary(self, line_summary, context):
+        """
+        :type line_summary: LineSummary
+        :type context: LineLengthExceededContext
+        """
+        if line_summary.is_comment_only():
+            feedback.emit(self._feedback_factory.comment(context.file_context))
+        elif line_summary.has_trailing_comment():
+            feedback.emit(self._feedback_factory.comment_after_statement(context.file_context))
+
+    def _detect_comments(self, context):
         """
-        :type node: Node 
         :type context: LineLengthExceededContext
         """
-        nodes_on_same_line = _get_nodes_on_same_line(node)
+        nodes_on_same_line = _get_nodes_on_same_line(context)
 
         if len(nodes_on_same_line) == 1 and nodes_on_same_line[0].type == NODE_TYPE_COMMENT:
             comment_feedback = self._feedback_factory.comment(context.file_context)
@@ -237,87 +506,67 @@ class LineLengthExceededListenerForComments(LineLengthExceededListener):
             feedback.emit(comment_feedback)
 
 
-class FailedToResolveLineNumberException(Exception):
-    pass
-
-
-# TODO: Move elsewhere
-def _get_node_width(node):
+def _count_binops_on_first_line(node, limit):
     """
-    :type node: Node
-    :rtype: int 
-    """
-    return node.bounding_box.bottom_right.column - node.bounding_box.top_left.column
-
+    Counts the binary operators in the node that start on the line the node starts on. Only the part of the node on
+    that line is visited, and counting stops once the count exceeds the limit.
 
-# TODO: Move elsewhere
-def _get_nodes_on_same_line(node):
-    """
-    :type node: Node 
-    :rtype: list[Node] 
+    :type node: Node
+    :type limit: int
+    :return: The number of binary operators, at most limit + 1
+    :rtype: int
     """
-    nodes_on_same_line = []
-    current_node = node
-
-    while _nodes_are_on_same_line(node, current_node):
-        nodes_on_same_line.append(current_node)
-
-        tmp_node = current_node.next
-        if not tmp_node:
-            tmp_node = current_node.next_intuitive
+    binop_count = 0
 
-        current_node = tmp_node
+    for rendered_node, rendered_text in _iter_in_rendering_order(node):
+        if rendered_text is None:
+            if rendered_node.type == NODE_TYPE_BINARY_OPERATOR:
+                binop_count += 1
+                if binop_count > limit:
+                    break
+        elif "\n" in rendered_text:
+            break
 
-    return nodes_on_same_line
+    return binop_count
 
 
-# TODO: Move elsewhere
-def _get_first_node_on_line(context):
-    """
-    :type context: LineLengthExceededContext
-    :rtype: Node
+def _iter_in_rendering_order(node):
     """
-    line_number = context.file_context.line_number
-    redbaron_fst = context.source_file_fst
+    Walks the node the way RedBaron renders it, without rendering the parts that aren't reached. Yields (node, None)
+    when entering a node and (node, text) for every piece of text rendered by the node itself.
 
-    try:
-        return redbaron_fst.at(line_number)
-    except IndexError:
-        # Sometimes RedBaron doesn't understand multi-line strings correctly
-        file_name = context.file_context.source_file_name
-        logging.warn('RedBaron failed to find a node on line {} in file {}'.format(line_number, file_name))
+    :type node: Node
+    :rtype: collections.Iterable[(Node, str | None)]
+    """
+    yield node, None
 
-        raise FailedToResolveLineNumberException()
+    for part in iter_rendered_parts(node):
+        if isinstance(part, basestring):
+            yield node, part
+        elif isinstance(part, Node):
+            for rendered in _iter_in_rendering_order(part):
+                yield rendered
+        elif isinstance(part, (NodeList, list)):
+            for child_node in part:
+                if isinstance(child_node, Node):
+                    for rendered in _iter_in_rendering_order(child_node):
+                        yield rendered
 
 
 # TODO: Move elsewhere
-def _nodes_are_on_same_line(node, other_node):
+def _get_nodes_on_same_line(context):
     """
-    :type node: Node 
-    :type other_node: Node 
-    :rtype: bool 
+    :type context: LineLengthExceededContext
+    :rtype: list[Node] 
     """
-    if not node or not other_node:
-        return False
-
-    if not _node_is_on_single_line(node) or not _node_is_on_single_line(other_node):
-        return False
-
-    node_box = node.absolute_bounding_box
-    other_node_box = other_node.absolute_bounding_box
-
-    if node_box.top_left.line != other_node_box.top_left.line:
-        return False
-
-    return node_box.bottom_right.line == other_node_box.bottom_right.line
+    return context.line_node_index.get_nodes_on_line(context.file_context.line_number)
 
 
 # TODO: Move elsewhere
-def _node_is_on_single_line(node):
+def _get_first_node_on_line(context):
     """
-    :type node: Node
-    :rtype: bool
+    :type context: LineLengthExceededContext
+    :rtype: Node
     """
-    bounding_box = node.absolute_bounding_box
+    return context.line_node_index.get_first_node_on_line(context.file_context.line_number)
 
-    return bounding_box.top_left.line == bounding_box.bottom_right.line
@@ -1,127 +1,1174 @@
 # coding=utf-8
 import argparse
 
-from baron import ParsingError
-from redbaron import RedBaron
 import abc
+import collections
+import fnmatch
+import functools
+import hashlib
+import multiprocessing
 import os
 import logging
+import Queue
+import stat
+import sys
+import threading
 import feedback
+import instrumentation
+import tracing
 
 # TODO: requirements.txt/setup.py for pip
 from contexts import LineLengthExceededContext, FileContext
-from listeners import LineLengthExceededListenerForComments, LineLengthViolationCounter, \
+from line_scanner import find_lengthy_lines
+from line_summary import LineSummaryIndex
+from node_index import FailedToResolveLineNumberException, LineNodeIndex
+from corpus_stats import CorpusStats
+from listeners import CorpusStatsCollector, LineLengthExceededListenerForComments, LineLengthViolationCounter, \
     LineLengthViolationExtractVariableListener, LineLengthViolationMultiAssignmentListener, \
     LineLengthViolationFunctionDefinitionListener
+from cache import ResultCache
+from manifest import AnalysisManifest
+from parsing import DEFAULT_PARSER, IsolatedParser, ParsedSource, ParseQuarantine, QuarantiningParser
+from pipeline import AnalysisPipeline
+from quality_rules import QualityRuleEngine, create_quality_rule_engine
+from results import DeduplicationIndex, FileAnalysisResult
+from rules import DEFAULT_RULE_SET, InvalidRuleSetException, RuleSet, load_rule_set, parse_rule_override
+from source_buffer import SourceBuffer
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+__version__ = "0.1.0"
+
+
+# Directories that students commit along with their code, but that never contain code of their own
+DEFAULT_PRUNED_DIRECTORY_NAMES = frozenset([
+    ".git", ".hg", ".svn", ".tox", ".venv", "venv", "__pycache__", "node_modules",
+])
 
 
 class SourceCodeFileFinder:
-    def __init__(self):
-        pass
+    def __init__(self, include_patterns=("*.py",), exclude_patterns=(),
+                 pruned_directory_names=DEFAULT_PRUNED_DIRECTORY_NAMES, max_depth=None, follow_symlinks=False,
+                 threads=1):
+        """
+        Patterns containing a "/" are matched against the path relative to the searched directory, other patterns
+        against the name of the file or directory.
+
+        :param include_patterns: Glob patterns of the files to find
+        :type include_patterns: collections.Iterable[str]
+        :param exclude_patterns: Glob patterns of the files and directories to skip
+        :type exclude_patterns: collections.Iterable[str]
+        :param pruned_directory_names: Names of the directories that are never entered
+        :type pruned_directory_names: collections.Iterable[str]
+        :param max_depth: How many levels of subdirectories are searched, all of them if None
+        :type max_depth: int | None
+        :param follow_symlinks: Whether symbolic links to directories are followed, links that lead back to a directory
+                                that is being searched are skipped
+        :type follow_symlinks: bool
+        :param threads: Number of threads that search the subdirectories of the searched directory concurrently
+        :type threads: int
+        """
+        self._include_patterns = list(include_patterns)
+        self._exclude_patterns = list(exclude_patterns)
+        self._pruned_directory_names = frozenset(pruned_directory_names)
+        self._max_depth = max_depth
+        self._follow_symlinks = follow_symlinks
+        self._threads = threads
 
     def find_python_files_in_directory(self, directory_path, recursively=True):
-        # TODO: Actually listen to recursively parameter
-        absolute_file_paths = []
+        """
+        Yields the absolute paths of the files in the directory, while the directory is still being searched.
+        Files are yielded in the order of os.walk, also when the subdirectories are searched concurrently.
+
+        :type directory_path: str
+        :type recursively: bool
+        :rtype: collections.Iterable[str]
+        """
+        max_depth = self._max_depth if recursively else 0
+        absolute_directory_path = os.path.abspath(directory_path)
+        ancestors = frozenset([_get_directory_identity(absolute_directory_path)])
 
-        for file_path in self._yield_all_absolute_file_paths_in_directory(directory_path):
-            if file_path.endswith(".py"):
-                absolute_file_paths.append(file_path)
+        if self._threads <= 1:
+            return self._yield_file_paths(absolute_directory_path, "", 0, max_depth, ancestors)
+
+        return self._yield_file_paths_concurrently(absolute_directory_path, max_depth, ancestors)
+
+    def _yield_file_paths(self, directory_path, relative_directory_path, depth, max_depth, ancestors,
+                          stop_event=None):
+        """
+        :param relative_directory_path: The path of the directory relative to the searched directory, ending in "/"
+                                        unless it is the searched directory itself
+        :type relative_directory_path: str
+        :param ancestors: Identities of the directory and the directories above it, up to the searched directory
+        :type ancestors: frozenset[(int, int)]
+        :type stop_event: threading.Event | None
+        :rtype: collections.Iterable[str]
+        """
+        subdirectory_entries = []
+
+        for entry in self._scan_directory(directory_path, relative_directory_path, depth, max_depth):
+            if entry.is_dir():
+                subdirectory_entries.append(entry)
+            else:
+                yield entry.path
+
+        for entry in subdirectory_entries:
+            if stop_event is not None and stop_event.is_set():
+                return
+
+            subdirectory_ancestors = self._get_subdirectory_ancestors(entry, ancestors)
+            if subdirectory_ancestors is None:
+                continue
+
+            for file_path in self._yield_file_paths(entry.path, relative_directory_path + entry.name + "/", depth + 1,
+                                                    max_depth, subdirectory_ancestors, stop_event):
+                yield file_path
+
+    def _yield_file_paths_concurrently(self, directory_path, max_depth, ancestors):
+        """
+        Yields the files directly in the directory, then searches each of its subdirectories in one of the threads.
+        The files of a subdirectory are yielded as soon as they are found, once those of the previous subdirectories
+        have been yielded.
+
+        :type directory_path: str
+        :type max_depth: int | None
+        :type ancestors: frozenset[(int, int)]
+        :rtype: collections.Iterable[str]
+        """
+        subdirectory_entries = []
 
-        return absolute_file_paths
+        for entry in self._scan_directory(directory_path, "", 0, max_depth):
+            if entry.is_dir():
+                subdirectory_entries.append(entry)
+            else:
+                yield entry.path
+
+        searches = Queue.Queue()
+        found_file_path_queues = []
+
+        for entry in subdirectory_entries:
+            found_file_path_queue = Queue.Queue()
+            found_file_path_queues.append(found_file_path_queue)
+            searches.put((entry, found_file_path_queue))
+
+        stop_event = threading.Event()
+
+        def search_subdirectories():
+            while not stop_event.is_set():
+                try:
+                    subdirectory_entry, file_path_queue = searches.get_nowait()
+                except Queue.Empty:
+                    return
+
+                try:
+                    subdirectory_ancestors = self._get_subdirectory_ancestors(subdirectory_entry, ancestors)
+                    if subdirectory_ancestors is not None:
+                        for found_file_path in self._yield_file_paths(
+                                subdirectory_entry.path, subdirectory_entry.name + "/", 1, max_depth,
+                                subdirectory_ancestors, stop_event):
+                            file_path_queue.put(found_file_path)
+                except Exception:
+                    file_path_queue.put(_SearchFailure(sys.exc_info()))
+                finally:
+                    file_path_queue.put(_SEARCH_FINISHED)
+
+        for _ in xrange(min(self._threads, len(subdirectory_entries))):
+            search_thread = threading.Thread(target=search_subdirectories, name="SourceCodeFileFinder")
+            search_thread.daemon = True
+            search_thread.start()
+
+        try:
+            for found_file_path_queue in found_file_path_queues:
+                while True:
+                    found_file_path = found_file_path_queue.get()
+
+                    if found_file_path is _SEARCH_FINISHED:
+                        break
+                    if isinstance(found_file_path, _SearchFailure):
+                        found_file_path.reraise()
+
+                    yield found_file_path
+        finally:
+            # Stops the threads when the search is abandoned or failed
+            stop_event.set()
+
+    def _scan_directory(self, directory_path, relative_directory_path, depth, max_depth):
+        """
+        Yields the entries of the directory that are either files to find or subdirectories to search.
+
+        :type directory_path: str
+        :type relative_directory_path: str
+        :type depth: int
+        :type max_depth: int | None
+        :rtype: collections.Iterable[os.DirEntry]
+        """
+        try:
+            entries = _scandir(directory_path)
+        except OSError as error:
+            logging.warning('Skipping directory "{}": {}'.format(directory_path, error))
+            return
+
+        may_descend = max_depth is None or depth < max_depth
+
+        for entry in entries:
+            name = entry.name
+
+            try:
+                is_directory = entry.is_dir()
+            except OSError:
+                continue
+
+            if is_directory:
+                if not may_descend or name in self._pruned_directory_names:
+                    continue
+                if not self._follow_symlinks and entry.is_symlink():
+                    continue
+                if self._exclude_patterns and _matches_any(self._exclude_patterns, name, relative_directory_path):
+                    continue
+
+                yield entry
+            elif _matches_any(self._include_patterns, name, relative_directory_path) and entry.is_file():
+                if self._exclude_patterns and _matches_any(self._exclude_patterns, name, relative_directory_path):
+                    continue
+
+                yield entry
 
     @staticmethod
-    def _yield_all_absolute_file_paths_in_directory(directory_path):
-        for path_to_directory, _, file_names in os.walk(directory_path):
-            for file_name in file_names:
-                yield os.path.abspath(os.path.join(path_to_directory, file_name))
+    def _get_subdirectory_ancestors(entry, ancestors):
+        """
+        Returns the ancestors of the entries in the subdirectory, or None when the subdirectory is one of its own
+        ancestors, which happens when a symbolic link leads back up.
+
+        :type entry: os.DirEntry
+        :type ancestors: frozenset[(int, int)]
+        :rtype: frozenset[(int, int)] | None
+        """
+        try:
+            identity = _get_directory_identity(entry.path)
+        except OSError:
+            return None
+
+        if identity in ancestors:
+            logging.warning('Skipping directory "{}", it links back to a directory that contains it'.format(entry.path))
+            return None
+
+        return ancestors | frozenset([identity])
+
+
+_SEARCH_FINISHED = object()
+
+
+class _SearchFailure:
+    def __init__(self, exception_info):
+        self._exception_info = exception_info
+
+    def reraise(self):
+        exception_type, exception, traceback = self._exception_info
+        raise exception_type, exception, traceback
+
+
+class _ListedDirectoryEntry:
+    """
+    Stands in for the entries of os.scandir on interpreters without it.
+    """
+
+    def __init__(self, directory_path, name):
+        self.name = name
+        self.path = os.path.join(directory_path, name)
+        self._mode = None
+
+    def is_dir(self):
+        return stat.S_ISDIR(self._get_mode())
+
+    def is_file(self):
+        return stat.S_ISREG(self._get_mode())
+
+    def is_symlink(self):
+        return os.path.islink(self.path)
+
+    def _get_mode(self):
+        if self._mode is None:
+            try:
+                self._mode = os.stat(self.path).st_mode
+            except OSError:
+                # A broken symbolic link, which is neither a file nor a directory
+                self._mode = 0
+
+        return self._mode
+
+
+def _scandir(directory_path):
+    """
+    :type directory_path: str
+    :rtype: collections.Iterable[os.DirEntry]
+    """
+    if scandir is not None:
+        return scandir(directory_path)
+
+    return [_ListedDirectoryEntry(directory_path, name) for name in os.listdir(directory_path)]
+
+
+def _get_directory_identity(directory_path):
+    """
+    :type directory_path: str
+    :rtype: (int, int)
+    """
+    directory_stat = os.stat(directory_path)
+
+    return directory_stat.st_dev, directory_stat.st_ino
+
+
+def _matches_any(patterns, name, relative_directory_path):
+    """
+    :type patterns: list[str]
+    :type name: str
+    :type relative_directory_path: str
+    :rtype: bool
+    """
+    for pattern in patterns:
+        if "/" in pattern:
+            if fnmatch.fnmatchcase(relative_directory_path + name, pattern):
+                return True
+        elif fnmatch.fnmatchcase(name, pattern):
+            return True
+
+    return False
 
 
 class CodeAnalyzer:
-    def __init__(self):
+    def __init__(self, jobs=1, result_cache=None, manifest=None, source_code_file_finder=None, pipeline=None,
+                 parser=DEFAULT_PARSER):
+        """
+        :param jobs: Number of worker processes used by analyze_directory, files are analyzed in-process when 1
+        :type jobs: int
+        :param result_cache: Cache used to skip the analysis of files that have been analyzed before
+        :type result_cache: ResultCache | None
+        :param manifest: Manifest of a previous run, analyze_directory only analyzes files that changed since then
+        :type manifest: AnalysisManifest | None
+        :param source_code_file_finder: Finds the files analyzed by analyze_directory
+        :type source_code_file_finder: SourceCodeFileFinder | None
+        :param pipeline: Pipeline that reads and parses the next files while the current one is analyzed, only used
+                         when files are analyzed in-process
+        :type pipeline: AnalysisPipeline | None
+        :param parser: Parses the RedBaron FST of a file when an analyzer first asks for it
+        :type parser: parsing.InProcessParser | IsolatedParser | QuarantiningParser
+        """
         self._file_analyzers = []  # type: list[FileAnalyzer]
-        self._source_code_file_finder = SourceCodeFileFinder()  # type: SourceCodeFileFinder
+        self._source_code_file_finder = source_code_file_finder or SourceCodeFileFinder()  # type: SourceCodeFileFinder
+        self._jobs = jobs
+        self._result_cache = result_cache
+        self._manifest = manifest
+        self._pipeline = pipeline
+        self._parser = parser
+        self._deduplication_index = None  # type: DeduplicationIndex | None
+        # Files of the last incremental run whose result was reproduced from the manifest
+        self._unchanged_file_count = None  # type: int | None
 
     def analyze_directory(self, directory_location, recursively=True):
-        python_file_paths = self._source_code_file_finder.find_python_files_in_directory(directory_location)
+        # The files are analyzed while the directory is still being searched
+        python_file_paths = instrumentation.time_iteration(
+            self._source_code_file_finder.find_python_files_in_directory(directory_location, recursively),
+            "discovery")
 
-        for python_file_path in python_file_paths:
-            self.analyze_file(python_file_path)
+        # Files with identical contents are only analyzed once per run
+        self._deduplication_index = DeduplicationIndex()
+        self._unchanged_file_count = None
+
+        if self._manifest is None:
+            for _ in self._analyze_files(python_file_paths, self._deduplication_index):
+                pass
+        else:
+            self._analyze_files_incrementally(directory_location, python_file_paths, self._deduplication_index)
+
+    def get_deduplication_index(self):
+        """
+        :return: The index of identical files of the last analyze_directory run, if any
+        :rtype: DeduplicationIndex | None
+        """
+        return self._deduplication_index
+
+    def get_unchanged_file_count(self):
+        """
+        :return: The number of files of the last analyze_directory run that reused the result of an earlier run, None
+            if the run wasn't incremental. These files aren't added to the index of identical files.
+        :rtype: int | None
+        """
+        return self._unchanged_file_count
 
     def analyze_file(self, file_path):
-        with open(file_path) as file:
-            file_contents = file.read()
+        """
+        :type file_path: str
+        :rtype: FileAnalysisResult
+        """
+        return self._analyze_file(file_path)
+
+    def _analyze_file(self, file_path, deduplication_index=None):
+        """
+        :type file_path: str
+        :type deduplication_index: DeduplicationIndex | None
+        :rtype: FileAnalysisResult
+        """
+        instrumentation.count(instrumentation.COUNTER_FILES)
+
+        with instrumentation.file_timer(file_path):
+            file_analysis_result = self._analyze_source_buffer(file_path, self._read_file(file_path),
+                                                               deduplication_index)
+
+        feedback.end_file(file_path)
+
+        return file_analysis_result
+
+    def analyze_sources(self, sources):
+        """
+        Analyzes sources that are held in memory, without accessing the filesystem. The feedback is emitted like that
+        of analyzed files, and is also returned per source, in the order of the sources.
+
+        :param sources: Name and text of each source, the name takes the place of the file path in the feedback
+        :type sources: collections.Iterable[(str, str)]
+        :rtype: list[FileAnalysisResult]
+        """
+        if self._jobs > 1:
+            return list(self._analyze_in_parallel(_analyze_source_in_worker, sources))
+
+        return [self.analyze_source(source_name, source_text) for source_name, source_text in sources]
+
+    def analyze_source(self, source_name, source_text):
+        """
+        :type source_name: str
+        :param source_text: The source code, unicode is encoded as UTF-8
+        :type source_text: str | unicode
+        :rtype: FileAnalysisResult
+        """
+        if isinstance(source_text, unicode):
+            source_text = source_text.encode("utf-8")
+
+        instrumentation.count(instrumentation.COUNTER_FILES)
+
+        with instrumentation.file_timer(source_name):
+            file_analysis_result = self._analyze_source_buffer(source_name, SourceBuffer.from_text(source_text))
+
+        feedback.end_file(source_name)
+
+        return file_analysis_result
+
+    def _analyze_source_buffer(self, file_path, source_buffer, deduplication_index=None):
+        """
+        :type file_path: str
+        :param source_buffer: Closed once the file has been analyzed
+        :type source_buffer: SourceBuffer
+        :type deduplication_index: DeduplicationIndex | None
+        :rtype: FileAnalysisResult
+        """
+        try:
+            return self._finish_prepared_file(self._prepare_file(file_path, source_buffer, deduplication_index))
+        finally:
+            source_buffer.close()
+
+    def _analyze_prepared_file(self, prepared_file):
+        """
+        Finishes the analysis of a file that was read and prepared by the pipeline, emitting its feedback. Only this
+        last stage is included in the time of the file.
+
+        :type prepared_file: _PreparedFile
+        :rtype: FileAnalysisResult
+        """
+        file_path = prepared_file.file_path
+        instrumentation.count(instrumentation.COUNTER_FILES)
+
+        with instrumentation.file_timer(file_path):
+            try:
+                file_analysis_result = self._finish_prepared_file(prepared_file)
+            finally:
+                prepared_file.close()
+
+        feedback.end_file(file_path)
+
+        return file_analysis_result
+
+    def _analyze_files(self, file_paths, deduplication_index):
+        """
+        Analyzes the files and yields their results in the order of file_paths, each after its feedback was emitted.
+
+        :type file_paths: collections.Iterable[str]
+        :type deduplication_index: DeduplicationIndex
+        :rtype: collections.Iterable[FileAnalysisResult]
+        """
+        if self._jobs > 1:
+            for file_analysis_result in self._analyze_distinct_files_in_parallel(file_paths, deduplication_index):
+                yield file_analysis_result
+        elif self._pipeline is not None:
+            prepare_file = functools.partial(self._prepare_file, deduplication_index=deduplication_index)
+
+            for prepared_file in self._pipeline.process(file_paths, self._read_file, prepare_file):
+                yield self._analyze_prepared_file(prepared_file)
+        else:
+            for file_path in file_paths:
+                yield self._analyze_file(file_path, deduplication_index)
+
+    def _analyze_distinct_files_in_parallel(self, file_paths, deduplication_index):
+        """
+        Analyzes every distinct content once in a pool of worker processes, and reuses its result for the files with
+        identical contents. The files are read and hashed by this process, so only distinct contents reach the workers.
+
+        :type file_paths: collections.Iterable[str]
+        :type deduplication_index: DeduplicationIndex
+        :rtype: collections.Iterable[FileAnalysisResult]
+        """
+        # Path and content hash of every file in order, and whether a worker analyzes it
+        pending_files = collections.deque()
+
+        def yield_distinct_sources():
+            for file_path in file_paths:
+                source_buffer = self._read_file(file_path)
+
+                try:
+                    content_hash = source_buffer.get_content_hash()
+                    is_duplicate = deduplication_index.add_file(content_hash)
+                    source_text = None if is_duplicate else source_buffer.get_text()
+                finally:
+                    source_buffer.close()
+
+                # Added before the source is handed to the pool, so it is pending by the time its result comes in
+                pending_files.append((file_path, content_hash, not is_duplicate))
+
+                if not is_duplicate:
+                    yield file_path, source_text
+
+        for file_analysis_result in self._yield_worker_results(_analyze_source_in_worker, yield_distinct_sources()):
+            file_path, content_hash, is_analyzed_by_worker = pending_files.popleft()
+
+            while not is_analyzed_by_worker:
+                yield self._reuse_file_analysis_result(file_path, content_hash, deduplication_index)
+                file_path, content_hash, is_analyzed_by_worker = pending_files.popleft()
+
+            deduplication_index.put(content_hash, file_analysis_result)
+            self._merge_file_analysis_result(file_analysis_result)
+            feedback.end_file(file_path)
+
+            yield file_analysis_result
+
+        while pending_files:
+            file_path, content_hash, _ = pending_files.popleft()
+            yield self._reuse_file_analysis_result(file_path, content_hash, deduplication_index)
+
+    def _reuse_file_analysis_result(self, file_path, content_hash, deduplication_index):
+        """
+        :type file_path: str
+        :type content_hash: str
+        :type deduplication_index: DeduplicationIndex
+        :rtype: FileAnalysisResult
+        """
+        instrumentation.count(instrumentation.COUNTER_FILES)
+        logging.debug('Reusing the analysis of an identical file for "{}"'.format(file_path))
+
+        file_analysis_result = deduplication_index.get(content_hash, file_path)
+        self._merge_file_analysis_result(file_analysis_result)
+        feedback.end_file(file_path)
+
+        return file_analysis_result
+
+    def _analyze_files_incrementally(self, directory_location, file_paths, deduplication_index):
+        """
+        Analyzes the files that were added or changed since the manifest was saved and reproduces the results of all
+        other files from the manifest, in the order of file_paths.
+
+        :type directory_location: str
+        :type file_paths: collections.Iterable[str]
+        :type deduplication_index: DeduplicationIndex
+        """
+        self._manifest.load(self._get_configuration())
+        # Deleted files are only known once the search has finished
+        file_paths = list(file_paths)
+
+        unchanged_file_analysis_results = {}  # type: dict[str, FileAnalysisResult]
+        changed_file_paths = []
+
+        for file_path in file_paths:
+            file_analysis_result = self._manifest.find_unchanged_result(file_path)
+
+            if file_analysis_result is None:
+                changed_file_paths.append(file_path)
+            else:
+                unchanged_file_analysis_results[file_path] = file_analysis_result
+
+        self._unchanged_file_count = len(unchanged_file_analysis_results)
+        logging.debug('Analyzing {} of {} files in "{}"'.format(
+            len(changed_file_paths), len(file_paths), directory_location))
+        changed_file_analysis_results = self._analyze_files(changed_file_paths, deduplication_index)
+
+        for file_path in file_paths:
+            if file_path in unchanged_file_analysis_results:
+                self._merge_file_analysis_result(unchanged_file_analysis_results[file_path])
+                feedback.end_file(file_path)
+            else:
+                self._manifest.update(next(changed_file_analysis_results))
+
+        # Lets the analysis of the changed files finish, which shuts down the worker pool of a parallel analysis
+        for _ in changed_file_analysis_results:
+            pass
+
+        self._manifest.remove_deleted_files(directory_location, file_paths)
+        self._manifest.save()
+
+    @staticmethod
+    def _read_file(file_path):
+        """
+        :type file_path: str
+        :rtype: SourceBuffer
+        """
+        with instrumentation.timer("read"):
+            return SourceBuffer.from_file(file_path)
+
+    def _prepare_file(self, file_path, source_buffer, deduplication_index=None):
+        """
+        Looks up the cached result of the file, or lets the analyzers prepare their analysis of it. Nothing is emitted
+        while preparing, so this may run in another thread than the rest of the analysis.
+
+        :type file_path: str
+        :type source_buffer: SourceBuffer
+        :param deduplication_index: Index of the run, a file identical to one added before isn't prepared at all
+        :type deduplication_index: DeduplicationIndex | None
+        :rtype: _PreparedFile
+        """
+        prepared_file = _PreparedFile(file_path, source_buffer)
+
+        if deduplication_index is not None:
+            prepared_file.content_hash = source_buffer.get_content_hash()
+            prepared_file.deduplication_index = deduplication_index
+
+            if deduplication_index.add_file(prepared_file.content_hash):
+                prepared_file.is_duplicate = True
+                return prepared_file
+
+        if self._result_cache is not None:
+            prepared_file.cache_key = self._get_cache_key(source_buffer)
+            prepared_file.cached_file_analysis_result = self._result_cache.get(prepared_file.cache_key)
+
+            if prepared_file.cached_file_analysis_result is not None:
+                return prepared_file
+
+        prepared_file.parsed_source = ParsedSource(file_path, source_buffer, self._parser)
 
-        logging.debug('Analyzing "{}"'.format(file_path))
         for file_analyzer in self._file_analyzers:
-            file_analyzer.analyze(file_path, file_contents)
+            with instrumentation.timer(file_analyzer.__class__.__name__):
+                prepared_file.preparations.append(file_analyzer.prepare(file_path, prepared_file.parsed_source))
+
+        return prepared_file
+
+    def _finish_prepared_file(self, prepared_file):
+        """
+        :type prepared_file: _PreparedFile
+        :rtype: FileAnalysisResult
+        """
+        file_path = prepared_file.file_path
+
+        if prepared_file.is_duplicate:
+            # Files are finished in order, so the identical file that was added first has been analyzed already
+            logging.debug('Reusing the analysis of an identical file for "{}"'.format(file_path))
+            file_analysis_result = prepared_file.deduplication_index.get(prepared_file.content_hash, file_path)
+            self._merge_file_analysis_result(file_analysis_result)
+
+            return file_analysis_result
+
+        if prepared_file.cached_file_analysis_result is not None:
+            logging.debug('Using cached analysis of "{}"'.format(file_path))
+            file_analysis_result = prepared_file.cached_file_analysis_result.for_file_path(file_path)
+            self._merge_file_analysis_result(file_analysis_result)
+        else:
+            file_analysis_result = self._analyze_file_with_analyzers(prepared_file)
+
+        if prepared_file.deduplication_index is not None:
+            prepared_file.deduplication_index.put(prepared_file.content_hash, file_analysis_result)
+
+        return file_analysis_result
+
+    def _analyze_file_with_analyzers(self, prepared_file):
+        """
+        :type prepared_file: _PreparedFile
+        :rtype: FileAnalysisResult
+        """
+        file_path = prepared_file.file_path
+        feedback_recorder = feedback.FeedbackRecorder()
+        feedback.listen(feedback_recorder)
+
+        logging.debug('Analyzing "{}"'.format(file_path))
+        try:
+            for file_analyzer, preparation in zip(self._file_analyzers, prepared_file.preparations):
+                with instrumentation.timer(file_analyzer.__class__.__name__):
+                    file_analyzer.analyze_prepared(file_path, prepared_file.parsed_source, preparation)
+        finally:
+            feedback.unlisten(feedback_recorder)
+            # Every analyzer has finished the file
+            prepared_file.parsed_source.release()
+
+        file_analysis_result = self._export_file_analysis_result(file_path, feedback_recorder.pop_feedback())
+
+        if prepared_file.cache_key is not None:
+            self._result_cache.put(prepared_file.cache_key, file_analysis_result)
+
+        return file_analysis_result
+
+    def _get_configuration(self):
+        """
+        Describes everything that influences the results of an analysis.
+
+        :rtype: str
+        """
+        configuration = [__version__] + [file_analyzer.get_configuration() for file_analyzer in self._file_analyzers]
+
+        return repr(configuration)
+
+    def _get_cache_key(self, source_buffer):
+        """
+        The key changes whenever the contents, the configured analyzers or the version of the tool change.
+
+        :type source_buffer: SourceBuffer
+        :rtype: str
+        """
+        content_hash = hashlib.sha1()
+        content_hash.update(self._get_configuration())
+        content_hash.update(source_buffer.get_text())
+
+        return content_hash.hexdigest()
 
     def add_file_analyzer(self, file_analyzer):
         self._file_analyzers.append(file_analyzer)
 
+    def _analyze_in_parallel(self, analyze_in_worker, files):
+        """
+        Analyzes the files in a pool of worker processes. Results are merged in the order of the files, so the
+        feedback is emitted in exactly the same order as it would be by a serial run.
+
+        :param analyze_in_worker: Function the workers analyze each of the files with
+        :type analyze_in_worker: (object) -> (FileAnalysisResult, instrumentation.AnalysisStats | None)
+        :param files: The files, as they are passed to analyze_in_worker
+        :type files: collections.Iterable
+        :rtype: collections.Iterable[FileAnalysisResult]
+        """
+        for file_analysis_result in self._yield_worker_results(analyze_in_worker, files):
+            self._merge_file_analysis_result(file_analysis_result)
+            feedback.end_file(file_analysis_result.file_path)
+
+            yield file_analysis_result
+
+    def _yield_worker_results(self, analyze_in_worker, files):
+        """
+        Yields the results of analyzing the files in a pool of worker processes in the order of the files, without
+        merging them.
+
+        :type analyze_in_worker: (object) -> (FileAnalysisResult, instrumentation.AnalysisStats | None)
+        :type files: collections.Iterable
+        :rtype: collections.Iterable[FileAnalysisResult]
+        """
+        pool = multiprocessing.Pool(self._jobs, initializer=_initialize_worker, initargs=(self,))
+
+        try:
+            for file_analysis_result, analysis_stats in pool.imap(analyze_in_worker, files):
+                if analysis_stats is not None:
+                    instrumentation.get_stats().merge(analysis_stats)
+
+                yield file_analysis_result
+
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+
+    def _export_file_analysis_result(self, file_path, feedback_items):
+        """
+        :type file_path: str
+        :type feedback_items: list[feedback.Feedback]
+        :rtype: FileAnalysisResult
+        """
+        analyzer_states = [file_analyzer.export_file_state(file_path) for file_analyzer in self._file_analyzers]
+
+        return FileAnalysisResult(file_path, feedback_items, analyzer_states)
+
+    def _merge_file_analysis_result(self, file_analysis_result):
+        """
+        :type file_analysis_result: FileAnalysisResult
+        """
+        for feedback_item in file_analysis_result.feedback_items:
+            feedback.emit(feedback_item)
+
+        for file_analyzer, state in zip(self._file_analyzers, file_analysis_result.analyzer_states):
+            file_analyzer.merge_file_state(file_analysis_result.file_path, state)
+
+
+class _PreparedFile:
+    """
+    A file that has been read and prepared for analysis, either by the analyzers or by finding its cached result.
+    """
+
+    def __init__(self, file_path, source_buffer):
+        """
+        :type file_path: str
+        :type source_buffer: SourceBuffer
+        """
+        self.file_path = file_path
+        self.source_buffer = source_buffer
+        self.cache_key = None  # type: str | None
+        self.cached_file_analysis_result = None  # type: FileAnalysisResult | None
+        self.content_hash = None  # type: str | None
+        # The index of the run the file is part of, and whether an identical file was added to it before
+        self.deduplication_index = None  # type: DeduplicationIndex | None
+        self.is_duplicate = False
+        # Shared by the analyzers, which parse it as far as they need to
+        self.parsed_source = None  # type: ParsedSource | None
+        # What each of the analyzers prepared, in the order of the analyzers
+        self.preparations = []
+
+    def close(self):
+        self.source_buffer.close()
+
+
+_worker_code_analyzer = None  # type: CodeAnalyzer
+
+
+def _initialize_worker(code_analyzer):
+    """
+    :type code_analyzer: CodeAnalyzer
+    """
+    global _worker_code_analyzer
+
+    _worker_code_analyzer = code_analyzer
+
+    # The feedback is emitted to the actual listeners by the parent process when it merges the results
+    for listener in list(feedback.listeners):
+        feedback.unlisten(listener)
+
+    # Forked workers start out with a copy of the stats the parent gathered so far
+    instrumentation.pop_stats()
+
+
+def _analyze_file_in_worker(file_path):
+    """
+    :type file_path: str
+    :return: The result and, when instrumentation is enabled, the stats of analyzing the file
+    :rtype: (FileAnalysisResult, instrumentation.AnalysisStats | None)
+    """
+    file_analysis_result = _worker_code_analyzer.analyze_file(file_path)
+
+    return file_analysis_result, instrumentation.pop_stats()
+
+
+def _analyze_source_in_worker(source):
+    """
+    :param source: Name and text of the source
+    :type source: (str, str)
+    :rtype: (FileAnalysisResult, instrumentation.AnalysisStats | None)
+    """
+    source_name, source_text = source
+    file_analysis_result = _worker_code_analyzer.analyze_source(source_name, source_text)
+
+    return file_analysis_result, instrumentation.pop_stats()
+
 
 class FileAnalyzer:
     def __init__(self):
         pass
 
     @abc.abstractmethod
-    def analyze(self, file_path, file_contents):
+    def analyze(self, file_path, parsed_source):
         """
         :type file_path: str
-        :type file_contents: str
+        :param parsed_source: Contents of the file and the representations parsed from them, shared by all analyzers
+                              and not to be modified
+        :type parsed_source: ParsedSource
         """
         raise NotImplementedError
 
+    def prepare(self, file_path, parsed_source):
+        """
+        Does the part of the analysis that doesn't notify any listeners, like parsing the file. It may run in another
+        thread than analyze_prepared, so it must not touch the state of the analyzer.
+
+        :type file_path: str
+        :type parsed_source: ParsedSource
+        :return: The preparation that is handed to analyze_prepared
+        """
+        return None
+
+    def analyze_prepared(self, file_path, parsed_source, preparation):
+        """
+        Finishes the analysis of a file that was prepared by prepare.
+
+        :type file_path: str
+        :type parsed_source: ParsedSource
+        """
+        self.analyze(file_path, parsed_source)
+
+    def get_configuration(self):
+        """
+        Describes everything that influences the outcome of analyze, cached results of another configuration are
+        never reused.
+
+        :rtype: str
+        """
+        return self.__class__.__name__
+
+    def export_file_state(self, file_path):
+        """
+        Returns the state gathered while analyzing file_path, which is merged into the analyzer of the parent process
+        when files are analyzed by worker processes.
+
+        :type file_path: str
+        """
+        return None
+
+    def merge_file_state(self, file_path, state):
+        """
+        :type file_path: str
+        """
+        pass
+
 
 class LineLengthAnalyzer(FileAnalyzer):
-    def __init__(self):
+    def __init__(self, rule_set=DEFAULT_RULE_SET):
+        """
+        :type rule_set: RuleSet
+        """
         FileAnalyzer.__init__(self)
 
+        self._max_line_length = rule_set.max_line_length
+
         self._line_length_exceeded_listeners = []  # type: list[LineLengthExceededListenerForComments]
+        # Listeners to notify per type of the first node on a line, built when first needed
+        self._listeners_per_node_type = {}  # type: dict[str, list[LineLengthExceededListenerForComments]]
 
-    def analyze(self, file_path, file_contents):
-        source_file_fst = None
+    def analyze(self, file_path, parsed_source):
+        self.analyze_prepared(file_path, parsed_source, self.prepare(file_path, parsed_source))
 
-        for line_number, line_content in self._yield_all_lengthy_lines(file_path):
-            if source_file_fst is None:
-                try:
-                    source_file_fst = RedBaron(file_contents)
-                except ParsingError as parse_error:
-                    # Should probably be a return
-                    logging.warn('Failed to parse {} with RedBaron'.format(file_path))
-                    continue
+    def prepare(self, file_path, parsed_source):
+        """
+        Finds the lengthy lines and summarizes them. The RedBaron tree is left to the listeners that need it.
+
+        :type file_path: str
+        :type parsed_source: ParsedSource
+        :rtype: (list[(int, str)], LineSummaryIndex | None)
+        """
+        with instrumentation.timer("scan"):
+            lengthy_lines = list(self._yield_all_lengthy_lines(file_path, parsed_source.source_buffer))
+
+        if not lengthy_lines:
+            return lengthy_lines, None
+
+        with instrumentation.timer("summarize"):
+            line_summary_index = LineSummaryIndex(parsed_source, [line_number for line_number, _ in lengthy_lines])
+
+        return lengthy_lines, line_summary_index
+
+    def analyze_prepared(self, file_path, parsed_source, preparation):
+        """
+        :type file_path: str
+        :type parsed_source: ParsedSource
+        :type preparation: (list[(int, str)], LineSummaryIndex | None)
+        """
+        lengthy_lines, line_summary_index = preparation
+
+        if not lengthy_lines:
+            return
+
+        line_node_index = LineNodeIndex(parsed_source, [line_number for line_number, _ in lengthy_lines])
+
+        try:
+            with instrumentation.timer(instrumentation.FRAME_LISTENERS):
+                for line_number, line_content in lengthy_lines:
+                    context = LineLengthExceededContext(
+                        file_context=FileContext(line_number, line_content, file_path),
+                        line_node_index=line_node_index,
+                        line_summary=line_summary_index.get_line_summary(line_number)
+                    )
+
+                    self._notify_listeners(context, self._get_first_node_type(context))
+        finally:
+            line_node_index.release()
+
+    def _yield_all_lengthy_lines(self, file_path, source_buffer):
+        """
+        :type file_path: str
+        :type source_buffer: SourceBuffer
+        """
+        lengthy_line_numbers = find_lengthy_lines(source_buffer.get_contents(), self._max_line_length)
+        line_tracer = tracing.get_line_tracer(file_path)
 
-            context = LineLengthExceededContext(
-                file_context=FileContext(line_number, line_content, file_path),
-                source_file_fst=source_file_fst
-            )
+        if line_tracer is None:
+            for line_number in lengthy_line_numbers:
+                yield line_number, source_buffer.get_line(line_number)
 
-            self._notify_listeners(context)
+            return
 
-    def _yield_all_lengthy_lines(self, file_path):
-        with open(file_path) as file:
-            for i, line in enumerate(file):
-                line_number = i + 1
+        lengthy_line_numbers = set(lengthy_line_numbers)
 
-                if len(line) > 100:
-                    self._debug_line(line_number, line, too_long=True)
-                    yield line_number, line
-                else:
-                    self._debug_line(line_number, line)
+        for line_number, line in source_buffer.iter_lines():
+            if line_number in lengthy_line_numbers:
+                line_tracer.trace_line(line_number, line, too_long=True)
+                yield line_number, line
+            else:
+                line_tracer.trace_line(line_number, line)
+
+    @staticmethod
+    def _get_first_node_type(context):
+        """
+        Resolves the type of the first node on the line once for all listeners, from the summary of the line if there
+        is one.
 
-    def _debug_line(self, line_number, line_contents, too_long=False):
-        validity_char = "✓" if not too_long else "✗"
+        :type context: LineLengthExceededContext
+        :rtype: str | None
+        """
+        if context.line_summary is not None:
+            return context.line_summary.statement_type
 
-        logging.info("[{:>3s}] {} {}".format(str(line_number), validity_char, line_contents.rstrip()))
+        try:
+            return context.line_node_index.get_first_node_on_line(context.file_context.line_number).type
+        except FailedToResolveLineNumberException:
+            return None
 
-    def _notify_listeners(self, context):
+    def _notify_listeners(self, context, first_node_type):
         """
         :type context: LineLengthExceededContext 
+        :type first_node_type: str | None
+        """
+        for listener in self._get_listeners_for_node_type(first_node_type):
+            with instrumentation.timer(listener.__class__.__name__):
+                listener.on_line_length_exceeded(context)
+
+    def _get_listeners_for_node_type(self, node_type):
+        """
+        Returns the listeners that handle lines starting with a node of the type, in the order they were added.
+
+        :type node_type: str | None
+        :rtype: list[LineLengthExceededListenerForComments]
+        """
+        listeners = self._listeners_per_node_type.get(node_type)
+
+        if listeners is None:
+            listeners = []
+            for listener in self._line_length_exceeded_listeners:
+                handled_node_types = listener.get_handled_node_types()
+                if handled_node_types is None or node_type in handled_node_types:
+                    listeners.append(listener)
+
+            self._listeners_per_node_type[node_type] = listeners
+
+        return listeners
+
+    def get_configuration(self):
+        """
+        :rtype: str
         """
-        for listener in self._line_length_exceeded_listeners:
-            listener.on_line_length_exceeded(context)
+        listener_configurations = [listener.get_configuration() for listener in self._line_length_exceeded_listeners]
+
+        return "{}(max_line_length={}, {})".format(
+            self.__class__.__name__, self._max_line_length, ", ".join(listener_configurations))
+
+    def export_file_state(self, file_path):
+        """
+        :type file_path: str
+        :rtype: list
+        """
+        return [listener.export_file_state(file_path) for listener in self._line_length_exceeded_listeners]
+
+    def merge_file_state(self, file_path, state):
+        """
+        :type file_path: str
+        :type state: list
+        """
+        for listener, listener_state in zip(self._line_length_exceeded_listeners, state):
+            listener.merge_file_state(file_path, listener_state)
 
     def add_line_length_exceeded_listener(self, line_too_long_listener):
         self._line_length_exceeded_listeners.append(line_too_long_listener)
+        self._listeners_per_node_type = {}
+
+
+def create_line_length_analyzer(line_length_violation_counter, rule_set=DEFAULT_RULE_SET):
+    """
+    Creates a LineLengthAnalyzer with the standard set of listeners.
+
+    :param line_length_violation_counter: Listener that is notified of every lengthy line
+    :type line_length_violation_counter: LineLengthViolationCounter | CorpusStatsCollector
+    :type rule_set: RuleSet
+    :rtype: LineLengthAnalyzer
+    """
+    line_length_violation_listener_for_comments = LineLengthExceededListenerForComments()
+    line_length_violation_extract_variable_listener = LineLengthViolationExtractVariableListener(rule_set)
+    line_length_violation_multi_assignment_listener = LineLengthViolationMultiAssignmentListener()
+    line_length_violation_fun_def_listener = LineLengthViolationFunctionDefinitionListener(rule_set)
+
+    line_length_analyzer = LineLengthAnalyzer(rule_set)
+    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_counter)
+    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_listener_for_comments)
+    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_extract_variable_listener)
+    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_multi_assignment_listener)
+    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_fun_def_listener)
+
+    return line_length_analyzer
+
+
+class QualityAnalyzer(FileAnalyzer):
+    """
+    Checks the quality rules on every file, whether or not it has lengthy lines.
+    """
+
+    def __init__(self, quality_rule_engine):
+        """
+        :type quality_rule_engine: QualityRuleEngine
+        """
+        FileAnalyzer.__init__(self)
+
+        self._quality_rule_engine = quality_rule_engine
+
+    def analyze(self, file_path, parsed_source):
+        self.analyze_prepared(file_path, parsed_source, self.prepare(file_path, parsed_source))
+
+    def prepare(self, file_path, parsed_source):
+        """
+        Checks the rules, the feedback is only emitted by analyze_prepared.
+
+        :type file_path: str
+        :type parsed_source: ParsedSource
+        :rtype: list[feedback.Feedback]
+        """
+        try:
+            return self._quality_rule_engine.check(parsed_source)
+        except (SyntaxError, TypeError, ValueError) as error:
+            # The stdlib parser raises TypeError rather than SyntaxError on a NUL byte
+            logging.debug('Failed to check the quality rules on {}: {}'.format(file_path, error))
+            return []
+
+    def analyze_prepared(self, file_path, parsed_source, preparation):
+        """
+        :type file_path: str
+        :type parsed_source: ParsedSource
+        :type preparation: list[feedback.Feedback]
+        """
+        for feedback_item in preparation:
+            feedback.emit(feedback_item)
+
+    def get_configuration(self):
+        """
+        :rtype: str
+        """
+        return "{}({})".format(self.__class__.__name__, self._quality_rule_engine.get_configuration())
+
+
+def create_quality_analyzer(rule_set=DEFAULT_RULE_SET):
+    """
+    Creates a QualityAnalyzer with the standard set of quality rules.
+
+    :type rule_set: RuleSet
+    :rtype: QualityAnalyzer
+    """
+    return QualityAnalyzer(create_quality_rule_engine(rule_set))
 
 
 def get_logging_level_from_verbosity(args):
@@ -133,25 +1180,51 @@ def get_logging_level_from_verbosity(args):
         return logging.WARNING
 
 
-def print_dictionary_aligned(_dict, prefix="", separator=" : "):
-    def length(item):
-        if isinstance(item, int):
-            return len(str(item))
+def print_rows_aligned(rows, prefix="", separator=" : "):
+    """
+    :param rows: Keys and their values, printed in the given order
+    :type rows: list[(str, object)]
+    :type prefix: str
+    :type separator: str
+    """
+    rows = [(str(key), str(value)) for key, value in rows]
+    longest_key_length = max([len(key) for key, _ in rows] or [0])
+    longest_value_length = max([len(value) for _, value in rows] or [0])
+
+    for key, value in rows:
+        print "{}{:{}}{}{:>{}}".format(prefix, key, longest_key_length, separator, value, longest_value_length)
+
+
+def print_corpus_stats(corpus_stats):
+    """
+    :type corpus_stats: CorpusStats
+    """
+    print "\nLine Length Violations: {} in {} of {} files".format(
+        corpus_stats.get_violation_count(), corpus_stats.files_with_violations_count, corpus_stats.file_count)
 
-        return len(item)
+    violations_per_file = corpus_stats.violations_per_file
+    print "Violations per file: mean {:.2f}, median {}, 90th percentile {}, max {}".format(
+        violations_per_file.get_mean(), violations_per_file.get_percentile(50), violations_per_file.get_percentile(90),
+        violations_per_file.maximum)
 
-    longest_key_length = 0
-    longest_value_length = 0
+    feedback_per_file = corpus_stats.feedback_per_file
+    print "Feedback per file: mean {:.2f}, median {}, 90th percentile {}, max {}".format(
+        feedback_per_file.get_mean(), feedback_per_file.get_percentile(50), feedback_per_file.get_percentile(90),
+        feedback_per_file.maximum)
 
-    for key, value in _dict.iteritems():
-        key_length = length(key)
-        value_length = length(value)
+    lengthy_line_lengths = corpus_stats.lengthy_line_lengths
+    print "Lengthy line length: median {}, 90th percentile {}, 99th percentile {}, max {}".format(
+        lengthy_line_lengths.get_percentile(50), lengthy_line_lengths.get_percentile(90),
+        lengthy_line_lengths.get_percentile(99), lengthy_line_lengths.maximum)
 
-        longest_key_length = max(longest_key_length, key_length)
-        longest_value_length = max(longest_value_length, value_length)
+    print "\nFeedback per type:"
+    print_rows_aligned(sorted(corpus_stats.feedback_count_per_type.iteritems()), prefix=" - ")
 
-    for key, value in _dict.iteritems():
-        print "{}{:{}}{}{:{}}".format(prefix, key, longest_key_length, separator, value, longest_value_length)
+    print "\nFiles with the most violations:"
+    print_rows_aligned(corpus_stats.worst_files.get_top(), prefix=" - ")
+
+    print "\nStudents with the most violations:"
+    print_rows_aligned(corpus_stats.get_worst_students(), prefix=" - ")
 
 
 def set_up_command_line_arguments():
@@ -159,8 +1232,43 @@ def set_up_command_line_arguments():
     parser.add_argument('-s', dest='stats', action='store_true')
     parser.add_argument('-v', dest='verbose', action='store_true')
     parser.add_argument('-vv', dest='very_verbose', action='store_true')
+    parser.add_argument('directory', nargs='?', default="./input_files/students/ProgNS2014/5679699")
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, default=1)
+    parser.add_argument('--cache-dir', dest='cache_dir')
+    parser.add_argument('--cache-size', dest='cache_size_in_mb', type=int, default=256)
+    parser.add_argument('--incremental', dest='incremental', action='store_true')
+    parser.add_argument('--output-dir', dest='output_dir', default="./output")
+    parser.add_argument('--stream', dest='stream_format', choices=[feedback.OUTPUT_FORMAT_TEXT,
+                                                                   feedback.OUTPUT_FORMAT_JSON_LINES])
+    parser.add_argument('--trace', dest='traced_file_patterns', action='append', default=[])
+    parser.add_argument('--trace-output', dest='trace_output_path')
+    parser.add_argument('--profile', dest='profile_path')
+    parser.add_argument('--profile-format', dest='profile_format', choices=['json', 'folded'], default='json')
+    parser.add_argument('--include', dest='include_patterns', action='append')
+    parser.add_argument('--exclude', dest='exclude_patterns', action='append', default=[])
+    parser.add_argument('--max-depth', dest='max_depth', type=int)
+    parser.add_argument('--follow-symlinks', dest='follow_symlinks', action='store_true')
+    parser.add_argument('--discovery-threads', dest='discovery_threads', type=int, default=1)
+    parser.add_argument('--pipeline', dest='pipeline', action='store_true')
+    parser.add_argument('--reader-threads', dest='reader_threads', type=int, default=4)
+    parser.add_argument('--rules', dest='rules_path')
+    parser.add_argument('--max-line-length', dest='max_line_length', type=int)
+    parser.add_argument('--rule', dest='rule_overrides', action='append', default=[])
+    parser.add_argument('--parse-timeout', dest='parse_timeout', type=float)
+    parser.add_argument('--parse-memory-limit', dest='parse_memory_limit_in_mb', type=int)
+    parser.add_argument('--quarantine', dest='quarantine_path')
+    parser.add_argument('--quality-rules', dest='quality_rules', action='store_true')
     args = parser.parse_args()
 
+    try:
+        rule_overrides = dict(parse_rule_override(rule_override) for rule_override in args.rule_overrides)
+        if args.max_line_length is not None:
+            rule_overrides["max_line_length"] = args.max_line_length
+
+        args.rule_set = load_rule_set(args.rules_path, rule_overrides)
+    except InvalidRuleSetException as exception:
+        parser.error(str(exception))
+
     return args
 
 
@@ -170,41 +1278,100 @@ if __name__ == "__main__":
 
     logging.basicConfig(level=get_logging_level_from_verbosity(args))
 
+    if args.traced_file_patterns:
+        trace_output = open(args.trace_output_path, 'w') if args.trace_output_path else sys.stderr
+        tracing.trace_files(args.traced_file_patterns, trace_output)
+
+    if args.profile_path:
+        instrumentation.enable()
+
     filename_1 = "./input_files/single_line_too_long.py"
     filename_2 = "./input_files/comment_after_statement_same_line.py"
 
-    line_length_violation_counter = LineLengthViolationCounter()
-    line_length_violation_listener_for_comments = LineLengthExceededListenerForComments()
-    line_length_violation_extract_variable_listener = LineLengthViolationExtractVariableListener()
-    line_length_violation_multi_assignment_listener = LineLengthViolationMultiAssignmentListener()
-    line_length_violation_fun_def_listener = LineLengthViolationFunctionDefinitionListener()
+    file_parser = DEFAULT_PARSER
+    if args.parse_timeout is not None or args.parse_memory_limit_in_mb is not None:
+        # Parsing is isolated in a worker process, so a pathological file can't stall or exhaust the analysis
+        file_parser = IsolatedParser(
+            timeout=args.parse_timeout,
+            max_memory_in_bytes=args.parse_memory_limit_in_mb * 1024 * 1024 if args.parse_memory_limit_in_mb else None
+        )
 
-    line_length_analyzer = LineLengthAnalyzer()
-    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_counter)
-    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_listener_for_comments)
-    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_extract_variable_listener)
-    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_multi_assignment_listener)
-    line_length_analyzer.add_line_length_exceeded_listener(line_length_violation_fun_def_listener)
+    if args.quarantine_path:
+        file_parser = QuarantiningParser(file_parser, ParseQuarantine(args.quarantine_path))
 
-    code_analyzer = CodeAnalyzer()
+    # Statistics are gathered while the files stream by, without holding anything per file
+    corpus_stats_collector = CorpusStatsCollector(args.directory)
+    line_length_analyzer = create_line_length_analyzer(corpus_stats_collector, args.rule_set)
+
+    result_cache = None
+    if args.cache_dir:
+        result_cache = ResultCache(args.cache_dir, args.cache_size_in_mb * 1024 * 1024)
+
+    manifest = None
+    if args.incremental:
+        manifest = AnalysisManifest.in_output_directory(args.output_dir)
+
+    source_code_file_finder = SourceCodeFileFinder(
+        include_patterns=args.include_patterns or ["*.py"],
+        exclude_patterns=args.exclude_patterns,
+        max_depth=args.max_depth,
+        follow_symlinks=args.follow_symlinks,
+        threads=args.discovery_threads
+    )
+
+    pipeline = None
+    if args.pipeline:
+        pipeline = AnalysisPipeline(reader_threads=args.reader_threads)
+
+    code_analyzer = CodeAnalyzer(jobs=args.jobs, result_cache=result_cache, manifest=manifest,
+                                 source_code_file_finder=source_code_file_finder, pipeline=pipeline,
+                                 parser=file_parser)
     code_analyzer.add_file_analyzer(line_length_analyzer)
 
-    feedback_collector = feedback.FeedbackCollector()
-    feedback.listen(feedback_collector)
+    if args.quality_rules:
+        code_analyzer.add_file_analyzer(create_quality_analyzer(args.rule_set))
+
+    if args.stats:
+        feedback.listen(corpus_stats_collector)
+
+    feedback_collector = None
+    if args.stream_format:
+        # Feedback is written while the analysis runs, so it is never held for the whole run
+        feedback.listen(feedback.StreamingFeedbackWriter(sys.stdout, args.stream_format))
+    else:
+        feedback_collector = feedback.FeedbackCollector()
+        feedback.listen(feedback_collector)
 
     # code_analyzer.analyze_file(filename_1)
     # code_analyzer.analyze_file(filename_2)
-    code_analyzer.analyze_directory("./input_files/students/ProgNS2014/5679699")
+    code_analyzer.analyze_directory(args.directory)
 
     if args.stats:
-        print "\nLine Length Violations: {}".format(line_length_violation_counter.get_total_violation_count())
+        print_corpus_stats(corpus_stats_collector.get_corpus_stats())
+
+        unchanged_file_count = code_analyzer.get_unchanged_file_count()
+        if unchanged_file_count is not None:
+            print "\nUnchanged Files: {} files reused the analysis of the previous run".format(unchanged_file_count)
+
+        # Only the files that were analyzed in this run are checked for identical contents
+        deduplication_index = code_analyzer.get_deduplication_index()
+        if deduplication_index.file_count:
+            print "\nIdentical Files: {} of {} analyzed files reused an earlier analysis ({:.1%})".format(
+                deduplication_index.duplicate_file_count, deduplication_index.file_count,
+                deduplication_index.get_hit_rate())
 
-        print_dictionary_aligned(line_length_violation_counter.get_violation_count_per_file(), prefix=" - ")
+    if args.profile_path:
+        with open(args.profile_path, 'w') as profile_file:
+            if args.profile_format == 'folded':
+                profile_file.write(instrumentation.get_stats().to_folded_stacks())
+            else:
+                profile_file.write(instrumentation.get_stats().to_json())
 
-    print "\nFeedback:"
-    for filename, feedback_items in feedback_collector.get_feedback_per_file().iteritems():
-        print filename
-        for feedback_item in feedback_items:
-            print " - [{:3d}] {}".format(feedback_item.get_line_number(), feedback_item.get_text())
-            print "         {}".format(feedback_item.get_code())
-        print ""
+    if feedback_collector is not None:
+        print "\nFeedback:"
+        for filename, feedback_items in feedback_collector.get_feedback_per_file().iteritems():
+            print filename
+            for feedback_item in feedback_items:
+                print " - [{:3d}] {}".format(feedback_item.get_line_number(), feedback_item.get_text())
+                print "         {}".format(feedback_item.get_code())
+            print ""
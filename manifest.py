@@ -0,0 +1,183 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from feedback import Feedback
+from results import FileAnalysisResult
+
+MANIFEST_FILE_NAME = "manifest.json"
+
+# Paths and code are byte strings in any encoding, latin-1 maps every byte to a character and back
+_BYTE_STRING_ENCODING = "latin-1"
+
+
+class AnalysisManifest:
+    """
+    Path, modification time, size, content hash and analysis result of every file analyzed in earlier runs, used to
+    only analyze the files that were added or changed since then.
+    """
+
+    def __init__(self, manifest_path):
+        """
+        :type manifest_path: str
+        """
+        self._manifest_path = manifest_path
+        self._configuration = None  # type: str
+        self._entries = {}  # type: dict[str, dict]
+
+    @staticmethod
+    def in_output_directory(output_directory_path):
+        """
+        :type output_directory_path: str
+        :rtype: AnalysisManifest
+        """
+        return AnalysisManifest(os.path.join(output_directory_path, MANIFEST_FILE_NAME))
+
+    def load(self, configuration):
+        """
+        Loads the manifest, entries are discarded when they were created with another configuration.
+
+        :type configuration: str
+        """
+        self._configuration = configuration
+        self._entries = {}
+
+        if not os.path.exists(self._manifest_path):
+            return
+
+        try:
+            with open(self._manifest_path) as manifest_file:
+                manifest = _decode_strings(json.load(manifest_file, encoding=_BYTE_STRING_ENCODING))
+        except ValueError:
+            logging.warn('Ignoring unreadable manifest {}'.format(self._manifest_path))
+            return
+
+        if manifest.get("configuration") == configuration:
+            self._entries = manifest["files"]
+
+    def find_unchanged_result(self, file_path):
+        """
+        :type file_path: str
+        :return: The stored result, unless the file was added or changed since it was stored
+        :rtype: FileAnalysisResult | None
+        """
+        entry = self._entries.get(file_path)
+        if entry is None:
+            return None
+
+        try:
+            file_stat = os.stat(file_path)
+        except OSError:
+            return None
+
+        if file_stat.st_size != entry["size"]:
+            return None
+
+        if file_stat.st_mtime != entry["mtime"]:
+            # Files that were only touched don't have to be analyzed again
+            if _hash_file(file_path) != entry["hash"]:
+                return None
+
+            entry["mtime"] = file_stat.st_mtime
+
+        return _file_analysis_result_from_dict(file_path, entry["result"])
+
+    def update(self, file_analysis_result):
+        """
+        :type file_analysis_result: FileAnalysisResult
+        """
+        file_path = file_analysis_result.file_path
+        file_stat = os.stat(file_path)
+
+        self._entries[file_path] = {
+            "mtime": file_stat.st_mtime,
+            "size": file_stat.st_size,
+            "hash": _hash_file(file_path),
+            "result": _file_analysis_result_to_dict(file_analysis_result),
+        }
+
+    def remove_deleted_files(self, directory_path, file_paths):
+        """
+        Removes the entries of files in the directory that are no longer among file_paths.
+
+        :type directory_path: str
+        :type file_paths: list[str]
+        """
+        directory_prefix = os.path.join(os.path.abspath(directory_path), "")
+        existing_file_paths = set(file_paths)
+
+        for file_path in list(self._entries):
+            if file_path.startswith(directory_prefix) and file_path not in existing_file_paths:
+                del self._entries[file_path]
+
+    def save(self):
+        manifest_directory_path = os.path.dirname(os.path.abspath(self._manifest_path))
+        if not os.path.isdir(manifest_directory_path):
+            os.makedirs(manifest_directory_path)
+
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=manifest_directory_path, suffix=".tmp")
+        with os.fdopen(file_descriptor, 'w') as temporary_file:
+            json.dump({"configuration": self._configuration, "files": self._entries}, temporary_file,
+                      encoding=_BYTE_STRING_ENCODING)
+
+        os.rename(temporary_path, self._manifest_path)
+
+
+def _decode_strings(value):
+    """
+    Turns the unicode strings json returns back into the byte strings they were stored from.
+    """
+    if isinstance(value, unicode):
+        return value.encode(_BYTE_STRING_ENCODING)
+
+    if isinstance(value, list):
+        return [_decode_strings(item) for item in value]
+
+    if isinstance(value, dict):
+        return dict((_decode_strings(key), _decode_strings(item)) for key, item in value.iteritems())
+
+    return value
+
+
+def _hash_file(file_path):
+    """
+    :type file_path: str
+    :rtype: str
+    """
+    content_hash = hashlib.sha1()
+
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(64 * 1024), b''):
+            content_hash.update(chunk)
+
+    return content_hash.hexdigest()
+
+
+def _file_analysis_result_to_dict(file_analysis_result):
+    """
+    :type file_analysis_result: FileAnalysisResult
+    :rtype: dict
+    """
+    return {
+        "feedback": [
+            [feedback.get_type(), feedback.get_text(), feedback.get_line_number(), feedback.get_code()]
+            for feedback in file_analysis_result.feedback_items
+        ],
+        "analyzer_states": file_analysis_result.analyzer_states,
+    }
+
+
+def _file_analysis_result_from_dict(file_path, result_dict):
+    """
+    :type file_path: str
+    :type result_dict: dict
+    :rtype: FileAnalysisResult
+    """
+    feedback_items = [
+        Feedback(feedback_type, text, line_number, file_path, code)
+        for feedback_type, text, line_number, code in result_dict["feedback"]
+    ]
+
+    return FileAnalysisResult(file_path, feedback_items, result_dict["analyzer_states"])
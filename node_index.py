@@ -0,0 +1,402 @@
+import logging
+
+import instrumentation
+from baron.utils import is_newline, split_on_newlines
+from redbaron import RedBaron, Node, NodeList, ProxyList
+
+from parsing import ParseFailedException, ParsedSource
+
+
+class FailedToResolveLineNumberException(Exception):
+    pass
+
+
+class LineNodeIndex:
+    """
+    Index from line numbers to the nodes on those lines, built once per parsed file so listeners don't have to search
+    the FST for every line they inspect. The file is only parsed with RedBaron once a listener asks for a node. Once
+    parsed, the positions of all nodes are computed at once and answer every question about where a node is.
+    """
+
+    def __init__(self, parsed_source, line_numbers):
+        """
+        :param parsed_source: The file, parsed with RedBaron when a listener first asks for a node
+        :type parsed_source: ParsedSource
+        :param line_numbers: Lines that are indexed as soon as the file is parsed
+        :type line_numbers: list[int]
+        """
+        self._parsed_source = parsed_source
+        self._source_file_name = parsed_source.source_name
+        self._line_numbers = line_numbers
+        self._source_file_fst = None  # type: RedBaron
+        self._node_positions = None  # type: NodePositions
+        self._failed_to_parse = False
+        self._first_node_per_line = {}  # type: dict[int, Node]
+        # Built when a listener first asks for the nodes on a line
+        self._nodes_per_line = {}  # type: dict[int, list[Node]]
+
+    def get_source_file_fst(self):
+        """
+        :rtype: RedBaron
+        """
+        if self._source_file_fst is None:
+            self._parse()
+
+        return self._source_file_fst
+
+    def _parse(self):
+        if self._failed_to_parse:
+            raise FailedToResolveLineNumberException()
+
+        try:
+            self._source_file_fst = self._parsed_source.get_fst()
+        except ParseFailedException:
+            self._failed_to_parse = True
+
+            raise FailedToResolveLineNumberException()
+
+        with instrumentation.timer("positions"):
+            self._node_positions = NodePositions(self._source_file_fst)
+
+        for line_number in self._line_numbers:
+            self._index_line(line_number)
+
+    def release(self):
+        """
+        Frees everything computed from the FST once the analysis of the file has ended, the FST itself is released
+        along with the parsed source.
+        """
+        self._source_file_fst = None
+        self._node_positions = None
+        self._first_node_per_line = {}
+        self._nodes_per_line = {}
+
+    def get_first_node_on_line(self, line_number):
+        """
+        :type line_number: int
+        :rtype: Node
+        """
+        self._ensure_line_is_indexed(line_number)
+
+        first_node_on_line = self._first_node_per_line[line_number]
+        if first_node_on_line is None:
+            raise FailedToResolveLineNumberException()
+
+        return first_node_on_line
+
+    def get_nodes_on_line(self, line_number):
+        """
+        :type line_number: int
+        :rtype: list[Node]
+        """
+        first_node_on_line = self.get_first_node_on_line(line_number)
+
+        if line_number not in self._nodes_per_line:
+            self._nodes_per_line[line_number] = self._find_nodes_on_same_line(first_node_on_line)
+
+        return self._nodes_per_line[line_number]
+
+    def get_line_span(self, node):
+        """
+        :type node: Node
+        :return: The first and last line of the node
+        :rtype: (int, int)
+        """
+        self.get_source_file_fst()
+
+        return self._node_positions.get_line_span(node)
+
+    def get_node_width(self, node):
+        """
+        :param node: A node, or a list of nodes like the arguments of a function definition
+        :type node: Node | NodeList | ProxyList
+        :return: The width of the node as RedBaron measures it, from its first column to its last
+        :rtype: int
+        """
+        self.get_source_file_fst()
+
+        return self._node_positions.get_width(node)
+
+    def _ensure_line_is_indexed(self, line_number):
+        # Parsing indexes all lines the index was created for
+        self.get_source_file_fst()
+
+        if line_number not in self._first_node_per_line:
+            self._index_line(line_number)
+
+    def _index_line(self, line_number):
+        instrumentation.count(instrumentation.COUNTER_AT_CALLS)
+
+        try:
+            first_node_on_line = self._node_positions.get_node_at_line(line_number)
+        except IndexError:
+            # Sometimes RedBaron doesn't understand multi-line strings correctly
+            logging.warn('RedBaron failed to find a node on line {} in file {}'.format(
+                line_number, self._source_file_name))
+
+            self._first_node_per_line[line_number] = None
+            return
+
+        self._first_node_per_line[line_number] = first_node_on_line
+
+    def _find_nodes_on_same_line(self, node):
+        """
+        :type node: Node
+        :rtype: list[Node]
+        """
+        nodes_on_same_line = []
+        current_node = node
+
+        while self.nodes_are_on_same_line(node, current_node):
+            nodes_on_same_line.append(current_node)
+
+            tmp_node = current_node.next
+            if not tmp_node:
+                tmp_node = current_node.next_intuitive
+
+            current_node = tmp_node
+
+        return nodes_on_same_line
+
+    def nodes_are_on_same_line(self, node, other_node):
+        """
+        :type node: Node
+        :type other_node: Node
+        :rtype: bool
+        """
+        if not node or not other_node:
+            return False
+
+        node_top_line, node_bottom_line = self.get_line_span(node)
+        if node_top_line != node_bottom_line:
+            return False
+
+        other_node_top_line, other_node_bottom_line = self.get_line_span(other_node)
+        if other_node_top_line != other_node_bottom_line:
+            return False
+
+        return node_top_line == other_node_top_line
+
+
+class NodePositions:
+    """
+    Where every node of a RedBaron FST starts and ends, computed in a single pass over the rendered source the same way
+    baron computes bounding boxes. RedBaron renders the whole FST again for every bounding box it computes.
+    """
+
+    def __init__(self, source_file_fst):
+        """
+        :type source_file_fst: RedBaron
+        """
+        self._source_file_fst = source_file_fst
+        # The node is kept alongside its positions so its id can't be reused, positions are (line, column) pairs
+        self._positions_per_node = {}  # type: dict[int, (object, int, int, int, int)]
+        # The node that renders the first character of each line, like RedBaron's find_by_position((line, 1))
+        self._first_rendered_node_per_line = {}  # type: dict[int, Node]
+        self._line = 1
+        self._column = 1
+        # Where each node is rendered for the last time in the rendering order of the FST, computed when first needed
+        self._rendering_order = None  # type: list[Node | NodeList]
+        self._last_rendering_index_per_node = None  # type: dict[int, int]
+
+        self._add_node_list(source_file_fst.node_list)
+        self._positions_per_node[id(source_file_fst)] = (source_file_fst, 1, 1, self._line, self._column)
+
+    def get_line_span(self, node):
+        """
+        :type node: Node
+        :return: The lines of the top left and bottom right of the absolute bounding box of the node
+        :rtype: (int, int)
+        """
+        positions = self._get_positions(node)
+
+        if positions is None:
+            instrumentation.count(instrumentation.COUNTER_BOUNDING_BOX_COMPUTATIONS)
+            bounding_box = node.absolute_bounding_box
+            return bounding_box.top_left.line, bounding_box.bottom_right.line
+
+        _, start_line, _, end_line, _ = positions
+
+        # The bottom right is the last character rendered, which is on the line the rendering ends on
+        return start_line, end_line
+
+    def get_width(self, node):
+        """
+        :type node: Node | NodeList | ProxyList
+        :return: The columns between the top left and bottom right of the bounding box of the node by itself
+        :rtype: int
+        """
+        if isinstance(node, ProxyList):
+            node = node.node_list
+
+        positions = self._get_positions(node)
+
+        if positions is None:
+            instrumentation.count(instrumentation.COUNTER_BOUNDING_BOX_COMPUTATIONS)
+            return node.bounding_box.bottom_right.column - node.bounding_box.top_left.column
+
+        _, start_line, start_column, end_line, end_column = positions
+
+        # Rendered by itself the node starts at column 1, and its bottom right is the column left of where it ends
+        if start_line == end_line:
+            return end_column - start_column - 1
+
+        return end_column - 2
+
+    def get_node_at_line(self, line_number):
+        """
+        Finds the same node as RedBaron's at(line_number), from the positions instead of from bounding boxes.
+
+        :type line_number: int
+        :rtype: Node
+        :raises IndexError: When the line is outside of the file, or RedBaron would fail to find the node
+        """
+        source_file_fst = self._source_file_fst
+
+        if not 0 <= line_number <= self.get_line_span(source_file_fst)[1]:
+            raise IndexError("Line number {0} is outside of the file".format(line_number))
+
+        node = self._first_rendered_node_per_line.get(line_number, source_file_fst)
+        parent = node.parent
+
+        if self._get_top_line(node) == line_number:
+            if hasattr(type(parent), 'absolute_bounding_box') and self._get_top_line(parent) == line_number and \
+                    parent.parent is not None:
+                return parent
+
+            return node
+
+        if isinstance(node, Node):
+            next_rendered_node = self._get_next_rendered(node)
+            return list(source_file_fst._iter_in_rendering_order(next_rendered_node))[0]
+
+        if parent is None:
+            node = node.data[0][0]
+            while True:
+                if self._get_top_line(node) == line_number:
+                    return node
+
+                node = self._get_next_rendered(node)
+
+        return node
+
+    def _get_next_rendered(self, node):
+        """
+        Finds the same node as RedBaron's next_rendered, which renders the parents of the node again for every call.
+
+        :type node: Node | NodeList
+        :rtype: Node | NodeList | None
+        """
+        if self._rendering_order is None:
+            self._rendering_order = list(self._source_file_fst._generate_nodes_in_rendering_order())
+            self._last_rendering_index_per_node = {}
+            for index, rendered_node in enumerate(self._rendering_order):
+                self._last_rendering_index_per_node[id(rendered_node)] = index
+
+        index = self._last_rendering_index_per_node.get(id(node))
+        if index is None or self._rendering_order[index] is not node:
+            return node.next_rendered
+
+        if index + 1 == len(self._rendering_order):
+            return None
+
+        return self._rendering_order[index + 1]
+
+    def _get_top_line(self, node):
+        """
+        :type node: Node | RedBaron
+        :rtype: int
+        """
+        top_line, _ = self.get_line_span(node)
+
+        return top_line
+
+    def _get_positions(self, node):
+        """
+        :return: The node, where its rendering starts and where it ends, or None for nodes that aren't in the FST
+        :rtype: (object, int, int, int, int) | None
+        """
+        positions = self._positions_per_node.get(id(node))
+
+        if positions is None or positions[0] is not node:
+            return None
+
+        return positions
+
+    def _add_node(self, node):
+        """
+        :type node: Node
+        """
+        start_line, start_column = self._line, self._column
+
+        for part in iter_rendered_parts(node):
+            if isinstance(part, basestring):
+                self._add_text(node, part)
+            elif isinstance(part, Node):
+                self._add_node(part)
+            elif isinstance(part, (NodeList, list)):
+                self._add_node_list(part)
+
+        self._positions_per_node[id(node)] = (node, start_line, start_column, self._line, self._column)
+
+    def _add_node_list(self, node_list):
+        """
+        :type node_list: NodeList | list[Node]
+        """
+        start_line, start_column = self._line, self._column
+
+        for node in node_list:
+            if isinstance(node, Node):
+                self._add_node(node)
+
+        self._positions_per_node[id(node_list)] = (node_list, start_line, start_column, self._line, self._column)
+
+    def _add_text(self, node, text):
+        """
+        :param node: The node rendering the text itself
+        :type node: Node
+        :type text: str
+        """
+        if "\n" not in text and "\r" not in text:
+            if text:
+                if self._column == 1 and self._line not in self._first_rendered_node_per_line:
+                    self._first_rendered_node_per_line[self._line] = node
+
+                self._column += len(text)
+
+            return
+
+        for text_on_line in split_on_newlines(text):
+            if is_newline(text_on_line):
+                self._line += 1
+                self._column = 1
+            else:
+                self._add_text(node, text_on_line)
+
+
+def iter_rendered_parts(node):
+    """
+    Yields what the node renders in the order baron renders it: text rendered by the node itself, child nodes and lists
+    of child nodes. Parts that baron leaves out because what they depend on is empty are left out as well.
+
+    :type node: Node
+    :rtype: collections.Iterable[str | Node | NodeList | list[Node]]
+    """
+    for kind, key, dependency in node._render():
+        if not dependency:
+            continue
+        elif isinstance(dependency, basestring) and not getattr(node, dependency):
+            continue
+        elif isinstance(dependency, list) and not all(getattr(node, dependency_key) for dependency_key in dependency):
+            continue
+
+        if kind == "constant":
+            yield key
+        elif kind in ("string", "key"):
+            yield getattr(node, key)
+        elif kind in ("list", "formatting"):
+            child_nodes = getattr(node, key)
+            if isinstance(child_nodes, ProxyList):
+                child_nodes = child_nodes.node_list
+
+            yield child_nodes
@@ -0,0 +1,412 @@
+"""
+Parsing of source files into RedBaron FSTs. A pathological file can make baron run for a very long time or exhaust the
+memory, so files can be parsed in an isolated worker process under a time and memory budget instead. Files that failed
+to parse can be quarantined, so later runs don't try to parse them again.
+
+ParsedSource shares the tokens, AST and FST of a file between all analyzers, so each is built at most once per file.
+"""
+import ast
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import resource
+import signal
+import threading
+import tokenize
+
+import baron
+import instrumentation
+from baron import BaronError
+from redbaron import RedBaron, base_nodes, nodes
+
+
+class ParseFailedException(Exception):
+    pass
+
+
+class InProcessParser:
+    def parse(self, source_file_name, source_code):
+        """
+        :type source_file_name: str
+        :type source_code: str
+        :rtype: RedBaron
+        :raises ParseFailedException: When baron can't parse the source code
+        """
+        try:
+            return RedBaron(source_code)
+        except BaronError as error:
+            raise ParseFailedException("{}: {}".format(error.__class__.__name__, error))
+
+
+class IsolatedParser:
+    """
+    Parses with baron in a worker process and builds the RedBaron FST from its result. A worker that exceeds the time
+    budget or fails to parse a file for any other reason is stopped, and replaced by a fresh worker for the next file.
+
+    The worker is forked directly rather than started by multiprocessing, which doesn't allow the worker processes of
+    CodeAnalyzer to start processes of their own.
+    """
+
+    def __init__(self, timeout=None, max_memory_in_bytes=None):
+        """
+        :param timeout: Seconds the worker may take to parse a file, unlimited if None
+        :type timeout: float | None
+        :param max_memory_in_bytes: Limit of the address space of the worker, unlimited if None
+        :type max_memory_in_bytes: int | None
+        """
+        self._timeout = timeout
+        self._max_memory_in_bytes = max_memory_in_bytes
+        self._lock = threading.Lock()
+        self._worker_pid = None  # type: int
+        self._connection = None
+        # Processes forked from the one that started the worker have to start their own
+        self._worker_owner_pid = None
+
+    def parse(self, source_file_name, source_code):
+        """
+        :type source_file_name: str
+        :type source_code: str
+        :rtype: RedBaron
+        :raises ParseFailedException: When baron can't parse the source code within the budget
+        """
+        with self._lock:
+            try:
+                connection = self._get_worker_connection()
+                connection.send(source_code)
+
+                if not connection.poll(self._timeout):
+                    self._stop_worker()
+                    raise ParseFailedException("Parsing took longer than {} seconds".format(self._timeout))
+
+                succeeded, result = connection.recv()
+            except (EOFError, IOError):
+                self._stop_worker()
+                raise ParseFailedException("The parse worker exited while parsing")
+
+            if not succeeded:
+                # Running out of memory may leave the worker in any state, so it isn't trusted with the next file
+                self._stop_worker()
+                raise ParseFailedException(result)
+
+        return _ParsedRedBaron(result)
+
+    def close(self):
+        with self._lock:
+            self._stop_worker()
+
+    def __getstate__(self):
+        return self._timeout, self._max_memory_in_bytes
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def _get_worker_connection(self):
+        if self._worker_owner_pid != os.getpid():
+            self._worker_pid = None
+            self._connection = None
+
+        if self._worker_pid is None or not self._worker_is_alive():
+            self._start_worker()
+
+        return self._connection
+
+    def _start_worker(self):
+        self._stop_worker()
+
+        connection, worker_connection = multiprocessing.Pipe()
+
+        worker_pid = os.fork()
+        if worker_pid == 0:
+            connection.close()
+
+            try:
+                _parse_in_worker(worker_connection, self._max_memory_in_bytes)
+            finally:
+                os._exit(0)
+
+        worker_connection.close()
+
+        self._worker_pid = worker_pid
+        self._connection = connection
+        self._worker_owner_pid = os.getpid()
+
+    def _worker_is_alive(self):
+        """
+        :rtype: bool
+        """
+        try:
+            exited_pid, _ = os.waitpid(self._worker_pid, os.WNOHANG)
+        except OSError:
+            return False
+
+        return exited_pid == 0
+
+    def _stop_worker(self):
+        if self._worker_pid is None or self._worker_owner_pid != os.getpid():
+            return
+
+        try:
+            os.kill(self._worker_pid, signal.SIGKILL)
+            os.waitpid(self._worker_pid, 0)
+        except OSError:
+            # The worker has exited and been waited for already
+            pass
+
+        self._connection.close()
+
+        self._worker_pid = None
+        self._connection = None
+
+
+def _parse_in_worker(connection, max_memory_in_bytes):
+    """
+    Parses the source code it receives until the connection is closed, and sends back whether parsing succeeded and
+    either the FST or why parsing failed.
+    """
+    if max_memory_in_bytes is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory_in_bytes, max_memory_in_bytes))
+
+    while True:
+        try:
+            source_code = connection.recv()
+        except EOFError:
+            return
+
+        try:
+            connection.send((True, baron.parse(source_code)))
+        except MemoryError:
+            connection.send((False, "Parsing ran out of memory"))
+        except Exception as exception:
+            connection.send((False, "{}: {}".format(exception.__class__.__name__, exception)))
+
+
+class _ParsedRedBaron(RedBaron):
+    """
+    RedBaron only builds its FST from source code, this builds it the same way from the FST baron returned.
+    """
+
+    def __init__(self, fst):
+        self.first_blank_lines = []
+
+        self.node_list = base_nodes.NodeList.from_fst(fst, parent=self, on_attribute="root")
+        self.middle_separator = nodes.DotNode({"type": "endl", "formatting": [], "value": "\n", "indent": ""})
+
+        self.data = []
+        previous = None
+        for node in self.node_list:
+            if node.type != "endl":
+                self.data.append([node, []])
+            elif previous and previous.type == "endl":
+                self.data.append([previous, []])
+            elif previous is None and node.type == "endl":
+                self.data.append([node, []])
+            elif self.data:
+                self.data[-1][1].append(node)
+
+            previous = node
+
+        self.node_list.parent = None
+        self.on_attribute = None
+        self.parent = None
+
+
+class ParseQuarantine:
+    """
+    Persistent list of the files that failed to parse, identified by their contents, so a file is skipped until it is
+    changed. Every file is appended as a line of JSON as soon as it failed, so worker processes can share the list.
+    """
+
+    def __init__(self, quarantine_path):
+        """
+        :type quarantine_path: str
+        """
+        self._quarantine_path = quarantine_path
+        self._reasons_per_content_hash = {}  # type: dict[str, str]
+        self._lock = threading.Lock()
+
+        self._load()
+
+    def __getstate__(self):
+        return self._quarantine_path
+
+    def __setstate__(self, quarantine_path):
+        self.__init__(quarantine_path)
+
+    def get_reason(self, source_code):
+        """
+        :type source_code: str
+        :return: Why the source code failed to parse, if it is quarantined
+        :rtype: str | None
+        """
+        return self._reasons_per_content_hash.get(_hash_source_code(source_code))
+
+    def add(self, source_file_name, source_code, reason):
+        """
+        :type source_file_name: str
+        :type source_code: str
+        :type reason: str
+        """
+        content_hash = _hash_source_code(source_code)
+        entry = json.dumps({"hash": content_hash, "file": source_file_name, "reason": reason}, encoding="latin-1")
+
+        with self._lock:
+            self._reasons_per_content_hash[content_hash] = reason
+
+            quarantine_directory_path = os.path.dirname(self._quarantine_path)
+            if quarantine_directory_path and not os.path.isdir(quarantine_directory_path):
+                os.makedirs(quarantine_directory_path)
+
+            with open(self._quarantine_path, 'a') as quarantine_file:
+                quarantine_file.write(entry + "\n")
+
+    def _load(self):
+        if not os.path.exists(self._quarantine_path):
+            return
+
+        with open(self._quarantine_path) as quarantine_file:
+            for line in quarantine_file:
+                try:
+                    entry = json.loads(line)
+                    self._reasons_per_content_hash[str(entry["hash"])] = entry["reason"].encode("latin-1")
+                except (ValueError, KeyError, TypeError):
+                    logging.warn('Ignoring unreadable quarantine entry in {}'.format(self._quarantine_path))
+
+
+class QuarantiningParser:
+    """
+    Skips the files in the quarantine and adds the files that fail to parse to it.
+    """
+
+    def __init__(self, parser, quarantine):
+        """
+        :type parser: InProcessParser | IsolatedParser
+        :type quarantine: ParseQuarantine
+        """
+        self._parser = parser
+        self._quarantine = quarantine
+
+    def parse(self, source_file_name, source_code):
+        """
+        :type source_file_name: str
+        :type source_code: str
+        :rtype: RedBaron
+        :raises ParseFailedException: When the file is quarantined or fails to parse
+        """
+        reason = self._quarantine.get_reason(source_code)
+        if reason is not None:
+            raise ParseFailedException("Quarantined: {}".format(reason))
+
+        try:
+            return self._parser.parse(source_file_name, source_code)
+        except ParseFailedException as exception:
+            self._quarantine.add(source_file_name, source_code, str(exception))
+            raise
+
+
+def _hash_source_code(source_code):
+    """
+    :type source_code: str
+    :rtype: str
+    """
+    return hashlib.sha1(source_code).hexdigest()
+
+
+DEFAULT_PARSER = InProcessParser()
+
+
+class ParsedSource:
+    """
+    The representations of a source file that analyzers work with: its text, stdlib tokens, stdlib AST and RedBaron
+    FST. Each is built when an analyzer first asks for it and shared by all analyzers until the file is released. A
+    representation that failed to build fails with the same exception for every analyzer that asks for it.
+    """
+
+    def __init__(self, source_name, source_buffer, parser=DEFAULT_PARSER):
+        """
+        :param source_name: Path of the file or name of the source
+        :type source_name: str
+        :type source_buffer: source_buffer.SourceBuffer
+        :param parser: Parses the RedBaron FST
+        :type parser: InProcessParser | IsolatedParser | QuarantiningParser
+        """
+        self.source_name = source_name
+        self.source_buffer = source_buffer
+        self._parser = parser
+        self._representations = {}  # type: dict[str, object]
+        self._failures = {}  # type: dict[str, Exception]
+
+    def get_text(self):
+        """
+        :rtype: str
+        """
+        return self.source_buffer.get_text()
+
+    def get_tokens(self):
+        """
+        :rtype: list[(int, str, (int, int), (int, int), str)]
+        :raises tokenize.TokenError: When the source code can't be tokenized
+        """
+        return self._get_representation("tokens", self._tokenize)
+
+    def get_ast(self):
+        """
+        :rtype: ast.Module
+        :raises SyntaxError: When the source code can't be parsed
+        :raises TypeError: When the source code contains a NUL byte
+        :raises ValueError: When the source code is otherwise rejected by the compiler
+        """
+        return self._get_representation("ast", self._parse_ast)
+
+    def get_fst(self):
+        """
+        :rtype: RedBaron
+        :raises ParseFailedException: When the source code can't be parsed with RedBaron
+        """
+        return self._get_representation("fst", self._parse_fst)
+
+    def release(self):
+        """
+        Frees all representations once every analyzer has finished the file.
+        """
+        self._representations = {}
+        self._failures = {}
+
+    def _get_representation(self, name, build):
+        """
+        :type name: str
+        :type build: () -> object
+        """
+        failure = self._failures.get(name)
+        if failure is not None:
+            raise failure
+
+        if name not in self._representations:
+            try:
+                self._representations[name] = build()
+            except (ParseFailedException, tokenize.TokenError, SyntaxError, TypeError, ValueError) as exception:
+                self._failures[name] = exception
+                raise
+
+        return self._representations[name]
+
+    def _tokenize(self):
+        lines = (line for _, line in self.source_buffer.iter_lines())
+
+        return list(tokenize.generate_tokens(lambda: next(lines, '')))
+
+    def _parse_ast(self):
+        return ast.parse(self.get_text(), self.source_name)
+
+    def _parse_fst(self):
+        instrumentation.count(instrumentation.COUNTER_PARSES)
+
+        try:
+            with instrumentation.timer(instrumentation.FRAME_PARSE):
+                return self._parser.parse(self.source_name, self.get_text())
+        except ParseFailedException as exception:
+            logging.warn('Failed to parse {} with RedBaron: {}'.format(self.source_name, exception))
+            instrumentation.count(instrumentation.COUNTER_PARSE_FAILURES)
+
+            raise
@@ -0,0 +1,245 @@
+"""
+Staged analysis of a sequence of files. Files are read by a pool of reader threads, parsed by a parse thread and handed
+to the caller in their original order, which dispatches them to the listeners. Reading a file no longer stalls the
+parsing of the previous one, and the number of files held in memory is bounded by the queue size.
+"""
+import collections
+import logging
+import Queue
+import sys
+import threading
+
+# How long a blocked stage waits before checking whether the pipeline has been stopped
+_STOP_POLL_INTERVAL_IN_SECONDS = 0.1
+
+
+class AnalysisPipeline:
+    def __init__(self, reader_threads=4, queue_size=16):
+        """
+        :param reader_threads: Number of threads reading files
+        :type reader_threads: int
+        :param queue_size: Number of files each stage may run ahead of the next one
+        :type queue_size: int
+        """
+        self._reader_threads = max(1, reader_threads)
+        self._queue_size = max(1, queue_size)
+
+    def process(self, file_paths, read_file, parse_file):
+        """
+        Yields parse_file(file_path, read_file(file_path)) for each of the file paths, in order. read_file is called by
+        the reader threads and parse_file by the parse thread, while the caller handles the files that have already
+        been parsed.
+
+        Both return an object with a close method. Files that were read or parsed but are never handed to the caller,
+        because the pipeline was stopped or failed, are closed by the pipeline.
+
+        :type file_paths: collections.Iterable[str]
+        :type read_file: (str) -> object
+        :type parse_file: (str, object) -> object
+        :rtype: collections.Iterable
+        """
+        run = _PipelineRun(file_paths, read_file, parse_file, self._reader_threads, self._queue_size)
+        run.start()
+
+        try:
+            while True:
+                parsed_file = run.get_parsed_file()
+                if parsed_file is _END_OF_FILES:
+                    return
+
+                yield parsed_file
+        finally:
+            # Stops the stages when the caller abandons the pipeline or fails
+            run.stop()
+
+
+_END_OF_FILES = object()
+
+
+class _Failure:
+    def __init__(self, exception_info):
+        self._exception_info = exception_info
+
+    def reraise(self):
+        exception_type, exception, traceback = self._exception_info
+        raise exception_type, exception, traceback
+
+
+class _PendingRead:
+    def __init__(self, file_path):
+        """
+        :type file_path: str
+        """
+        self.file_path = file_path
+        self._done = threading.Event()
+        self._contents = None
+        self._failure = None  # type: _Failure | None
+
+    def complete(self, contents):
+        self._contents = contents
+        self._done.set()
+
+    def fail(self, failure):
+        """
+        :type failure: _Failure
+        """
+        self._failure = failure
+        self._done.set()
+
+    def wait(self):
+        """
+        Waits for the file to be read and returns its contents, or raises what reading it raised.
+        """
+        self._done.wait()
+
+        if self._failure is not None:
+            self._failure.reraise()
+
+        return self._contents
+
+
+class _PipelineRun:
+    def __init__(self, file_paths, read_file, parse_file, reader_thread_count, queue_size):
+        """
+        :type file_paths: collections.Iterable[str]
+        :type read_file: (str) -> object
+        :type parse_file: (str, object) -> object
+        :type reader_thread_count: int
+        :type queue_size: int
+        """
+        self._file_paths = file_paths
+        self._read_file = read_file
+        self._parse_file = parse_file
+        self._reader_thread_count = reader_thread_count
+        self._queue_size = queue_size
+
+        # At most queue_size reads are requested ahead of the parse thread, so this queue is bounded as well
+        self._read_requests = Queue.Queue()
+        self._parsed_files = Queue.Queue(queue_size)
+        self._stopped = threading.Event()
+        self._threads = []  # type: list[threading.Thread]
+
+    def start(self):
+        for _ in xrange(self._reader_thread_count):
+            self._start_thread(self._read_files, "AnalysisPipelineReader")
+
+        self._start_thread(self._parse_files, "AnalysisPipelineParser")
+
+    def stop(self):
+        self._stopped.set()
+
+        for thread in self._threads:
+            thread.join()
+
+        # The parsed files the caller didn't get to
+        while True:
+            try:
+                parsed_file = self._parsed_files.get_nowait()
+            except Queue.Empty:
+                return
+
+            if parsed_file is not _END_OF_FILES and not isinstance(parsed_file, _Failure):
+                parsed_file.close()
+
+    def get_parsed_file(self):
+        """
+        Returns the next parsed file, or _END_OF_FILES once all files have been parsed.
+        """
+        parsed_file = self._parsed_files.get()
+
+        if isinstance(parsed_file, _Failure):
+            parsed_file.reraise()
+
+        return parsed_file
+
+    def _start_thread(self, target, name):
+        thread = threading.Thread(target=target, name=name)
+        thread.daemon = True
+        thread.start()
+
+        self._threads.append(thread)
+
+    def _read_files(self):
+        while True:
+            pending_read = self._read_requests.get()
+            if pending_read is None:
+                return
+
+            if self._stopped.is_set():
+                # Releases the parse thread in case it is waiting for this file
+                pending_read.complete(None)
+                continue
+
+            try:
+                pending_read.complete(self._read_file(pending_read.file_path))
+            except Exception:
+                pending_read.fail(_Failure(sys.exc_info()))
+
+    def _parse_files(self):
+        pending_reads = collections.deque()
+
+        try:
+            for file_path in self._file_paths:
+                pending_read = _PendingRead(file_path)
+                pending_reads.append(pending_read)
+                self._read_requests.put(pending_read)
+
+                if len(pending_reads) >= self._queue_size:
+                    self._parse_file_when_read(pending_reads.popleft())
+
+                if self._stopped.is_set():
+                    return
+
+            while pending_reads and not self._stopped.is_set():
+                self._parse_file_when_read(pending_reads.popleft())
+
+            self._put_parsed_file(_END_OF_FILES)
+        except Exception:
+            logging.debug("Stopping the analysis pipeline", exc_info=True)
+            self._put_parsed_file(_Failure(sys.exc_info()))
+        finally:
+            for _ in xrange(self._reader_thread_count):
+                self._read_requests.put(None)
+
+            # The readers finish the requested reads before they see the end of the requests
+            for pending_read in pending_reads:
+                try:
+                    _close(pending_read.wait())
+                except Exception:
+                    pass
+
+    def _parse_file_when_read(self, pending_read):
+        """
+        :type pending_read: _PendingRead
+        """
+        contents = pending_read.wait()
+        if self._stopped.is_set():
+            _close(contents)
+            return
+
+        try:
+            parsed_file = self._parse_file(pending_read.file_path, contents)
+        except Exception:
+            _close(contents)
+            raise
+
+        self._put_parsed_file(parsed_file)
+
+    def _put_parsed_file(self, parsed_file):
+        while not self._stopped.is_set():
+            try:
+                self._parsed_files.put(parsed_file, timeout=_STOP_POLL_INTERVAL_IN_SECONDS)
+                return
+            except Queue.Full:
+                continue
+
+        if parsed_file is not _END_OF_FILES and not isinstance(parsed_file, _Failure):
+            parsed_file.close()
+
+
+def _close(contents):
+    """
+    :param contents: What read_file returned, None for a file that wasn't read because the pipeline was stopped
+    """
+    if contents is not None:
+        contents.close()
@@ -0,0 +1,437 @@
+"""
+Rules that check a whole file rather than its lengthy lines: the length, nesting and arguments of every function, and
+the naming of functions, arguments and classes. All rules are checked in a single walk over the stdlib AST of a file,
+which hands every node to the rules that handle its type, so adding a rule doesn't add another walk.
+"""
+import ast
+import re
+import tokenize
+
+from contexts import FileContext
+from feedback import Feedback, FeedbackFactory
+from line_scanner import get_line_width
+from line_summary import LineSummaryIndex, get_definition_lines
+from parsing import ParsedSource
+from rules import DEFAULT_RULE_SET, RuleSet
+from source_buffer import SourceBuffer
+
+# Statements that nest the statements in their body one level deeper
+_BLOCK_NODE_TYPES = (ast.If, ast.For, ast.While, ast.With, ast.TryExcept, ast.TryFinally)
+
+
+class QualityRuleContext:
+    """
+    What a rule knows about the file being checked while the engine walks it.
+    """
+
+    def __init__(self, parsed_source, feedback_items):
+        """
+        :type parsed_source: ParsedSource
+        :param feedback_items: Receives the feedback reported by the rules
+        :type feedback_items: list[Feedback]
+        """
+        self.parsed_source = parsed_source
+        # The nodes from the module down to the parent of the current node
+        self.ancestors = []  # type: list[ast.AST]
+        self._feedback_items = feedback_items
+        # Matched with the tokens when the line of a decorated definition is first needed
+        self._definition_lines = None  # type: dict[ast.AST, int] | None
+
+    def get_file_context(self, line_number):
+        """
+        :type line_number: int
+        :rtype: FileContext
+        """
+        return FileContext(line_number, self.parsed_source.source_buffer.get_line(line_number),
+                           self.parsed_source.source_name)
+
+    def get_definition_line(self, node):
+        """
+        :type node: ast.FunctionDef | ast.ClassDef
+        :return: The line of the 'def' or 'class' keyword, on Python 2 the lineno of a decorated definition is the line
+            of its first decorator
+        :rtype: int
+        """
+        if not node.decorator_list:
+            return node.lineno
+
+        if self._definition_lines is None:
+            try:
+                self._definition_lines = get_definition_lines(self.parsed_source.get_ast(),
+                                                              self.parsed_source.get_tokens())
+            except tokenize.TokenError:
+                self._definition_lines = {}
+
+        return self._definition_lines.get(node, node.lineno)
+
+    def report(self, feedback_item):
+        """
+        :type feedback_item: Feedback
+        """
+        self._feedback_items.append(feedback_item)
+
+
+class QualityRule:
+    def __init__(self):
+        self._feedback_factory = FeedbackFactory()
+
+    def get_handled_node_types(self):
+        """
+        Returns the AST node classes the engine hands to this rule, including their subclasses.
+
+        :rtype: tuple[type]
+        """
+        return ()
+
+    def enter_node(self, node, context):
+        """
+        Called before the children of the node are walked.
+
+        :type node: ast.AST
+        :type context: QualityRuleContext
+        """
+        pass
+
+    def leave_node(self, node, last_line_number, context):
+        """
+        Called after the children of the node have been walked.
+
+        :type node: ast.AST
+        :param last_line_number: The last line of the node and its children
+        :type last_line_number: int
+        :type context: QualityRuleContext
+        """
+        pass
+
+    def get_configuration(self):
+        """
+        Describes everything that influences the feedback of this rule.
+
+        :rtype: str
+        """
+        return self.__class__.__name__
+
+
+class FunctionLengthRule(QualityRule):
+    def __init__(self, rule_set=DEFAULT_RULE_SET):
+        """
+        :type rule_set: RuleSet
+        """
+        QualityRule.__init__(self)
+        self._max_function_length = rule_set.max_function_length
+
+    def get_handled_node_types(self):
+        return ast.FunctionDef,
+
+    def leave_node(self, node, last_line_number, context):
+        """
+        :type node: ast.FunctionDef
+        :type last_line_number: int
+        :type context: QualityRuleContext
+        """
+        # Counted from the first decorator, which is only corrected when that makes the function too long
+        if last_line_number - node.lineno + 1 <= self._max_function_length:
+            return
+
+        def_line = context.get_definition_line(node)
+        function_length = last_line_number - def_line + 1
+
+        if function_length > self._max_function_length:
+            context.report(self._feedback_factory.function_too_long(context.get_file_context(def_line),
+                                                                     function_length))
+
+    def get_configuration(self):
+        return "{}(max_function_length={})".format(self.__class__.__name__, self._max_function_length)
+
+
+class NestingDepthRule(QualityRule):
+    """
+    Reports the blocks that are nested one level deeper than allowed within a function, or within the module for code
+    outside of functions. Blocks nested even deeper are part of a block that was reported already.
+    """
+
+    def __init__(self, rule_set=DEFAULT_RULE_SET):
+        """
+        :type rule_set: RuleSet
+        """
+        QualityRule.__init__(self)
+        self._max_nesting_depth = rule_set.max_nesting_depth
+
+    def get_handled_node_types(self):
+        return _BLOCK_NODE_TYPES
+
+    def enter_node(self, node, context):
+        """
+        :type node: ast.stmt
+        :type context: QualityRuleContext
+        """
+        nesting_depth = _get_nesting_depth(node, context.ancestors, context.parsed_source.source_buffer)
+
+        if nesting_depth == self._max_nesting_depth + 1:
+            context.report(self._feedback_factory.function_deep_nesting(context.get_file_context(node.lineno),
+                                                                         nesting_depth))
+
+    def get_configuration(self):
+        return "{}(max_nesting_depth={})".format(self.__class__.__name__, self._max_nesting_depth)
+
+
+class ArgumentCountRule(QualityRule):
+    """
+    Reports the functions with more arguments than allowed. A function whose lengthy def line already gets
+    fundef_many_arguments from LineLengthViolationFunctionDefinitionListener isn't reported again.
+    """
+
+    def __init__(self, rule_set=DEFAULT_RULE_SET):
+        """
+        :type rule_set: RuleSet
+        """
+        QualityRule.__init__(self)
+        self._max_argument_count = rule_set.max_argument_count
+        self._max_arguments_width = rule_set.max_arguments_width
+        self._max_line_length = rule_set.max_line_length
+
+    def get_handled_node_types(self):
+        return ast.FunctionDef,
+
+    def enter_node(self, node, context):
+        """
+        :type node: ast.FunctionDef
+        :type context: QualityRuleContext
+        """
+        arguments = node.args
+        # Counted like RedBaron counts the arguments of a function definition on a lengthy line
+        argument_count = len(arguments.args) + (arguments.vararg is not None) + (arguments.kwarg is not None)
+
+        if argument_count <= self._max_argument_count:
+            return
+
+        def_line = context.get_definition_line(node)
+
+        if not self._is_reported_on_lengthy_line(node, def_line, context):
+            context.report(self._feedback_factory.function_many_arguments(context.get_file_context(def_line),
+                                                                           argument_count))
+
+    def get_configuration(self):
+        return "{}(max_argument_count={}, max_arguments_width={}, max_line_length={})".format(
+            self.__class__.__name__, self._max_argument_count, self._max_arguments_width, self._max_line_length)
+
+    def _is_reported_on_lengthy_line(self, node, def_line, context):
+        """
+        Summarizes the def line like the line length analyzer does, which is only needed for the few functions with too
+        many arguments.
+
+        :type node: ast.FunctionDef
+        :type def_line: int
+        :type context: QualityRuleContext
+        :return: Whether the def line is lengthy and its arguments are too wide, for which the listener reports the
+            arguments
+        :rtype: bool
+        """
+        if get_line_width(context.parsed_source.source_buffer.get_line(def_line)) <= self._max_line_length:
+            return False
+
+        line_summary = LineSummaryIndex(context.parsed_source, [def_line]).get_line_summary(def_line)
+
+        if line_summary is None or line_summary.function_definition is None or \
+                line_summary.function_definition.name != node.name:
+            return False
+
+        return line_summary.function_definition.arguments_width > self._max_arguments_width
+
+
+class NamingRule(QualityRule):
+    """
+    Checks the names of functions and their arguments against PEP 8 lower_case_with_underscores, and the names of
+    classes against CapitalizedWords. Leading and trailing underscores are allowed.
+    """
+
+    _FUNCTION_NAME_PATTERN = re.compile(r"^_*[a-z][a-z0-9_]*$|^__[a-z][a-z0-9_]*__$")
+    _CLASS_NAME_PATTERN = re.compile(r"^_*[A-Z][a-zA-Z0-9]*$")
+
+    def get_handled_node_types(self):
+        return ast.FunctionDef, ast.ClassDef
+
+    def enter_node(self, node, context):
+        """
+        :type node: ast.FunctionDef | ast.ClassDef
+        :type context: QualityRuleContext
+        """
+        definition_line = context.get_definition_line(node)
+
+        if isinstance(node, ast.ClassDef):
+            self._check_name(node.name, self._CLASS_NAME_PATTERN, "class names use CapitalizedWords", definition_line,
+                             context)
+            return
+
+        self._check_name(node.name, self._FUNCTION_NAME_PATTERN, "function names use lower_case_with_underscores",
+                         definition_line, context)
+
+        for argument_name in _get_argument_names(node.args):
+            self._check_name(argument_name, self._FUNCTION_NAME_PATTERN,
+                             "argument names use lower_case_with_underscores", definition_line, context)
+
+    def _check_name(self, name, pattern, convention, line_number, context):
+        """
+        :type name: str
+        :type pattern: re.RegexObject
+        :type convention: str
+        :type line_number: int
+        :type context: QualityRuleContext
+        """
+        if not pattern.match(name):
+            context.report(self._feedback_factory.naming_convention(context.get_file_context(line_number), name,
+                                                                     convention))
+
+
+class QualityRuleEngine:
+    """
+    Checks all rules in a single walk over the AST of a file. Each node is only handed to the rules that handle its
+    type, which are looked up once per node type.
+    """
+
+    def __init__(self):
+        self._rules = []  # type: list[QualityRule]
+        # Rules to hand nodes of each type to, built when a node of the type is first walked
+        self._rules_per_node_type = {}  # type: dict[type, list[QualityRule]]
+
+    def add_rule(self, rule):
+        """
+        :type rule: QualityRule
+        """
+        self._rules.append(rule)
+        self._rules_per_node_type = {}
+
+    def check(self, parsed_source):
+        """
+        :type parsed_source: ParsedSource
+        :return: The feedback of all rules, in the order it was reported
+        :rtype: list[Feedback]
+        :raises SyntaxError: When the file can't be parsed into an AST
+        :raises TypeError: When the file contains a NUL byte
+        """
+        feedback_items = []
+
+        if self._rules:
+            self._walk(parsed_source.get_ast(), QualityRuleContext(parsed_source, feedback_items))
+
+        return feedback_items
+
+    def get_configuration(self):
+        """
+        :rtype: str
+        """
+        return ", ".join(rule.get_configuration() for rule in self._rules)
+
+    def _walk(self, node, context):
+        """
+        :type node: ast.AST
+        :type context: QualityRuleContext
+        :return: The last line of the node and its children
+        :rtype: int
+        """
+        rules = self._get_rules_for_node_type(type(node))
+
+        for rule in rules:
+            rule.enter_node(node, context)
+
+        last_line_number = getattr(node, "lineno", 0)
+
+        context.ancestors.append(node)
+        for child_node in ast.iter_child_nodes(node):
+            last_line_number = max(last_line_number, self._walk(child_node, context))
+        context.ancestors.pop()
+
+        for rule in rules:
+            rule.leave_node(node, last_line_number, context)
+
+        return last_line_number
+
+    def _get_rules_for_node_type(self, node_type):
+        """
+        :type node_type: type
+        :rtype: list[QualityRule]
+        """
+        rules = self._rules_per_node_type.get(node_type)
+
+        if rules is None:
+            rules = [rule for rule in self._rules if issubclass(node_type, rule.get_handled_node_types())]
+            self._rules_per_node_type[node_type] = rules
+
+        return rules
+
+
+def create_quality_rule_engine(rule_set=DEFAULT_RULE_SET):
+    """
+    Creates a QualityRuleEngine with the standard set of rules.
+
+    :type rule_set: RuleSet
+    :rtype: QualityRuleEngine
+    """
+    quality_rule_engine = QualityRuleEngine()
+    quality_rule_engine.add_rule(FunctionLengthRule(rule_set))
+    quality_rule_engine.add_rule(NestingDepthRule(rule_set))
+    quality_rule_engine.add_rule(ArgumentCountRule(rule_set))
+    quality_rule_engine.add_rule(NamingRule())
+
+    return quality_rule_engine
+
+
+def _get_nesting_depth(block_node, ancestors, source_buffer):
+    """
+    Counts the blocks the block is nested in within its function, including the block itself. An elif continues the if
+    it belongs to rather than nesting in it, as do the try of a try/except/finally and every context manager of a with
+    statement after the first.
+
+    :type block_node: ast.stmt
+    :type ancestors: list[ast.AST]
+    :param source_buffer: The source, the AST of an elif is the same as that of an if nested in an else
+    :type source_buffer: SourceBuffer
+    :rtype: int
+    """
+    nesting_depth = 0
+    node = block_node
+
+    for ancestor in reversed(ancestors):
+        if isinstance(node, _BLOCK_NODE_TYPES) and not _continues_block(node, ancestor, source_buffer):
+            nesting_depth += 1
+
+        if isinstance(ancestor, (ast.FunctionDef, ast.ClassDef, ast.Lambda)):
+            break
+
+        node = ancestor
+
+    return nesting_depth
+
+
+def _continues_block(node, parent_node, source_buffer):
+    """
+    :type node: ast.AST
+    :type parent_node: ast.AST
+    :type source_buffer: SourceBuffer
+    :return: Whether the node is written as part of the block of its parent, like an elif
+    :rtype: bool
+    """
+    if isinstance(node, ast.If) and isinstance(parent_node, ast.If):
+        return parent_node.orelse == [node] and source_buffer.get_line(node.lineno).lstrip().startswith("elif")
+
+    if isinstance(node, ast.With) and isinstance(parent_node, ast.With):
+        # Python 2 parses 'with a, b:' into a With nested in a With, a nested with statement can't start on the line of
+        # the with it is nested in
+        return parent_node.body == [node] and node.lineno == parent_node.lineno
+
+    return isinstance(node, ast.TryExcept) and isinstance(parent_node, ast.TryFinally) and parent_node.body == [node]
+
+
+def _get_argument_names(arguments):
+    """
+    :type arguments: ast.arguments
+    :rtype: list[str]
+    """
+    argument_names = [argument.id for argument in arguments.args if isinstance(argument, ast.Name)]
+
+    if arguments.vararg is not None:
+        argument_names.append(arguments.vararg)
+    if arguments.kwarg is not None:
+        argument_names.append(arguments.kwarg)
+
+    return argument_names
@@ -0,0 +1,95 @@
+import threading
+
+from feedback import Feedback
+
+
+class FileAnalysisResult:
+    """
+    Everything a single analyzed file contributed to a run: the feedback that was emitted for it and the state every
+    FileAnalyzer exported for it. Results can be produced in another process and merged back into the parent.
+    """
+
+    def __init__(self, file_path, feedback_items, analyzer_states):
+        """
+        :type file_path: str
+        :type feedback_items: list[Feedback]
+        :type analyzer_states: list
+        """
+        self.file_path = file_path
+        self.feedback_items = feedback_items
+        self.analyzer_states = analyzer_states
+
+    def for_file_path(self, file_path):
+        """
+        Returns this result for another file with identical contents.
+
+        :type file_path: str
+        :rtype: FileAnalysisResult
+        """
+        if file_path == self.file_path:
+            return self
+
+        feedback_items = [feedback_item.for_source_file(file_path) for feedback_item in self.feedback_items]
+
+        return FileAnalysisResult(file_path, feedback_items, self.analyzer_states)
+
+
+class DeduplicationIndex:
+    """
+    Results of the distinct contents analyzed during a single run. Identical files are only analyzed once, the files
+    that share their contents with one that was seen before reuse its result.
+    """
+
+    def __init__(self):
+        self._file_analysis_results = {}  # type: dict[str, FileAnalysisResult]
+        self._seen_content_hashes = set()  # type: set[str]
+        self._lock = threading.Lock()
+        self.file_count = 0
+        self.duplicate_file_count = 0
+
+    def add_file(self, content_hash):
+        """
+        Registers a file of the run. Its result is available once the file with the same contents that was added first
+        has been analyzed.
+
+        :type content_hash: str
+        :return: Whether a file with the same contents was added before
+        :rtype: bool
+        """
+        with self._lock:
+            self.file_count += 1
+
+            if content_hash in self._seen_content_hashes:
+                self.duplicate_file_count += 1
+                return True
+
+            self._seen_content_hashes.add(content_hash)
+            return False
+
+    def put(self, content_hash, file_analysis_result):
+        """
+        :type content_hash: str
+        :type file_analysis_result: FileAnalysisResult
+        """
+        with self._lock:
+            self._file_analysis_results[content_hash] = file_analysis_result
+
+    def get(self, content_hash, file_path):
+        """
+        :type content_hash: str
+        :type file_path: str
+        :return: The result of the first file with the contents, for the duplicate at file_path
+        :rtype: FileAnalysisResult
+        """
+        with self._lock:
+            return self._file_analysis_results[content_hash].for_file_path(file_path)
+
+    def get_hit_rate(self):
+        """
+        :return: The fraction of files that reused the result of an identical file
+        :rtype: float
+        """
+        if not self.file_count:
+            return 0.0
+
+        return float(self.duplicate_file_count) / self.file_count
@@ -0,0 +1,110 @@
+"""
+Thresholds of the rules, loaded once from a configuration file and command line overrides into an immutable rule set.
+The rule set is shared by the analyzer and its listeners, and is handed to worker processes along with them.
+"""
+import collections
+import json
+
+RuleSet = collections.namedtuple("RuleSet", [
+    # Lines longer than this violate the line length rule
+    "max_line_length",
+    # Function definitions on a lengthy line
+    "max_function_name_length",
+    "max_arguments_width",
+    "max_argument_count",
+    "max_argument_name_length",
+    "max_long_argument_count",
+    # Lengthy lines with more binary operators than this should extract a variable
+    "max_binary_operators",
+    # Every function definition in a file, checked by the quality rules
+    "max_function_length",
+    "max_nesting_depth",
+])
+
+DEFAULT_MAX_LINE_LENGTH = 100
+
+
+class InvalidRuleSetException(Exception):
+    pass
+
+
+def create_rule_set(**thresholds):
+    """
+    Creates a rule set from the given thresholds. The thresholds of function definitions that aren't given are derived
+    from the maximum line length, the others have a fixed default.
+
+    :type thresholds: int
+    :rtype: RuleSet
+    """
+    unknown_threshold_names = set(thresholds) - set(RuleSet._fields)
+    if unknown_threshold_names:
+        raise InvalidRuleSetException("Unknown rules: {}".format(", ".join(sorted(unknown_threshold_names))))
+
+    for threshold_name, threshold in thresholds.iteritems():
+        if not isinstance(threshold, (int, long)) or isinstance(threshold, bool) or threshold < 0:
+            raise InvalidRuleSetException(
+                "Rule {} should be a non-negative integer, not {!r}".format(threshold_name, threshold))
+
+    max_line_length = thresholds.get("max_line_length", DEFAULT_MAX_LINE_LENGTH)
+
+    return RuleSet(
+        max_line_length=max_line_length,
+        max_function_name_length=thresholds.get("max_function_name_length", max_line_length // 2),
+        max_arguments_width=thresholds.get("max_arguments_width", max_line_length // 2),
+        max_argument_count=thresholds.get("max_argument_count", 4),
+        max_argument_name_length=thresholds.get("max_argument_name_length", 25),
+        max_long_argument_count=thresholds.get("max_long_argument_count", 1),
+        max_binary_operators=thresholds.get("max_binary_operators", 4),
+        max_function_length=thresholds.get("max_function_length", 50),
+        max_nesting_depth=thresholds.get("max_nesting_depth", 4),
+    )
+
+
+DEFAULT_RULE_SET = create_rule_set()
+
+
+def load_rule_set(configuration_path=None, overrides=None):
+    """
+    Loads the rule set from a JSON configuration file mapping rule names to thresholds, e.g. {"max_line_length": 79},
+    with the overrides taking precedence over the file.
+
+    :type configuration_path: str | None
+    :type overrides: dict[str, int] | None
+    :rtype: RuleSet
+    """
+    thresholds = {}
+
+    if configuration_path is not None:
+        try:
+            with open(configuration_path) as configuration_file:
+                configuration = json.load(configuration_file)
+        except (IOError, ValueError) as error:
+            raise InvalidRuleSetException('Failed to load rules from "{}": {}'.format(configuration_path, error))
+
+        if not isinstance(configuration, dict):
+            raise InvalidRuleSetException('Rules in "{}" should be a JSON object'.format(configuration_path))
+
+        thresholds.update((str(rule_name), threshold) for rule_name, threshold in configuration.iteritems())
+
+    if overrides:
+        thresholds.update(overrides)
+
+    return create_rule_set(**thresholds)
+
+
+def parse_rule_override(rule_override):
+    """
+    Parses a command line override of the form name=threshold.
+
+    :type rule_override: str
+    :rtype: (str, int)
+    """
+    rule_name, separator, threshold = rule_override.partition("=")
+
+    try:
+        if not separator:
+            raise ValueError()
+
+        return rule_name.strip(), int(threshold)
+    except ValueError:
+        raise InvalidRuleSetException("Expected a rule override like max_line_length=79, not {!r}".format(rule_override))
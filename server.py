@@ -0,0 +1,264 @@
+"""
+Long-running analysis server. Keeps a pool of worker processes with the analyzers and RedBaron loaded, so a request only
+pays for the analysis itself and not for starting Python and building the RedBaron parser.
+
+    python server.py [--port 5000] [--workers 4] [--max-pending-requests 64] [--timeout 30] [--parse-memory-limit 512]
+
+    POST /analyze   {"sources": [{"name": "a.py", "text": "..."}], "paths": ["/path/to/b.py"]}
+    GET  /health
+"""
+import argparse
+import logging
+import multiprocessing
+import threading
+
+from flask import Flask, jsonify, request
+
+import feedback
+from listeners import LineLengthViolationCounter
+from main import CodeAnalyzer, create_line_length_analyzer
+from parsing import IsolatedParser
+from rules import DEFAULT_RULE_SET, InvalidRuleSetException, RuleSet, load_rule_set
+
+# Analyzed before the workers are started, so they all start out with a RedBaron parser that has been used before
+_WARM_UP_SOURCE = (
+    "def warm_up(first_argument, second_argument):\n"
+    "    return first_argument * 2 + second_argument * 3 + first_argument * 4 + second_argument * 5 + first_argument\n"
+)
+
+
+class ServerBusyException(Exception):
+    pass
+
+
+class AnalysisTimedOutException(Exception):
+    pass
+
+
+class AnalysisFailedException(Exception):
+    pass
+
+
+class AnalysisService:
+    def __init__(self, workers=4, max_pending_requests=64, timeout=30.0, max_requests_per_worker=None,
+                 rule_set=DEFAULT_RULE_SET, max_parse_memory_in_bytes=None):
+        """
+        :param workers: Number of worker processes analyzing requests
+        :type workers: int
+        :param max_pending_requests: Number of requests that are analyzed or waiting for a worker, others are rejected
+        :type max_pending_requests: int
+        :param timeout: Seconds a request waits for its analysis, and a file may take to parse
+        :type timeout: float
+        :param max_requests_per_worker: Requests after which a worker is replaced by a fresh one, never if None
+        :type max_requests_per_worker: int | None
+        :type rule_set: RuleSet
+        :param max_parse_memory_in_bytes: Limit of the address space of the process parsing a file, unlimited if None
+        :type max_parse_memory_in_bytes: int | None
+        """
+        self._timeout = timeout
+        self._max_pending_requests = max_pending_requests
+        self._pending_requests = threading.BoundedSemaphore(max_pending_requests)
+        self._pending_request_count = 0
+        self._pending_request_count_lock = threading.Lock()
+
+        # Files are parsed in a process of their own that is stopped once it exceeds the budget, so a pathological
+        # file can't keep a worker, and the pending request, busy forever or make the worker die
+        self._parser = IsolatedParser(timeout, max_parse_memory_in_bytes)
+
+        line_length_violation_counter = LineLengthViolationCounter()
+        code_analyzer = CodeAnalyzer(parser=self._parser)
+        code_analyzer.add_file_analyzer(create_line_length_analyzer(line_length_violation_counter, rule_set))
+        code_analyzer.analyze_source("<warm-up>", _WARM_UP_SOURCE)
+        line_length_violation_counter.pop_violation_count_for_file("<warm-up>")
+
+        # The workers are forked from this process, so they share the analyzer that has just been warmed up
+        self._pool = multiprocessing.Pool(workers, initializer=_initialize_worker,
+                                          initargs=(code_analyzer, line_length_violation_counter),
+                                          maxtasksperchild=max_requests_per_worker)
+
+    def analyze(self, sources, file_paths):
+        """
+        Analyzes the sources and files in one of the workers.
+
+        :param sources: Name and text of each source
+        :type sources: list[(str, str)]
+        :param file_paths: Paths of files that are readable by the server
+        :type file_paths: list[str]
+        :return: The analysis of every source followed by that of every file
+        :rtype: list[dict]
+        """
+        if not self._pending_requests.acquire(False):
+            raise ServerBusyException("{} requests are already pending".format(self._max_pending_requests))
+
+        self._change_pending_request_count(1)
+
+        # A request that times out keeps its worker busy until its current file has been parsed, so it is only no
+        # longer pending once the worker is done
+        analysis = self._pool.apply_async(_analyze_in_worker, (sources, file_paths),
+                                          callback=self._on_analysis_finished)
+
+        try:
+            succeeded, analysis_result = analysis.get(self._timeout)
+        except multiprocessing.TimeoutError:
+            raise AnalysisTimedOutException("The analysis took longer than {} seconds".format(self._timeout))
+
+        if not succeeded:
+            raise AnalysisFailedException(analysis_result)
+
+        return analysis_result
+
+    def get_pending_request_count(self):
+        """
+        :rtype: int
+        """
+        return self._pending_request_count
+
+    def close(self):
+        self._pool.terminate()
+        self._pool.join()
+        self._parser.close()
+
+    def _on_analysis_finished(self, _):
+        self._change_pending_request_count(-1)
+        self._pending_requests.release()
+
+    def _change_pending_request_count(self, change):
+        with self._pending_request_count_lock:
+            self._pending_request_count += change
+
+
+_worker_code_analyzer = None  # type: CodeAnalyzer
+_worker_line_length_violation_counter = None  # type: LineLengthViolationCounter
+
+
+def _initialize_worker(code_analyzer, line_length_violation_counter):
+    """
+    :type code_analyzer: CodeAnalyzer
+    :type line_length_violation_counter: LineLengthViolationCounter
+    """
+    global _worker_code_analyzer, _worker_line_length_violation_counter
+
+    _worker_code_analyzer = code_analyzer
+    _worker_line_length_violation_counter = line_length_violation_counter
+
+    # The feedback is returned with the analysis of each file instead
+    for listener in list(feedback.listeners):
+        feedback.unlisten(listener)
+
+
+def _analyze_in_worker(sources, file_paths):
+    """
+    Never raises, so the pool always reports the request as finished.
+
+    :type sources: list[(str, str)]
+    :type file_paths: list[str]
+    :return: Whether the analysis succeeded, and the analysis of every file or why it failed
+    :rtype: (bool, list[dict] | str)
+    """
+    try:
+        file_analysis_results = _worker_code_analyzer.analyze_sources(sources)
+        file_analysis_results.extend(_worker_code_analyzer.analyze_file(file_path) for file_path in file_paths)
+
+        return True, [
+            {
+                "file": file_analysis_result.file_path,
+                "violations": _worker_line_length_violation_counter.pop_violation_count_for_file(
+                    file_analysis_result.file_path),
+                "feedback": [feedback.feedback_to_dict(feedback_item)
+                             for feedback_item in file_analysis_result.feedback_items],
+            }
+            for file_analysis_result in file_analysis_results
+        ]
+    except Exception as exception:
+        logging.exception("Failed to analyze a request")
+        return False, "{}: {}".format(exception.__class__.__name__, exception)
+
+
+def create_app(analysis_service):
+    """
+    :type analysis_service: AnalysisService
+    :rtype: Flask
+    """
+    app = Flask(__name__)
+
+    @app.route("/analyze", methods=["POST"])
+    def analyze():
+        request_body = request.get_json(force=True, silent=True)
+        if not isinstance(request_body, dict):
+            return _error_response(400, "Expected a JSON object")
+
+        try:
+            sources = [(_to_byte_string(source["name"]), source["text"]) for source in request_body.get("sources", [])]
+            file_paths = [_to_byte_string(file_path) for file_path in request_body.get("paths", [])]
+        except (KeyError, TypeError, AttributeError):
+            return _error_response(400, 'Expected "sources" with a "name" and "text" each, and "paths"')
+
+        try:
+            results = analysis_service.analyze(sources, file_paths)
+        except ServerBusyException as exception:
+            return _error_response(503, str(exception))
+        except AnalysisTimedOutException as exception:
+            return _error_response(504, str(exception))
+        except AnalysisFailedException as exception:
+            return _error_response(500, str(exception))
+
+        return jsonify(results=results)
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        return jsonify(status="ok", pending_requests=analysis_service.get_pending_request_count())
+
+    return app
+
+
+def _error_response(status_code, message):
+    response = jsonify(error=message)
+    response.status_code = status_code
+
+    return response
+
+
+def _to_byte_string(text):
+    """
+    :type text: str | unicode
+    :rtype: str
+    """
+    if isinstance(text, unicode):
+        return text.encode("utf-8")
+
+    return text
+
+
+def set_up_command_line_arguments():
+    parser = argparse.ArgumentParser(description="Serves the analysis of sources and files over HTTP.")
+    parser.add_argument('--host', dest='host', default="127.0.0.1")
+    parser.add_argument('--port', dest='port', type=int, default=5000)
+    parser.add_argument('--workers', dest='workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--max-pending-requests', dest='max_pending_requests', type=int, default=64)
+    parser.add_argument('--timeout', dest='timeout', type=float, default=30.0)
+    parser.add_argument('--max-requests-per-worker', dest='max_requests_per_worker', type=int)
+    parser.add_argument('--parse-memory-limit', dest='parse_memory_limit_in_mb', type=int)
+    parser.add_argument('--rules', dest='rules_path')
+    parser.add_argument('-v', dest='verbose', action='store_true')
+    args = parser.parse_args()
+
+    try:
+        args.rule_set = load_rule_set(args.rules_path)
+    except InvalidRuleSetException as exception:
+        parser.error(str(exception))
+
+    return args
+
+
+if __name__ == "__main__":
+    args = set_up_command_line_arguments()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+
+    service = AnalysisService(args.workers, args.max_pending_requests, args.timeout, args.max_requests_per_worker,
+                              args.rule_set,
+                              args.parse_memory_limit_in_mb * 1024 * 1024 if args.parse_memory_limit_in_mb else None)
+    try:
+        create_app(service).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        service.close()
@@ -0,0 +1,129 @@
+import hashlib
+import mmap
+import os
+
+# Files at least this large are memory mapped instead of read into a string
+MMAP_THRESHOLD_IN_BYTES = 1024 * 1024
+
+
+class SourceBuffer:
+    """
+    Immutable contents of a source file together with the offsets at which its lines start. The file is read only once,
+    every analyzer scans lines, parses and cuts code snippets from the same buffer.
+    """
+
+    def __init__(self, contents):
+        """
+        :param contents: Contents of the file, either a string or a read-only memory map
+        :type contents: str | mmap.mmap
+        """
+        self._contents = contents
+        self._text = contents if isinstance(contents, str) else None  # type: str | None
+        # Computed once lines are accessed, most files are only scanned for lengthy lines
+        self._line_offsets = None  # type: list[int] | None
+
+    @staticmethod
+    def from_file(file_path):
+        """
+        :type file_path: str
+        :rtype: SourceBuffer
+        """
+        with open(file_path, 'rb') as file:
+            file_size = os.fstat(file.fileno()).st_size
+
+            if file_size < MMAP_THRESHOLD_IN_BYTES:
+                return SourceBuffer(file.read())
+
+            return SourceBuffer(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    @staticmethod
+    def from_text(text):
+        """
+        :type text: str
+        :rtype: SourceBuffer
+        """
+        return SourceBuffer(text)
+
+    def get_contents(self):
+        """
+        Returns the contents without copying them, which may be a memory map that is only valid until the buffer is
+        closed.
+
+        :rtype: str | mmap.mmap
+        """
+        return self._contents
+
+    def get_text(self):
+        """
+        :rtype: str
+        """
+        if self._text is None:
+            self._text = self._contents[:]
+
+        return self._text
+
+    def get_content_hash(self):
+        """
+        :return: SHA-1 of the contents, identical files have the same hash
+        :rtype: str
+        """
+        return hashlib.sha1(self._contents).hexdigest()
+
+    def get_line_count(self):
+        """
+        :rtype: int
+        """
+        return len(self._get_line_offsets()) - 1
+
+    def get_line(self, line_number):
+        """
+        :param line_number: Line number starting at 1
+        :type line_number: int
+        :return: The line including its line ending
+        :rtype: str
+        """
+        line_offsets = self._get_line_offsets()
+
+        return self._contents[line_offsets[line_number - 1]:line_offsets[line_number]]
+
+    def iter_lines(self):
+        """
+        :rtype: collections.Iterable[(int, str)]
+        """
+        contents = self._contents
+        line_offsets = self._get_line_offsets()
+
+        for i in xrange(len(line_offsets) - 1):
+            yield i + 1, contents[line_offsets[i]:line_offsets[i + 1]]
+
+    def _get_line_offsets(self):
+        """
+        :rtype: list[int]
+        """
+        if self._line_offsets is None:
+            self._line_offsets = _compute_line_offsets(self._contents)
+
+        return self._line_offsets
+
+    def close(self):
+        if not isinstance(self._contents, str):
+            self._contents.close()
+
+
+def _compute_line_offsets(contents):
+    """
+    :type contents: str | mmap.mmap
+    :return: The offset at which every line starts, followed by the length of the contents
+    :rtype: list[int]
+    """
+    line_offsets = [0]
+    newline_offset = contents.find('\n')
+
+    while newline_offset != -1:
+        line_offsets.append(newline_offset + 1)
+        newline_offset = contents.find('\n', newline_offset + 1)
+
+    if line_offsets[-1] != len(contents):
+        line_offsets.append(len(contents))
+
+    return line_offsets
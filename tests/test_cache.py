@@ -0,0 +1,39 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from cache import ResultCache
+from results import FileAnalysisResult
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory_path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory_path)
+
+    def test_overwritten_entry_is_counted_once(self):
+        result_cache = ResultCache(self.directory_path, 1024 * 1024)
+
+        result_cache.put("entry", FileAnalysisResult("a.py", [], []))
+        result_cache.put("entry", FileAnalysisResult("a.py", [], []))
+
+        # Eviction only starts once the total size exceeds the maximum, which it would too early if it drifted upward
+        self.assertEqual(self._get_size_on_disk(), result_cache._size_in_bytes)
+        self.assertIsNotNone(result_cache.get("entry"))
+
+    def _get_size_on_disk(self):
+        """
+        :rtype: int
+        """
+        return sum(os.path.getsize(os.path.join(self.directory_path, file_name))
+                   for file_name in os.listdir(self.directory_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+import feedback
+from corpus_stats import CorpusStats
+from listeners import CorpusStatsCollector
+from main import CodeAnalyzer, create_line_length_analyzer
+
+
+class CorpusStatsCollectorTest(unittest.TestCase):
+    def test_lengthy_lines_are_measured_like_the_line_length_check(self):
+        corpus_stats = CorpusStats()
+        corpus_stats_collector = CorpusStatsCollector("corpus", corpus_stats)
+        code_analyzer = CodeAnalyzer()
+        code_analyzer.add_file_analyzer(create_line_length_analyzer(corpus_stats_collector))
+
+        feedback.listen(corpus_stats_collector)
+        try:
+            # A tab advances to the next tab stop, the line ending isn't counted
+            code_analyzer.analyze_source(os.path.join("corpus", "student", "tabs.py"),
+                                         "if x:\n\tx = '" + "a" * 100 + "'\r\n")
+        finally:
+            feedback.unlisten(corpus_stats_collector)
+
+        self.assertEqual(1, corpus_stats.lengthy_line_lengths.count)
+        self.assertEqual(8 + len("x = ''") + 100, corpus_stats.lengthy_line_lengths.maximum)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from line_summary import LineSummaryIndex
+from listeners import LineLengthViolationCounter
+from main import CodeAnalyzer, create_line_length_analyzer
+from parsing import ParsedSource
+from source_buffer import SourceBuffer
+
+_DECORATED_SOURCE = """class Foo(object):
+    @staticmethod
+    def compute_something(first_argument, second_argument, third_argument, fourth_argument, fifth_argument):
+        return first_argument
+"""
+
+
+class DecoratedFunctionDefinitionTest(unittest.TestCase):
+    def test_summary_is_keyed_on_def_line(self):
+        parsed_source = ParsedSource("decorated.py", SourceBuffer.from_text(_DECORATED_SOURCE))
+        line_summary_index = LineSummaryIndex(parsed_source, [2, 3])
+
+        self.assertIsNone(line_summary_index.get_line_summary(2))
+        line_summary = line_summary_index.get_line_summary(3)
+        self.assertEqual("def", line_summary.statement_type)
+        self.assertEqual("compute_something", line_summary.function_definition.name)
+        self.assertEqual(5, line_summary.function_definition.argument_count)
+
+    def test_lengthy_def_line_below_decorator_gets_feedback(self):
+        code_analyzer = CodeAnalyzer()
+        code_analyzer.add_file_analyzer(create_line_length_analyzer(LineLengthViolationCounter()))
+
+        file_analysis_result = code_analyzer.analyze_source("decorated.py", _DECORATED_SOURCE)
+
+        self.assertEqual([(3, "fundef_many_arguments")],
+                         [(feedback_item.get_line_number(), feedback_item.get_type())
+                          for feedback_item in file_analysis_result.feedback_items])
+
+
+if __name__ == "__main__":
+    unittest.main()
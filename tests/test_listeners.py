@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from listeners import LineLengthViolationCounter
+from main import CodeAnalyzer, create_line_length_analyzer
+
+# The stdlib parser rejects a NUL byte, which leaves the lines without a summary so the listeners inspect the FST
+_FST_ONLY_LINE = "# \x00\n"
+
+
+def analyze(source):
+    """
+    :type source: str
+    :rtype: list[(int, str)]
+    """
+    code_analyzer = CodeAnalyzer()
+    code_analyzer.add_file_analyzer(create_line_length_analyzer(LineLengthViolationCounter()))
+
+    return [(feedback_item.get_line_number(), feedback_item.get_type())
+            for feedback_item in code_analyzer.analyze_source("analyzed.py", source).feedback_items]
+
+
+class LineSummaryAndFstTest(unittest.TestCase):
+    def assert_same_feedback_on_both_paths(self, source, expected_feedback):
+        """
+        :type source: str
+        :type expected_feedback: list[(int, str)]
+        """
+        self.assertEqual(expected_feedback, analyze(source))
+        self.assertEqual(expected_feedback, analyze(source + _FST_ONLY_LINE))
+
+    def test_assignment_of_single_value(self):
+        self.assert_same_feedback_on_both_paths(
+            "def f(self):\n"
+            "    self.hidden_tokens_before = list(map(lambda hidden_token: hidden_token.value, self.tokens_before_x))\n",
+            [])
+
+    def test_assignment_of_tuples(self):
+        self.assert_same_feedback_on_both_paths(
+            "def f():\n"
+            "    first_variable, second_variable, third_variable = 'a first value', 'a second value', 'a third value'\n",
+            [(2, "multi_assignment")])
+
+    def test_function_definition_with_long_argument_names(self):
+        self.assert_same_feedback_on_both_paths(
+            "def f(self, *a_rather_long_list_of_the_positional_arguments, **a_rather_long_dict_of_keyword_arguments):\n"
+            "    pass\n",
+            [(1, "fundef_long_arguments")])
+
+
+if __name__ == "__main__":
+    unittest.main()
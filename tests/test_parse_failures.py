@@ -0,0 +1,30 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from listeners import LineLengthViolationCounter
+from main import CodeAnalyzer, create_line_length_analyzer, create_quality_analyzer
+
+# The stdlib parser raises TypeError on a NUL byte, RedBaron parses the file
+_NUL_BYTE_SOURCE = "x = 1  # " + "a" * 110 + "\x00\ny = 2\n"
+
+
+class NulByteTest(unittest.TestCase):
+    def test_falls_back_to_fst(self):
+        line_length_violation_counter = LineLengthViolationCounter()
+        code_analyzer = CodeAnalyzer()
+        code_analyzer.add_file_analyzer(create_line_length_analyzer(line_length_violation_counter))
+        code_analyzer.add_file_analyzer(create_quality_analyzer())
+
+        file_analysis_result = code_analyzer.analyze_source("nul.py", _NUL_BYTE_SOURCE)
+
+        self.assertEqual(1, line_length_violation_counter.get_total_violation_count())
+        self.assertEqual([(1, "comment_after_statement")],
+                         [(feedback_item.get_line_number(), feedback_item.get_type())
+                          for feedback_item in file_analysis_result.feedback_items])
+
+
+if __name__ == "__main__":
+    unittest.main()
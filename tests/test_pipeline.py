@@ -0,0 +1,79 @@
+import os
+import sys
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from pipeline import AnalysisPipeline
+
+
+class _File:
+    def __init__(self, file_path, open_files):
+        """
+        :type file_path: str
+        :type open_files: _OpenFiles
+        """
+        self.file_path = file_path
+        self._open_files = open_files
+        open_files.open(self)
+
+    def close(self):
+        self._open_files.close(self)
+
+
+class _OpenFiles:
+    def __init__(self):
+        self._files = set()
+        self._lock = threading.Lock()
+
+    def open(self, opened_file):
+        with self._lock:
+            self._files.add(opened_file)
+
+    def close(self, closed_file):
+        with self._lock:
+            self._files.discard(closed_file)
+
+    def __len__(self):
+        return len(self._files)
+
+
+class AnalysisPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.open_files = _OpenFiles()
+        self.file_paths = ["{}.py".format(i) for i in xrange(50)]
+
+    def read_file(self, file_path):
+        return _File(file_path, self.open_files)
+
+    def parse_file(self, file_path, contents):
+        if file_path == "10.py":
+            raise ValueError("Failed to parse")
+
+        contents.close()
+
+        return _File(file_path, self.open_files)
+
+    def test_abandoned_files_are_closed(self):
+        parsed_files = AnalysisPipeline(reader_threads=4, queue_size=8).process(self.file_paths, self.read_file,
+                                                                                self.parse_file)
+
+        next(parsed_files).close()
+        parsed_files.close()
+
+        self.assertEqual(0, len(self.open_files))
+
+    def test_files_are_closed_when_parsing_fails(self):
+        parsed_files = AnalysisPipeline(reader_threads=4, queue_size=8).process(self.file_paths, self.read_file,
+                                                                                self.parse_file)
+
+        with self.assertRaises(ValueError):
+            for parsed_file in parsed_files:
+                parsed_file.close()
+
+        self.assertEqual(0, len(self.open_files))
+
+
+if __name__ == "__main__":
+    unittest.main()
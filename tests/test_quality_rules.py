@@ -0,0 +1,95 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from listeners import LineLengthViolationCounter
+from main import CodeAnalyzer, create_line_length_analyzer, create_quality_analyzer
+from parsing import ParsedSource
+from quality_rules import create_quality_rule_engine
+from source_buffer import SourceBuffer
+
+
+def check(source):
+    """
+    :type source: str
+    :rtype: list[(int, str)]
+    """
+    parsed_source = ParsedSource("checked.py", SourceBuffer.from_text(source))
+
+    return [(feedback_item.get_line_number(), feedback_item.get_type())
+            for feedback_item in create_quality_rule_engine().check(parsed_source)]
+
+
+class NestingDepthRuleTest(unittest.TestCase):
+    def test_with_statement_of_multiple_context_managers_nests_once(self):
+        source = "\n".join([
+            "def read(a, b):",
+            "    for x in a:",
+            "        if x:",
+            "            while b:",
+            "                with open(a) as first, open(b) as second:",
+            "                    pass",
+            "",
+        ])
+
+        self.assertEqual([], check(source))
+
+    def test_nested_with_statements_nest(self):
+        source = "\n".join([
+            "def read(a, b):",
+            "    for x in a:",
+            "        if x:",
+            "            while b:",
+            "                with open(a) as first:",
+            "                    with open(b) as second:",
+            "                        pass",
+            "",
+        ])
+
+        self.assertEqual([(6, "function_deep_nesting")], check(source))
+
+
+class ArgumentCountRuleTest(unittest.TestCase):
+    def test_reports_function_with_many_arguments(self):
+        self.assertEqual([(1, "function_many_arguments")], check("def f(a, b, c, d, e):\n    pass\n"))
+
+    def test_skips_lengthy_def_line_reported_by_listener(self):
+        source = ("def compute(first_argument, second_argument, third_argument, fourth_argument, fifth_argument, "
+                  "sixth):\n    pass\n")
+        code_analyzer = CodeAnalyzer()
+        code_analyzer.add_file_analyzer(create_line_length_analyzer(LineLengthViolationCounter()))
+        code_analyzer.add_file_analyzer(create_quality_analyzer())
+
+        self.assertEqual([(1, "fundef_many_arguments")],
+                         [(feedback_item.get_line_number(), feedback_item.get_type())
+                          for feedback_item in code_analyzer.analyze_source("checked.py", source).feedback_items])
+
+
+class DecoratedDefinitionTest(unittest.TestCase):
+    def test_feedback_is_reported_on_def_line(self):
+        source = "\n".join([
+            "class Foo(object):",
+            "    @staticmethod",
+            "    def computeIt(a, b, c, d, e):",
+            "        return a",
+            "",
+        ])
+
+        self.assertEqual([(3, "function_many_arguments"), (3, "naming_convention")], check(source))
+
+    def test_class_is_reported_on_class_line(self):
+        self.assertEqual([(3, "naming_convention")], check("@decorate\n@decorate\nclass foo(object):\n    pass\n"))
+
+    def test_function_length_excludes_decorators(self):
+        body = ["    x = 1"] * 48
+        decorated_source = "\n".join(["@decorate", "@decorate", "def f():"] + body + [""])
+        long_source = "\n".join(["@decorate", "def f():"] + body + ["    x = 1", "    x = 1", ""])
+
+        self.assertEqual([], check(decorated_source))
+        self.assertEqual([(2, "function_too_long")], check(long_source))
+
+
+if __name__ == "__main__":
+    unittest.main()
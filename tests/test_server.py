@@ -0,0 +1,52 @@
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+from server import AnalysisService, AnalysisTimedOutException
+
+_LONG_SOURCE = "x = 1  # " + "a comment that makes this line longer than the limit " * 3 + "\n"
+# Takes RedBaron well over ten seconds to parse, which the lengthy decorator line needs
+_SLOW_SOURCE = "@decorate(" + "argument, " * 10 + "argument)\ndef f():\n    pass\n" + "".join("x{} = [{}]  # {}\n".format(i, ", ".join(str(j) for j in xrange(20)), "c" * 60)
+                       for i in xrange(1000))
+
+
+class AnalysisServiceTest(unittest.TestCase):
+    def setUp(self):
+        # Starting the service analyzes the warm-up source
+        self.analysis_service = AnalysisService(workers=1, timeout=60.0)
+
+    def tearDown(self):
+        self.analysis_service.close()
+
+    def test_analyzes_sources_after_warm_up(self):
+        analysis_result = self.analysis_service.analyze([("long.py", _LONG_SOURCE)], [])
+
+        self.assertEqual(1, len(analysis_result))
+        self.assertEqual("long.py", analysis_result[0]["file"])
+        self.assertEqual(1, analysis_result[0]["violations"])
+        self.assertEqual(0, self.analysis_service.get_pending_request_count())
+
+
+class AnalysisServiceTimeoutTest(unittest.TestCase):
+    def setUp(self):
+        self.analysis_service = AnalysisService(workers=1, max_pending_requests=1, timeout=1.0)
+
+    def tearDown(self):
+        self.analysis_service.close()
+
+    def test_parse_is_stopped_after_request_timed_out(self):
+        self.assertRaises(AnalysisTimedOutException, self.analysis_service.analyze, [("slow.py", _SLOW_SOURCE)], [])
+
+        deadline = time.time() + 5
+        while self.analysis_service.get_pending_request_count() and time.time() < deadline:
+            time.sleep(0.1)
+
+        self.assertEqual(0, self.analysis_service.get_pending_request_count())
+        self.assertEqual(1, self.analysis_service.analyze([("long.py", _LONG_SOURCE)], [])[0]["violations"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# coding=utf-8
+"""
+Per-line tracing of the line length scan. Whether a file is traced is decided once per file, so untraced files don't
+pay anything per line. Lines are traced to the log at INFO level, or to a separate trace output for the files that
+match one of the traced file patterns.
+"""
+import fnmatch
+import logging
+
+_TRACE_FORMAT = "[%3s] %s %s"
+
+_traced_file_patterns = []  # type: list[str]
+_trace_output = None  # type: file
+
+
+class LineTracer:
+    def __init__(self):
+        pass
+
+    def trace_line(self, line_number, line_contents, too_long=False):
+        """
+        :type line_number: int
+        :type line_contents: str
+        :type too_long: bool
+        """
+        validity_char = "✓" if not too_long else "✗"
+
+        self._write(_TRACE_FORMAT, str(line_number), validity_char, line_contents.rstrip())
+
+    def _write(self, trace_format, *trace_arguments):
+        raise NotImplementedError
+
+
+class _LoggingLineTracer(LineTracer):
+    def _write(self, trace_format, *trace_arguments):
+        # Formatting is left to logging, which skips it when no handler accepts the record
+        logging.info(trace_format, *trace_arguments)
+
+
+class _OutputLineTracer(LineTracer):
+    def __init__(self, file_path, output):
+        """
+        :type file_path: str
+        :type output: file
+        """
+        LineTracer.__init__(self)
+        self._output = output
+
+        self._output.write("==> {}\n".format(file_path))
+
+    def _write(self, trace_format, *trace_arguments):
+        self._output.write(trace_format % trace_arguments + "\n")
+
+
+def trace_files(file_patterns, trace_output):
+    """
+    Traces the files matching any of the glob patterns to trace_output, whatever the logging level is.
+
+    :type file_patterns: list[str]
+    :type trace_output: file
+    """
+    global _traced_file_patterns, _trace_output
+
+    _traced_file_patterns = list(file_patterns)
+    _trace_output = trace_output
+
+
+def get_line_tracer(file_path):
+    """
+    :type file_path: str
+    :return: The tracer for the lines of the file, or None when the file isn't traced
+    :rtype: LineTracer | None
+    """
+    for file_pattern in _traced_file_patterns:
+        if fnmatch.fnmatch(file_path, file_pattern):
+            return _OutputLineTracer(file_path, _trace_output)
+
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        return _LoggingLineTracer()
+
+    return None